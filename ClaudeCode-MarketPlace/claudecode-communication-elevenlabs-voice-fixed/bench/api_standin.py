@@ -0,0 +1,315 @@
+"""Local HTTPS stand-in for the ElevenLabs streaming endpoint.
+
+Serves ``POST /v1/text-to-speech/<voice>/stream`` over TLS on localhost
+with a throwaway self-signed certificate, so the synthesis client can be
+measured without an API key or network. The latency a real connection
+adds is simulated: ``handshake_delay`` is slept before each TLS handshake
+(standing in for DNS, TCP and TLS round trips) and ``first_byte_delay``
+before each response (server-side synthesis time). Audio is sent in
+``chunk_size`` pieces ``chunk_interval`` apart, and a fraction
+``error_rate`` of requests is answered with an error instead (HTTP 500,
+or one picked from ``error_statuses``, e.g. 429 and 503). Like the real
+API, more than ``max_concurrent`` requests at once are refused with a 429.
+Connections are kept alive like the real API's.
+
+Used by ``synthesis_client.py --bench``, ``rate_limiter.py --bench`` and
+``latency_bench.py``; like them it is a development tool, kept out of
+tts-patch/ so the installers don't copy it into the TTS plugin. To point
+a daemon at it, run it on its own and set ``api_url`` and
+``api_ca_file`` in ``[streaming]`` to what it prints:
+    python3 bench/api_standin.py --handshake-ms 150 --server-ms 250
+
+Needs the ``openssl`` command to make the certificate.
+
+Credit: COR Solutions - True Streaming Patch
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import shutil
+import socket
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable
+
+# Response size per character of text, and default bytes per chunk written
+AUDIO_BYTES_PER_CHAR = 400
+CHUNK_SIZE = 4096
+
+
+def make_certificate(directory: Path) -> tuple[Path, Path]:
+    """Create a self-signed certificate for 127.0.0.1 and localhost.
+
+    Returns:
+        (certificate path, key path).
+
+    Raises:
+        RuntimeError: If openssl is not installed or fails.
+    """
+    openssl = shutil.which("openssl")
+    if openssl is None:
+        raise RuntimeError("the openssl command is needed to make a test certificate")
+    cert, key = directory / "standin.crt", directory / "standin.key"
+    result = subprocess.run(
+        [
+            openssl, "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+            "-subj", "/CN=localhost",
+            "-addext", "subjectAltName=IP:127.0.0.1,DNS:localhost",
+            "-keyout", str(key), "-out", str(cert),
+        ],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"openssl failed: {result.stderr.strip()}")
+    return cert, key
+
+
+class StandInServer:
+    """ElevenLabs-like HTTPS server on a free localhost port."""
+
+    def __init__(
+        self,
+        handshake_delay: float = 0.0,
+        first_byte_delay: float = 0.0,
+        respond: Callable[[dict], tuple[int, dict]] | None = None,
+        chunk_size: int = CHUNK_SIZE,
+        chunk_interval: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int | None = None,
+        error_statuses: tuple[int, ...] = (500,),
+        max_concurrent: int = 0,
+        retry_after: float | None = None,
+    ):
+        """Initialize the server; ``start`` (or ``with``) runs it.
+
+        Args:
+            handshake_delay: Seconds slept before every TLS handshake.
+            first_byte_delay: Seconds slept before every response.
+            respond: Optional hook deciding a request's outcome: called with
+                the JSON body, returns (status, extra headers). Anything
+                but 200 is answered with a JSON error body.
+            chunk_size: Audio bytes per chunk.
+            chunk_interval: Seconds slept between audio chunks.
+            error_rate: Fraction of synthesis requests answered with an
+                error (when there is no ``respond`` hook).
+            seed: Seed for choosing the failed requests and their status.
+            error_statuses: Statuses the failed requests get, picked at random.
+            max_concurrent: Most synthesis requests served at once; more are
+                answered with 429 (0 = no limit).
+            retry_after: Seconds sent as Retry-After with a 429 or 503.
+        """
+        self.handshake_delay = handshake_delay
+        self.first_byte_delay = first_byte_delay
+        self.respond = respond
+        self.chunk_size = chunk_size
+        self.chunk_interval = chunk_interval
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses
+        self.max_concurrent = max_concurrent
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self.handshakes = 0
+        self.requests = 0
+        self.errors = 0
+        # Requests being answered now, and the most there were at once
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        # Responses the client hung up on before the end of the audio
+        self.aborted = 0
+        self.url = ""
+        self.ca_file: Path | None = None
+        self._dir: tempfile.TemporaryDirectory | None = None
+        self._server: ThreadingHTTPServer | None = None
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> StandInServer:
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def client_context(self) -> ssl.SSLContext:
+        """TLS context for clients, trusting the stand-in's certificate."""
+        assert self.ca_file is not None, "server not started"
+        return ssl.create_default_context(cafile=str(self.ca_file))
+
+    def start(self) -> str:
+        """Start serving in a background thread.
+
+        Returns:
+            Base URL, e.g. "https://127.0.0.1:40123".
+        """
+        self._dir = tempfile.TemporaryDirectory(prefix="tts-standin-")
+        cert, key = make_certificate(Path(self._dir.name))
+        self.ca_file = cert
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+
+        standin = self
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+
+            def get_request(self):
+                sock, address = super().get_request()
+                # As real API front ends do; otherwise the first audio chunk
+                # waits for the ACK of the headers on a reused connection
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                # Handshake on the request's thread, so a slow one doesn't
+                # hold up accepting the next connection
+                return context.wrap_socket(sock, server_side=True, do_handshake_on_connect=False), address
+
+            def process_request_thread(self, request, client_address):
+                time.sleep(standin.handshake_delay)
+                try:
+                    request.do_handshake()
+                except (OSError, ssl.SSLError):
+                    self.shutdown_request(request)
+                    return
+                with standin._lock:
+                    standin.handshakes += 1
+                super().process_request_thread(request, client_address)
+
+        self._server = Server(("127.0.0.1", 0), _handler(self))
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self.url = f"https://127.0.0.1:{self._server.server_address[1]}"
+        return self.url
+
+    def stop(self) -> None:
+        """Stop serving and remove the certificate."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._dir is not None:
+            self._dir.cleanup()
+            self._dir = None
+
+
+def _handler(standin: StandInServer) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format: str, *args: object) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            # Connection checks (/v1/user and the like)
+            self._send_json(200, {"subscription": {"tier": "stand-in"}})
+
+        def do_POST(self) -> None:
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                body = {}
+            with standin._lock:
+                standin.requests += 1
+                standin.in_flight += 1
+                standin.peak_in_flight = max(standin.peak_in_flight, standin.in_flight)
+                too_many = 0 < standin.max_concurrent < standin.in_flight
+            try:
+                self._synthesize(body, too_many)
+            finally:
+                with standin._lock:
+                    standin.in_flight -= 1
+
+        def _synthesize(self, body: dict, too_many: bool) -> None:
+            time.sleep(standin.first_byte_delay)
+            if standin.respond:
+                status, headers = standin.respond(body)
+            else:
+                with standin._lock:
+                    failed = standin._random.random() < standin.error_rate
+                    status = standin._random.choice(standin.error_statuses) if failed else 200
+                headers = {}
+            if too_many:
+                status = 429
+            if not self.path.startswith("/v1/text-to-speech/"):
+                status = 404
+            if status != 200:
+                if status in (429, 503) and standin.retry_after is not None:
+                    headers = {"Retry-After": f"{standin.retry_after:g}", **headers}
+                with standin._lock:
+                    standin.errors += 1
+                self._send_json(status, {"detail": {"status": "stand_in_error"}}, headers)
+                return
+
+            audio = b"\xff\xf3" * (AUDIO_BYTES_PER_CHAR * max(1, len(body.get("text", ""))) // 2)
+            self.send_response(200)
+            self.send_header("Content-Type", "audio/mpeg")
+            self.send_header("Transfer-Encoding", "chunked")
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            try:
+                for start in range(0, len(audio), standin.chunk_size):
+                    if start and standin.chunk_interval:
+                        time.sleep(standin.chunk_interval)
+                    chunk = audio[start:start + standin.chunk_size]
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                self.wfile.write(b"0\r\n\r\n")
+            except OSError:
+                # The client closed the connection mid-stream (skipped)
+                with standin._lock:
+                    standin.aborted += 1
+                self.close_connection = True
+
+        def _send_json(self, status: int, payload: dict, headers: dict | None = None) -> None:
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+    return Handler
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Local HTTPS stand-in for the ElevenLabs API")
+    parser.add_argument("--handshake-ms", type=float, default=0.0, help="Delay before each TLS handshake")
+    parser.add_argument("--server-ms", type=float, default=0.0, help="Delay before each response")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Audio bytes per chunk")
+    parser.add_argument("--chunk-interval-ms", type=float, default=0.0, help="Delay between audio chunks")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with an error")
+    parser.add_argument(
+        "--error-status", type=int, action="append", help="Status of the failed requests (repeatable; default 500)"
+    )
+    parser.add_argument("--max-concurrent", type=int, default=0, help="Answer requests beyond this many at once with 429")
+    parser.add_argument("--retry-after", type=float, help="Retry-After seconds sent with 429 and 503")
+    args = parser.parse_args()
+
+    with StandInServer(
+        args.handshake_ms / 1000,
+        args.server_ms / 1000,
+        chunk_size=args.chunk_size,
+        chunk_interval=args.chunk_interval_ms / 1000,
+        error_rate=args.error_rate,
+        error_statuses=tuple(args.error_status or (500,)),
+        max_concurrent=args.max_concurrent,
+        retry_after=args.retry_after,
+    ) as server:
+        print(f'api_url = "{server.url}"')
+        print(f'api_ca_file = "{server.ca_file}"', flush=True)
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
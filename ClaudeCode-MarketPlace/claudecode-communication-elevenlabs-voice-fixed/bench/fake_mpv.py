@@ -0,0 +1,154 @@
+"""Instrumented stand-in for mpv, for latency benchmarks.
+
+Behaves like the two ways the daemon runs mpv: ``mpv ... -`` reading one
+utterance from stdin, and ``mpv --idle=yes --input-ipc-server=<socket>``
+taking ``loadfile``, ``stop`` and ``quit`` commands over JSON IPC and
+reporting ``start-file``, ``playback-restart`` and ``end-file`` events.
+Nothing is decoded or played. Instead, each stream's first byte and its
+end are appended as JSON lines to ``$FAKE_MPV_LOG``, stamped with
+``time.time()``, so a benchmark can see exactly when audio reached the
+player, and the demuxer it was told to use (set_property or
+``--demuxer=``, empty for the default probe):
+
+    {"time": 1700000000.123, "event": "first-byte", "mode": "ipc", "demuxer": ""}
+    {"time": 1700000000.456, "event": "end", "mode": "ipc", "bytes": 40000}
+
+A ``stop`` command, or SIGTERM to a stdin player, is where real mpv goes
+silent, and is logged the moment it arrives as a ``stop`` event.
+
+Audio is drained as fast as it arrives, or at ``$FAKE_MPV_BYTE_RATE``
+bytes per second to simulate real-time playback.
+
+Run by latency_bench.py through an ``mpv`` wrapper script on ``PATH``.
+
+Credit: COR Solutions - True Streaming Patch
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from typing import BinaryIO
+
+READ_SIZE = 4096
+
+
+class _Log:
+    """Appends events to the log file, if there is one."""
+
+    def __init__(self, path: str | None):
+        self._path = path
+        self._lock = threading.Lock()
+
+    def write(self, event: str, **fields: object) -> None:
+        if not self._path:
+            return
+        line = json.dumps({"time": time.time(), "event": event, **fields}) + "\n"
+        with self._lock, open(self._path, "a") as f:
+            f.write(line)
+
+
+def _drain(
+    source: BinaryIO,
+    log: _Log,
+    mode: str,
+    byte_rate: float,
+    demuxer: str,
+    stopped: threading.Event | None = None,
+    on_first_byte=None,
+) -> None:
+    """Read a stream to its end, logging its first byte and its end."""
+    total = 0
+    while not (stopped and stopped.is_set()):
+        data = source.read1(READ_SIZE)
+        if not data:
+            break
+        if not total:
+            log.write("first-byte", mode=mode, demuxer=demuxer)
+            if on_first_byte:
+                on_first_byte()
+        total += len(data)
+        if byte_rate:
+            time.sleep(len(data) / byte_rate)
+    log.write("end", mode=mode, bytes=total, stopped=bool(stopped and stopped.is_set()))
+
+
+def _serve_ipc(path: str, log: _Log, byte_rate: float) -> None:
+    """Answer mpv IPC commands on a Unix socket until ``quit``."""
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # Like mpv, take over the path from a previous instance
+    if os.path.exists(path):
+        os.unlink(path)
+    server.bind(path)
+    server.listen(1)
+    connection, _ = server.accept()
+    send_lock = threading.Lock()
+    current = threading.Event()
+    properties: dict[str, str] = {}
+
+    def send(message: dict) -> None:
+        with send_lock:
+            try:
+                connection.sendall(json.dumps(message).encode() + b"\n")
+            except OSError:
+                pass
+
+    def play(fifo: str, demuxer: str, stopped: threading.Event) -> None:
+        send({"event": "start-file"})
+        with open(fifo, "rb") as source:
+            _drain(source, log, "ipc", byte_rate, demuxer, stopped, lambda: send({"event": "playback-restart"}))
+        send({"event": "end-file", "reason": "stop" if stopped.is_set() else "eof"})
+        send({"event": "idle"})
+
+    for line in connection.makefile("rb"):
+        try:
+            message = json.loads(line)
+        except ValueError:
+            continue
+        command = message.get("command") or [""]
+        reply = {"request_id": message.get("request_id", 0), "error": "success"}
+        if command[0] == "loadfile":
+            current.set()
+            current = threading.Event()
+            demuxer = properties.get("demuxer", "")
+            threading.Thread(target=play, args=(command[1], demuxer, current), daemon=True).start()
+        elif command[0] == "set_property":
+            properties[command[1]] = command[2]
+        elif command[0] == "stop":
+            log.write("stop", mode="ipc")
+            current.set()
+        elif command[0] == "quit":
+            send(reply)
+            return
+        send(reply)
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    log = _Log(os.environ.get("FAKE_MPV_LOG"))
+    byte_rate = float(os.environ.get("FAKE_MPV_BYTE_RATE") or 0)
+    if "-" in args:
+
+        def terminated(signum, frame) -> None:
+            log.write("stop", mode="stdin")
+            os._exit(0)
+
+        signal.signal(signal.SIGTERM, terminated)
+        demuxer = next((arg.split("=", 1)[1] for arg in args if arg.startswith("--demuxer=")), "")
+        _drain(sys.stdin.buffer, log, "stdin", byte_rate, demuxer)
+        return 0
+    for arg in args:
+        if arg.startswith("--input-ipc-server="):
+            _serve_ipc(arg.split("=", 1)[1], log, byte_rate)
+            return 0
+    print("fake mpv: expected '-' or --input-ipc-server=", file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,512 @@
+"""Offline end-to-end latency benchmark for the streaming daemon.
+
+The README's "~500ms instead of 2-3 seconds" was measured by ear. This
+runs the real daemon, unchanged, with everything outside it replaced by
+instrumented stand-ins, and measures each utterance from the moment its
+``speak`` message is sent:
+
+    TTFA   time to first audio: until the player received its first byte
+    total  until the daemon reported the utterance finished
+
+Skip scenarios send ``{"type": "skip"}`` shortly after each utterance's
+first audio and also measure
+
+    skip   skip to silence: skip sent until the player was told to stop
+           (mpv's ``stop`` command, or SIGTERM to a spawned player)
+
+along with how many API responses were closed before their end.
+
+Each scenario gets a fresh ``HOME`` holding a generated ``config.toml``,
+a local HTTPS stand-in for the API (api_standin.py; the daemon is pointed
+at it with ``api_url``) and fake_mpv.py as its mpv, which logs when the
+first bytes of each stream arrive. The daemon is started as a subprocess,
+waited for through ``NOTIFY_SOCKET``, and driven over its IPC socket one
+utterance at a time, with ``notify`` events telling when each is done.
+The first few utterances warm up the player and connections and are
+discarded.
+
+Scenarios (see ``SCENARIOS``) vary the stand-in (slow chunks, failing
+requests), the text (long replies go through the segment pipeline) and
+the player (spawned per utterance, or draining at playback speed), and
+whether each utterance is skipped.
+
+Run it with the daemon's Python and the directory holding the patched
+``elevenlabs_tts`` package on ``PYTHONPATH``:
+
+    PYTHONPATH=<dir> python3 bench/latency_bench.py
+    PYTHONPATH=<dir> python3 bench/latency_bench.py --json baseline.json
+    PYTHONPATH=<dir> python3 bench/latency_bench.py --compare baseline.json
+
+With ``--compare``, the run fails (exit status 1) if a scenario's TTFA or
+total p50/p95 got slower than the saved run by more than ``--tolerance``
+(plus ``--slack-ms``), or its failure rate went up, so it can gate a
+release. Compare runs from the same machine.
+
+Needs the ``openssl`` command (for the stand-in's certificate).
+
+Credit: COR Solutions - True Streaming Patch
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from api_standin import StandInServer
+
+PERCENTILES = (50, 95, 99)
+# Percentiles checked by --compare
+COMPARED_PERCENTILES = (50, 95)
+
+# Seconds to wait for the daemon to be ready, and for one utterance
+START_TIMEOUT = 30.0
+UTTERANCE_TIMEOUT = 60.0
+
+# Playback speed of 128 kbps MP3, for the real-time scenario
+PLAYBACK_BYTE_RATE = 16000.0
+
+WORDS = (
+    "the daemon streams audio as it arrives so the first words play while the rest "
+    "of the reply is still being synthesized and every request reuses a warm connection"
+).split()
+
+
+@dataclass
+class Scenario:
+    """One benchmark configuration."""
+
+    name: str
+    description: str
+    # StandInServer keyword arguments, on top of the run's delays
+    standin: dict = field(default_factory=dict)
+    # [streaming] options, on top of the bench's own
+    streaming: dict = field(default_factory=dict)
+    # Words per utterance
+    words: int = 12
+    # fake mpv playback speed in bytes per second (0 = drain instantly)
+    player_byte_rate: float = 0.0
+    # Seconds after first audio to send skip (None: play to the end)
+    skip_after: float | None = None
+    # Run when no --scenario is given
+    default: bool = True
+
+
+SCENARIOS = [
+    Scenario("baseline", "short replies, fast chunks"),
+    Scenario("slow-chunks", "2 KB chunks 40 ms apart", standin={"chunk_size": 2048, "chunk_interval": 0.04}),
+    Scenario("errors", "20% of requests fail", standin={"error_rate": 0.2}),
+    Scenario("long-text", "150-word replies through the segment pipeline", words=150),
+    Scenario("spawn", "mpv spawned per utterance", streaming={"persistent_player": False}),
+    Scenario("pcm", "raw PCM, no probing (audio_format = latency)", streaming={"audio_format": "latency"}),
+    Scenario(
+        "pcm-spawn",
+        "raw PCM, mpv spawned per utterance",
+        streaming={"audio_format": "latency", "persistent_player": False},
+    ),
+    Scenario(
+        "skip",
+        "skip 0.3 s into 150-word replies, player at playback speed",
+        standin={"chunk_size": 2048, "chunk_interval": 0.04},
+        words=150,
+        player_byte_rate=PLAYBACK_BYTE_RATE,
+        skip_after=0.3,
+    ),
+    Scenario(
+        "skip-spawn",
+        "the same with mpv spawned per utterance",
+        standin={"chunk_size": 2048, "chunk_interval": 0.04},
+        streaming={"persistent_player": False},
+        words=150,
+        player_byte_rate=PLAYBACK_BYTE_RATE,
+        skip_after=0.3,
+    ),
+    Scenario(
+        "realtime",
+        "player drains at playback speed",
+        player_byte_rate=PLAYBACK_BYTE_RATE,
+        default=False,
+    ),
+]
+
+
+@dataclass
+class Measurement:
+    """One utterance's result; times in seconds."""
+
+    outcome: str
+    ttfa: float | None = None
+    total: float | None = None
+    skip: float | None = None
+
+
+def _text(index: int, words: int) -> str:
+    """Different text per utterance, so nothing is served from a cache."""
+    body = " ".join(WORDS[(index + i) % len(WORDS)] for i in range(words))
+    return f"Reply number {index}: {body}."
+
+
+def _toml_value(value: object) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, str):
+        return json.dumps(value)
+    return repr(value)
+
+
+class BenchDaemon:
+    """The daemon under test, in a throwaway HOME, with a fake mpv."""
+
+    def __init__(self, directory: Path, server: StandInServer, scenario: Scenario):
+        self.home = directory / "home"
+        self.config_dir = self.home / ".claude" / "plugins" / "elevenlabs-tts"
+        self.player_log = directory / "mpv.log"
+        self.daemon_log = directory / "daemon.log"
+        self._directory = directory
+        self._server = server
+        self._scenario = scenario
+        self._process: subprocess.Popen | None = None
+        self._log_offset = 0
+
+    def write_config(self) -> None:
+        """Write config.toml and the mpv wrapper script."""
+        mpv = self._directory / "bin" / "mpv"
+        mpv.parent.mkdir(parents=True)
+        fake_mpv = Path(os.path.abspath(__file__)).with_name("fake_mpv.py")
+        mpv.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{fake_mpv}" "$@"\n')
+        mpv.chmod(0o755)
+
+        streaming = {
+            "sink": "mpv",
+            "mpv_path": str(mpv),
+            "api_url": self._server.url,
+            "api_ca_file": str(self._server.ca_file),
+            "http_pool": True,
+            "cache": False,
+            **self._scenario.streaming,
+        }
+        lines = ["[elevenlabs-tts]", 'api_key = "bench"', "auto_read = true", "sound_effects = false", "", "[streaming]"]
+        lines += [f"{key} = {_toml_value(value)}" for key, value in streaming.items()]
+        self.config_dir.mkdir(parents=True)
+        (self.config_dir / "config.toml").write_text("\n".join(lines) + "\n")
+
+    def start(self) -> None:
+        """Start the daemon and wait until it reports READY=1.
+
+        Raises:
+            RuntimeError: If it exits or times out first.
+        """
+        notify_path = self._directory / "notify.sock"
+        notify = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        notify.bind(str(notify_path))
+        notify.settimeout(0.2)
+
+        package_parent = _package_parent()
+        env = {
+            **os.environ,
+            "HOME": str(self.home),
+            "NOTIFY_SOCKET": str(notify_path),
+            "PYTHONPATH": os.pathsep.join(filter(None, [package_parent, os.environ.get("PYTHONPATH")])),
+            "FAKE_MPV_LOG": str(self.player_log),
+            "FAKE_MPV_BYTE_RATE": str(self._scenario.player_byte_rate),
+        }
+        with open(self.daemon_log, "wb") as log:
+            self._process = subprocess.Popen(
+                [sys.executable, "-m", "elevenlabs_tts.daemon", "start", "--log-level", "WARNING"],
+                env=env,
+                cwd=self._directory,
+                stdin=subprocess.DEVNULL,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+            )
+        deadline = time.monotonic() + START_TIMEOUT
+        try:
+            while time.monotonic() < deadline:
+                if self._process.poll() is not None:
+                    raise RuntimeError(f"daemon exited (code {self._process.returncode}):\n{self._log_tail()}")
+                try:
+                    if b"READY=1" in notify.recv(4096):
+                        return
+                except socket.timeout:
+                    pass
+            raise RuntimeError(f"daemon not ready after {START_TIMEOUT:.0f} s:\n{self._log_tail()}")
+        finally:
+            notify.close()
+
+    def stop(self) -> None:
+        """Stop the daemon (SIGTERM, then SIGKILL)."""
+        if self._process is None or self._process.poll() is not None:
+            return
+        self._process.terminate()
+        try:
+            self._process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+
+    def speak(self, connection: socket.socket, lines, text: str, request_id: int) -> Measurement:
+        """Send one utterance and wait for it to finish."""
+        message = {"type": "speak", "text": text, "priority": "user", "notify": True, "request_id": request_id}
+        sent = time.time()
+        connection.sendall(json.dumps(message).encode() + b"\n")
+        outcome = "timeout"
+        finished = skip_sent = None
+        skip_after = self._scenario.skip_after
+        try:
+            for line in lines:
+                reply = json.loads(line)
+                if reply.get("request_id") != request_id:
+                    continue
+                if reply.get("error") not in (None, "success"):
+                    outcome = f"rejected: {reply['error']}"
+                    break
+                if reply.get("event") == "first-audio" and skip_after is not None:
+                    time.sleep(skip_after)
+                    skip_sent = time.time()
+                    connection.sendall(json.dumps({"type": "skip"}).encode() + b"\n")
+                if reply.get("event") == "finished":
+                    finished = time.time()
+                    outcome = reply.get("outcome", "")
+                    break
+        except OSError:
+            # Timed out; the connection is no use for later utterances
+            pass
+
+        first_byte = stopped = None
+        for event in self._player_events():
+            if event["event"] == "first-byte" and event["time"] >= sent:
+                first_byte = event["time"] if first_byte is None else min(first_byte, event["time"])
+            if event["event"] == "stop" and skip_sent is not None and event["time"] >= skip_sent:
+                stopped = event["time"] if stopped is None else min(stopped, event["time"])
+        if outcome != ("played" if skip_after is None else "interrupted"):
+            return Measurement(outcome)
+        return Measurement(
+            outcome,
+            ttfa=first_byte - sent if first_byte is not None else None,
+            total=finished - sent,
+            skip=stopped - skip_sent if stopped is not None and skip_sent is not None else None,
+        )
+
+    def _player_events(self) -> list[dict]:
+        """Events the fake mpv logged since the last call."""
+        try:
+            with open(self.player_log) as f:
+                f.seek(self._log_offset)
+                data = f.read()
+                self._log_offset = f.tell()
+        except FileNotFoundError:
+            return []
+        return [json.loads(line) for line in data.splitlines() if line.strip()]
+
+    def _log_tail(self, lines: int = 20) -> str:
+        try:
+            return "\n".join(self.daemon_log.read_text(errors="replace").splitlines()[-lines:])
+        except OSError:
+            return ""
+
+
+def run_scenario(
+    scenario: Scenario,
+    utterances: int,
+    warmup: int,
+    handshake_delay: float,
+    first_byte_delay: float,
+) -> dict:
+    """Run one scenario and summarize it."""
+    standin = {"seed": 1, **scenario.standin}
+    with tempfile.TemporaryDirectory(prefix="tts-bench-") as directory, StandInServer(
+        handshake_delay, first_byte_delay, **standin
+    ) as server:
+        daemon = BenchDaemon(Path(directory), server, scenario)
+        daemon.write_config()
+        daemon.start()
+        measurements: list[Measurement] = []
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+                connection.connect(str(daemon.config_dir / "daemon.sock"))
+                connection.settimeout(UTTERANCE_TIMEOUT)
+                lines = connection.makefile("rb")
+                for index in range(warmup + utterances):
+                    measurement = daemon.speak(connection, lines, _text(index, scenario.words), index + 1)
+                    if index >= warmup:
+                        measurements.append(measurement)
+        finally:
+            daemon.stop()
+        requests, aborted = server.requests, server.aborted
+
+    expected = "played" if scenario.skip_after is None else "interrupted"
+    played = [m for m in measurements if m.outcome == expected]
+    outcomes: dict[str, int] = {}
+    for m in measurements:
+        if m.outcome != expected:
+            outcomes[m.outcome] = outcomes.get(m.outcome, 0) + 1
+    result = {
+        "description": scenario.description,
+        "utterances": len(measurements),
+        "failed": len(measurements) - len(played),
+        "outcomes": outcomes,
+        "requests": requests,
+        "ttfa_ms": summarize([m.ttfa for m in played if m.ttfa is not None]),
+        "total_ms": summarize([m.total for m in played if m.total is not None]),
+    }
+    if scenario.skip_after is not None:
+        result["skip_ms"] = summarize([m.skip for m in played if m.skip is not None])
+        result["aborted"] = aborted
+    return result
+
+
+def summarize(values: list[float]) -> dict:
+    """Exact percentiles (nearest rank) and mean, in milliseconds."""
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+    summary: dict = {"count": len(ordered), "mean": round(sum(ordered) / len(ordered) * 1000, 2)}
+    for percent in PERCENTILES:
+        rank = max(1, math.ceil(percent / 100 * len(ordered)))
+        summary[f"p{percent}"] = round(ordered[rank - 1] * 1000, 2)
+    return summary
+
+
+def compare(results: dict, baseline: dict, tolerance: float, slack_ms: float) -> list[str]:
+    """Regressions of ``results`` against a saved run.
+
+    Returns:
+        One line per metric that got worse than allowed (empty: none).
+    """
+    regressions = []
+    for name, result in results["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        for metric in ("ttfa_ms", "total_ms", "skip_ms"):
+            if metric not in before or metric not in result:
+                continue
+            for percent in COMPARED_PERCENTILES:
+                key = f"p{percent}"
+                old, new = before[metric].get(key), result[metric].get(key)
+                if old is None or new is None:
+                    continue
+                allowed = old * (1 + tolerance) + slack_ms
+                if new > allowed:
+                    regressions.append(
+                        f"{name}: {metric[:-3]} {key} {new:.1f} ms, was {old:.1f} ms (allowed {allowed:.1f})"
+                    )
+        old_rate = before["failed"] / max(1, before["utterances"])
+        new_rate = result["failed"] / max(1, result["utterances"])
+        if new_rate > old_rate + tolerance / 2:
+            regressions.append(f"{name}: {new_rate:.0%} of utterances failed, was {old_rate:.0%}")
+    return regressions
+
+
+def _format_summary(summary: dict) -> str:
+    if not summary.get("count"):
+        return f"{'-':>30}"
+    cells = " / ".join(f"{summary[f'p{p}']:.0f}" for p in PERCENTILES)
+    return f"{cells + ' ms':>22} ({summary['mean']:.0f})"
+
+
+def print_results(results: dict) -> None:
+    print(f"{'':14}{'n':>4}{'failed':>8}{'TTFA p50 / p95 / p99 (mean)':>30}{'total p50 / p95 / p99 (mean)':>30}")
+    for name, result in results["scenarios"].items():
+        print(
+            f"{name:14}{result['utterances']:>4}{result['failed']:>8}"
+            f"  {_format_summary(result['ttfa_ms'])}  {_format_summary(result['total_ms'])}"
+        )
+    for name, result in results["scenarios"].items():
+        if "skip_ms" in result:
+            print(
+                f"{name} skip to silence: {_format_summary(result['skip_ms']).strip()}, "
+                f"{result['aborted']} of {result['requests']} API responses closed early"
+            )
+    for name, result in results["scenarios"].items():
+        if result["outcomes"]:
+            counts = ", ".join(f"{count} {outcome}" for outcome, count in sorted(result["outcomes"].items()))
+            print(f"{name} failures: {counts}")
+
+
+def _package_parent() -> str | None:
+    """The directory holding the elevenlabs_tts package, if it is importable."""
+    spec = importlib.util.find_spec("elevenlabs_tts")
+    if spec is None or not spec.submodule_search_locations:
+        return None
+    return os.path.dirname(os.path.abspath(list(spec.submodule_search_locations)[0]))
+
+
+def main() -> int:
+    names = [scenario.name for scenario in SCENARIOS]
+    parser = argparse.ArgumentParser(description="Offline end-to-end latency benchmark for the TTS daemon")
+    parser.add_argument("--scenario", action="append", choices=names, help="Scenario to run (repeatable)")
+    parser.add_argument("--list", action="store_true", help="List the scenarios")
+    parser.add_argument("--utterances", type=int, default=20, help="Measured utterances per scenario")
+    parser.add_argument("--warmup", type=int, default=2, help="Utterances run first and discarded")
+    parser.add_argument("--handshake-ms", type=float, default=50.0, help="Simulated connection setup time")
+    parser.add_argument("--server-ms", type=float, default=150.0, help="Simulated server time to first byte")
+    parser.add_argument("--json", type=Path, help="Write the results here")
+    parser.add_argument("--compare", type=Path, help="Fail on regressions against these saved results")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown as a fraction")
+    parser.add_argument("--slack-ms", type=float, default=20.0, help="Allowed slowdown in ms on top")
+    args = parser.parse_args()
+
+    if args.list:
+        for scenario in SCENARIOS:
+            print(f"{scenario.name:14}{scenario.description}{'' if scenario.default else ' (not run by default)'}")
+        return 0
+
+    if _package_parent() is None:
+        print("elevenlabs_tts not found: put the directory holding the patched package on PYTHONPATH")
+        return 1
+
+    chosen = [s for s in SCENARIOS if (s.name in args.scenario if args.scenario else s.default)]
+    results: dict = {
+        "settings": {
+            "utterances": args.utterances,
+            "warmup": args.warmup,
+            "handshake_ms": args.handshake_ms,
+            "server_ms": args.server_ms,
+            "python": platform.python_version(),
+            "machine": platform.node(),
+        },
+        "scenarios": {},
+    }
+    print(
+        f"{args.utterances} utterances per scenario after {args.warmup} warm-up, "
+        f"stand-in {args.handshake_ms:.0f} ms handshake, {args.server_ms:.0f} ms server time"
+    )
+    for scenario in chosen:
+        print(f"  {scenario.name}: {scenario.description}...", flush=True)
+        try:
+            results["scenarios"][scenario.name] = run_scenario(
+                scenario, args.utterances, args.warmup, args.handshake_ms / 1000, args.server_ms / 1000
+            )
+        except RuntimeError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 2
+    print()
+    print_results(results)
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"\nResults written to {args.json}")
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.tolerance, args.slack_ms)
+        if regressions:
+            print(f"\nRegressions against {args.compare}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regressions against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
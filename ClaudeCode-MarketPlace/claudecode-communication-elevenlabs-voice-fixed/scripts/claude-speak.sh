@@ -2,14 +2,61 @@
 # Quick speak command for Claude to use inline
 # Usage: ./claude-speak.sh "Text to speak"
 # Or: echo "Text" | ./claude-speak.sh
+# Or: some-command | ./claude-speak.sh --lines   # Each line spoken separately
+#
+# The first call starts a resident relay (speak.py --relay) reading a FIFO.
+# Later calls just write their text into the FIFO, so speaking costs a pipe
+# write instead of starting Python. Stop it with: ./claude-speak.sh --stop-relay
+# The relay is only used where flock(1) is installed (not macOS by default).
 
-SOCKET_PATH="$HOME/.claude/plugins/elevenlabs-tts/daemon.sock"
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+TTS_DIR="$HOME/.claude/plugins/elevenlabs-tts"
+SOCKET_PATH="$TTS_DIR/daemon.sock"
+FIFO_PATH="$TTS_DIR/speak-relay.fifo"
+RELAY_LOCK_PATH="$TTS_DIR/speak-relay.lock"
+
+# Sent like auto-read, as it was before the relay
+PRIORITY=auto
+
+# Writes up to this many bytes into a FIFO are never interleaved with
+# another caller's (POSIX PIPE_BUF minimum); longer texts go direct
+ATOMIC_WRITE_BYTES=512
+
+byte_length() {
+    local LC_ALL=C
+    BYTES=${#1}
+}
+
+have_flock() {
+    command -v flock > /dev/null
+}
+
+# The relay holds an exclusive lock on RELAY_LOCK_PATH while it runs, so a
+# stale or reused PID can't pass for it
+relay_running() {
+    have_flock && [ -p "$FIFO_PATH" ] && [ -e "$RELAY_LOCK_PATH" ] || return 1
+    ! flock -n "$RELAY_LOCK_PATH" true
+}
+
+# Opened read-write, the FIFO never blocks on open, even if the relay has
+# exited since it was checked (that one line is then lost, not waited on)
+write_to_relay() {
+    { printf '%s\n' "$LINE" >&3; } 3<> "$FIFO_PATH"
+}
+
+if [ "$1" = "--stop-relay" ]; then
+    exec python3 "$SCRIPT_DIR/speak.py" --stop-relay "$FIFO_PATH"
+fi
 
 if [ ! -S "$SOCKET_PATH" ]; then
     echo "TTS daemon not running" >&2
     exit 1
 fi
 
+if [ "$1" = "--lines" ]; then
+    exec python3 "$SCRIPT_DIR/speak.py" --priority "$PRIORITY" --lines
+fi
+
 # Get text from argument or stdin
 if [ -n "$1" ]; then
     TEXT="$*"
@@ -17,13 +64,20 @@ else
     TEXT=$(cat)
 fi
 
-# Send to daemon via Python (most reliable for JSON)
-python3 -c "
-import socket, json
-s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-s.connect('$SOCKET_PATH')
-s.sendall(json.dumps({'type': 'speak', 'text': '''$TEXT'''}).encode() + b'\n')
-s.close()
-" 2>/dev/null
+# One line per utterance in the FIFO
+LINE="${TEXT//$'\n'/ }"
+byte_length "$LINE"
+
+if [ "$BYTES" -le "$ATOMIC_WRITE_BYTES" ] && relay_running && write_to_relay; then
+    :
+else
+    # Text goes to Python on stdin, never spliced into source code
+    printf '%s' "$TEXT" | python3 "$SCRIPT_DIR/speak.py" --priority "$PRIORITY" > /dev/null 2>&1
+    # Concurrent first calls may both start one; all but one exit at once
+    if have_flock && ! relay_running; then
+        nohup python3 "$SCRIPT_DIR/speak.py" --priority "$PRIORITY" --relay "$FIFO_PATH" \
+            < /dev/null > /dev/null 2>&1 &
+    fi
+fi
 
 echo "Speaking: ${TEXT:0:50}..."
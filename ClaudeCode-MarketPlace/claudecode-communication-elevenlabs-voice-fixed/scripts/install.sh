@@ -77,6 +77,12 @@ else
 
     if [ -f "$PATCH_FILE" ]; then
         cp "$PATCH_FILE" "$TTS_DAEMON"
+        # Supporting modules go next to daemon.py
+        for MODULE in "$SCRIPT_DIR"/../tts-patch/*.py; do
+            if [ "$MODULE" != "$PATCH_FILE" ]; then
+                cp "$MODULE" "$(dirname "$TTS_DAEMON")/"
+            fi
+        done
         echo "✅ Applied true streaming patch"
     else
         echo "⚠️  Patch file not found: $PATCH_FILE"
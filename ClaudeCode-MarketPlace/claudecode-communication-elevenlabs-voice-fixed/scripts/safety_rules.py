@@ -6,11 +6,34 @@ when someone in your environment says something that sounds like a command.
 This module provides a safety filter that checks voice input BEFORE it's
 sent to Claude Code, blocking commands that could cause data loss or
 system damage.
+
+The filter sits between STT and Claude, so all dangerous patterns are
+compiled once and indexed by keyword (see RuleMatcher): a check splits
+the text into words once and only runs the rules whose keyword occurs.
+
+Benchmark: python3 safety_rules.py --bench
 """
 
 import re
 import logging
-from typing import Optional, Tuple
+import sys
+import timeit
+from collections import deque
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+try:
+    import tomllib
+except ImportError:  # Python 3.10
+    try:
+        import tomli as tomllib  # type: ignore[no-redef]
+    except ImportError:
+        tomllib = None  # type: ignore[assignment]
 
 logger = logging.getLogger(__name__)
 
@@ -80,21 +103,339 @@ CAUTION_WORDS = [
 ]
 
 
+# STT configs holding the [safety] table, local first
+STT_CONFIG_PATHS = [
+    Path.cwd() / ".claude" / "plugins" / "elevenlabs-stt" / "config.toml",
+    Path.home() / ".claude" / "plugins" / "elevenlabs-stt" / "config.toml",
+]
+
+# Up to this many keywords, a scan first checks each keyword's first word
+# as a plain substring, then as a whole word; most commands contain none
+# and skip the automaton
+PREFILTER_MAX_WORDS = 64
+
+# Word tokens of the checked text, and a single word character
+_WORD = re.compile(r"\w+")
+_WORD_CHAR = re.compile(r"\w")
+
+
+def _is_word_literal(item) -> bool:
+    op, av = item
+    return op is sre_parse.LITERAL and _WORD_CHAR.fullmatch(chr(av)) is not None
+
+
+def _is_break(item, before: bool) -> bool:
+    """True if the parsed item guarantees a word boundary next to a keyword."""
+    if item is None:
+        return False
+    op, av = item
+    if op is sre_parse.LITERAL:
+        return _WORD_CHAR.fullmatch(chr(av)) is None
+    if op is sre_parse.AT:
+        edges = (sre_parse.AT_BEGINNING, sre_parse.AT_BEGINNING_STRING) if before else (
+            sre_parse.AT_END, sre_parse.AT_END_STRING)
+        return av is sre_parse.AT_BOUNDARY or av in edges
+    if op is sre_parse.IN:
+        return all(
+            (member_op is sre_parse.CATEGORY and member_av in (
+                sre_parse.CATEGORY_SPACE, sre_parse.CATEGORY_NOT_WORD))
+            or (member_op is sre_parse.LITERAL and _WORD_CHAR.fullmatch(chr(member_av)) is None)
+            for member_op, member_av in av
+        )
+    if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+        min_count, _, body = av
+        return min_count >= 1 and len(body) == 1 and _is_break(body[0], before)
+    return False
+
+
+def _group_words(item) -> Optional[set]:
+    """Whole-word alternatives of a group like ``(delete|remove|rm)``."""
+    op, av = item
+    if op is not sre_parse.SUBPATTERN:
+        return None
+    items = list(av[-1])
+    # The parser factors a shared prefix out of the alternatives
+    prefix_len = 0
+    while prefix_len < len(items) and _is_word_literal(items[prefix_len]):
+        prefix_len += 1
+    prefix = "".join(chr(av) for _, av in items[:prefix_len])
+    rest = items[prefix_len:]
+    if not rest:
+        return {prefix.lower()} if prefix else None
+    if len(rest) != 1 or rest[0][0] is not sre_parse.BRANCH:
+        return None
+    words = set()
+    for alternative in rest[0][1][1]:
+        alternative = list(alternative)
+        if not all(_is_word_literal(part) for part in alternative):
+            return None
+        words.add((prefix + "".join(chr(av) for _, av in alternative)).lower())
+    return words if all(words) else None
+
+
+def extract_keywords(pattern: str) -> Optional[set]:
+    """Find words at least one of which must appear as a whole word in any match.
+
+    Looks at the top level of the parsed pattern for a word literal (or a
+    group of word alternatives) with a guaranteed word boundary on both
+    sides, e.g. ``git`` in ``\\bgit\\s+push\\b``. Of several, the one with
+    the longest shortest word is picked as the most selective.
+
+    Args:
+        pattern: Regex pattern
+
+    Returns:
+        Lowercased keywords, or None if no such literal exists.
+    """
+    items = list(sre_parse.parse(pattern, re.IGNORECASE))
+    best = None
+    i = 0
+    while i < len(items):
+        if _is_word_literal(items[i]):
+            j = i
+            while j < len(items) and _is_word_literal(items[j]):
+                j += 1
+            words = {"".join(chr(av) for _, av in items[i:j]).lower()}
+        else:
+            j = i + 1
+            words = _group_words(items[i])
+        before = items[i - 1] if i > 0 else None
+        after = items[j] if j < len(items) else None
+        if words and _is_break(before, True) and _is_break(after, False):
+            if best is None or min(map(len, words)) > min(map(len, best)):
+                best = words
+        i = j
+    return best
+
+
+class RuleMatcher:
+    """Dangerous patterns indexed by keyword for a single scan of the text.
+
+    Every pattern is compiled once. Patterns with a required whole-word
+    keyword are indexed under it; the text is split into words in one
+    pass and only rules whose keyword occurs are run, in rule order.
+    Rules without a keyword are always run. The cost of a check therefore
+    grows with the rules whose keyword occurs in the text, not with the
+    whole rule set, and the result is the same as trying every rule in
+    order.
+    """
+
+    def __init__(self, rules: List[Tuple[str, str]] = ()):
+        self._rules: List[Tuple[str, str]] = []
+        self._compiled: List[re.Pattern] = []
+        self._index: dict = {}
+        self._unindexed: List[int] = []
+        for pattern, reason in rules:
+            self.add(pattern, reason)
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def add(self, pattern: str, reason: str) -> None:
+        """Compile and index one rule; existing rules are left untouched.
+
+        Args:
+            pattern: Regex pattern to match
+            reason: Description of why it's dangerous
+
+        Raises:
+            re.error: If the pattern is not a valid regex
+        """
+        compiled = re.compile(pattern, re.IGNORECASE)
+        index = len(self._rules)
+        self._rules.append((pattern, reason))
+        self._compiled.append(compiled)
+
+        keywords = extract_keywords(pattern)
+        if keywords is None:
+            self._unindexed.append(index)
+        else:
+            for keyword in keywords:
+                self._index.setdefault(keyword, []).append(index)
+
+    def search(self, text: str) -> Optional[Tuple[str, str]]:
+        """Find the first rule (in rule order) matching the text.
+
+        Args:
+            text: Text to check (case is ignored)
+
+        Returns:
+            (pattern, reason) of the matching rule, or None
+        """
+        candidates = set(self._unindexed)
+        for word in set(_WORD.findall(text.lower())):
+            hits = self._index.get(word)
+            if hits:
+                candidates.update(hits)
+
+        for index in sorted(candidates):
+            if self._compiled[index].search(text):
+                return self._rules[index]
+        return None
+
+
+class KeywordHit(NamedTuple):
+    """A caution word found in a command."""
+
+    word: str
+    start: int
+    end: int
+
+
+class KeywordScanner:
+    """Aho-Corasick automaton over word tokens.
+
+    Keywords are single words or multi-word phrases and only match whole
+    words, so "all" doesn't fire on "install" or "clear" on "nuclear".
+    One pass over the tokens of the text reports every hit with its
+    character span, however many keywords there are. For small
+    vocabularies, text that doesn't contain any keyword's first word is
+    answered with a plain substring loop instead.
+    """
+
+    def __init__(self, words: List[str] = ()):
+        self._words: List[str] = []
+        self._first_tokens: set = set()
+        self._lengths: List[int] = []
+        self._goto: List[dict] = [{}]
+        self._output: List[List[int]] = [[]]
+        self._fail: List[int] = [0]
+        self._matches: List[List[int]] = [[]]
+        self._built = True
+        for word in words:
+            self.add(word)
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    def add(self, word: str) -> None:
+        """Add a keyword; failure links are rebuilt on the next scan.
+
+        Args:
+            word: Word or phrase (case is ignored, punctuation separates words)
+        """
+        tokens = _WORD.findall(word.lower())
+        if not tokens:
+            return
+
+        state = 0
+        for token in tokens:
+            next_state = self._goto[state].get(token)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._output.append([])
+                self._goto[state][token] = next_state
+            state = next_state
+        if self._output[state]:
+            return  # Same words already present
+
+        self._output[state].append(len(self._words))
+        self._words.append(word)
+        self._first_tokens.add(tokens[0])
+        self._lengths.append(len(tokens))
+        self._built = False
+
+    def scan(self, text: str) -> List[KeywordHit]:
+        """Find every keyword occurrence in the text.
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            Hits in the order they end in the text.
+        """
+        if not self._built:
+            self._build()
+
+        lowered = text.lower()
+        if len(self._first_tokens) <= PREFILTER_MAX_WORDS:
+            found = [token for token in self._first_tokens if token in lowered]
+            if not found or set(found).isdisjoint(_WORD.findall(lowered)):
+                return []
+
+        hits = []
+        starts: List[int] = []
+        state = 0
+        for match in _WORD.finditer(lowered):
+            token = match.group()
+            starts.append(match.start())
+            while state and token not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(token, 0)
+            for index in self._matches[state]:
+                hits.append(KeywordHit(self._words[index], starts[-self._lengths[index]], match.end()))
+        return hits
+
+    def _build(self) -> None:
+        """Compute failure links breadth-first and collect each state's matches."""
+        self._fail = [0] * len(self._goto)
+        self._matches = [list(output) for output in self._output]
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, next_state in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(token, 0)
+                # e.g. "delete" also ends where "force delete" does
+                self._matches[next_state] += self._matches[self._fail[next_state]]
+                queue.append(next_state)
+        self._built = True
+
+
+# Matcher for DANGEROUS_PATTERNS, shared by all filters
+_dangerous_matcher: Optional[RuleMatcher] = None
+
+
+def _get_dangerous_matcher() -> RuleMatcher:
+    """Get the matcher for DANGEROUS_PATTERNS, rebuilding it if edited directly."""
+    global _dangerous_matcher
+    if _dangerous_matcher is None or len(_dangerous_matcher) != len(DANGEROUS_PATTERNS):
+        _dangerous_matcher = RuleMatcher(DANGEROUS_PATTERNS)
+    return _dangerous_matcher
+
+
 class VoiceSafetyFilter:
     """Filters voice commands for dangerous patterns before execution."""
 
-    def __init__(self, enabled: bool = True, strict_mode: bool = False):
+    def __init__(
+        self,
+        enabled: bool = True,
+        strict_mode: bool = False,
+        caution_words: Optional[List[str]] = None,
+    ):
         """Initialize the safety filter.
 
         Args:
             enabled: Whether safety filtering is active
             strict_mode: If True, also blocks caution words (more restrictive)
+            caution_words: Extra caution words or phrases on top of CAUTION_WORDS
         """
         self.enabled = enabled
         self.strict_mode = strict_mode
+        self._extra_caution_words = list(caution_words or [])
+        self._caution_scanner: Optional[KeywordScanner] = None
+        self._caution_base_count = 0
         self._blocked_count = 0
         self._caution_count = 0
 
+    def find_caution_words(self, text: str) -> List[KeywordHit]:
+        """Find every caution word in the text, with its position.
+
+        Args:
+            text: The voice command text
+
+        Returns:
+            Hits in text order (whole words only)
+        """
+        # Rebuilt if CAUTION_WORDS was extended since the last check
+        if self._caution_scanner is None or self._caution_base_count != len(CAUTION_WORDS):
+            self._caution_scanner = KeywordScanner(CAUTION_WORDS + self._extra_caution_words)
+            self._caution_base_count = len(CAUTION_WORDS)
+        return self._caution_scanner.scan(text)
+
     def check_command(self, text: str) -> Tuple[bool, Optional[str], Optional[str]]:
         """Check if a voice command is safe to execute.
 
@@ -110,21 +451,20 @@ class VoiceSafetyFilter:
         if not self.enabled:
             return (True, None, None)
 
-        text_lower = text.lower()
-
         # Check dangerous patterns (BLOCK)
-        for pattern, reason in DANGEROUS_PATTERNS:
-            if re.search(pattern, text_lower, re.IGNORECASE):
-                self._blocked_count += 1
-                logger.warning(
-                    "BLOCKED dangerous voice command: '%s' (reason: %s)",
-                    text[:100], reason
-                )
-                return (False, reason, None)
+        match = _get_dangerous_matcher().search(text)
+        if match is not None:
+            _, reason = match
+            self._blocked_count += 1
+            logger.warning(
+                "BLOCKED dangerous voice command: '%s' (reason: %s)",
+                text[:100], reason
+            )
+            return (False, reason, None)
 
         # Check caution words (WARN)
         warning = None
-        caution_found = [w for w in CAUTION_WORDS if w in text_lower]
+        caution_found = list(dict.fromkeys(hit.word for hit in self.find_caution_words(text)))
         if caution_found:
             self._caution_count += 1
             warning = f"Voice command contains caution words: {', '.join(caution_found)}"
@@ -173,11 +513,40 @@ class VoiceSafetyFilter:
 _safety_filter: Optional[VoiceSafetyFilter] = None
 
 
+def load_caution_words(config_paths: List[Path] = STT_CONFIG_PATHS) -> List[str]:
+    """Read ``caution_words`` from the ``[safety]`` table of the STT config.
+
+    Args:
+        config_paths: Configs to try in order; the first existing one is used
+
+    Returns:
+        The configured words, or an empty list if unset or unreadable
+    """
+    if tomllib is None:
+        return []
+    for config_path in config_paths:
+        if not config_path.exists():
+            continue
+        try:
+            with config_path.open("rb") as f:
+                words = tomllib.load(f).get("safety", {}).get("caution_words", [])
+        except (OSError, ValueError) as e:
+            logger.warning("Could not read safety settings: %s", e)
+            return []
+        if not isinstance(words, list) or not all(isinstance(w, str) for w in words):
+            logger.warning("Ignoring caution_words in %s: not a list of strings", config_path)
+            return []
+        return words
+    return []
+
+
 def get_safety_filter() -> VoiceSafetyFilter:
-    """Get the global safety filter instance."""
+    """Get the global safety filter instance, with configured caution words."""
     global _safety_filter
     if _safety_filter is None:
-        _safety_filter = VoiceSafetyFilter(enabled=True, strict_mode=False)
+        _safety_filter = VoiceSafetyFilter(
+            enabled=True, strict_mode=False, caution_words=load_caution_words()
+        )
     return _safety_filter
 
 
@@ -221,6 +590,10 @@ def filter_voice_input(text: str) -> Optional[str]:
 # custom_allows = [
 #     "delete test files",  # Override block for specific safe commands
 # ]
+# caution_words = [
+#     "production",  # Whole words or phrases, warned about (blocked in strict mode)
+#     "customer data",
+# ]
 
 def add_custom_pattern(pattern: str, reason: str) -> None:
     """Add a custom dangerous pattern at runtime.
@@ -228,12 +601,112 @@ def add_custom_pattern(pattern: str, reason: str) -> None:
     Args:
         pattern: Regex pattern to match
         reason: Description of why it's dangerous
+
+    Raises:
+        re.error: If the pattern is not a valid regex
     """
+    matcher = _get_dangerous_matcher()
+    matcher.add(pattern, reason)
     DANGEROUS_PATTERNS.append((pattern, reason))
     logger.info("Added custom safety pattern: %s (%s)", pattern, reason)
 
 
+def add_caution_word(word: str) -> None:
+    """Add a caution word or phrase at runtime.
+
+    Args:
+        word: Word or phrase to warn about (matched as whole words)
+    """
+    CAUTION_WORDS.append(word)
+    logger.info("Added caution word: %s", word)
+
+
+# ============================================================
+# BENCHMARK
+# ============================================================
+
+def _benchmark(rule_counts=(40, 400, 4000), repeat: int = 200) -> None:
+    """Print per-check latency of the old loops vs the indexed matchers.
+
+    Rule sets are DANGEROUS_PATTERNS padded with synthetic rules keyed on
+    words the commands contain, so the indexed matcher has to run a share
+    of them on every check, and caution word lists are padded with
+    synthetic words. Safe commands are timed, as they have to be checked
+    against every rule.
+    """
+    commands = [
+        "create a new file called notes",
+        "help me write a function that parses the config",
+        "show me the logs from yesterday and summarise the errors please",
+    ]
+
+    # Synthetic rules are indexed under one of these and never match
+    keywords = ["file", "notes", "function", "config", "logs", "errors", "write", "yesterday"]
+
+    print("Voice Safety Filter Benchmark (per check, safe commands)")
+    print(f"{'rules':>6}  {'per-pattern loop':>17}  {'indexed':>10}  {'speedup':>8}")
+    for count in rule_counts:
+        rules = list(DANGEROUS_PATTERNS)
+        index = 0
+        while len(rules) < count:
+            keyword = keywords[index % len(keywords)]
+            rules.append((rf'\b{keyword}\s+#{index}', f'synthetic {index}'))
+            index += 1
+        rules = rules[:count]
+
+        def legacy():
+            for command in commands:
+                lowered = command.lower()
+                for pattern, _ in rules:
+                    if re.search(pattern, lowered, re.IGNORECASE):
+                        break
+
+        matcher = RuleMatcher(rules)
+
+        def indexed():
+            for command in commands:
+                matcher.search(command)
+
+        # re's internal cache holds 512 patterns; larger sets recompile
+        # every call in the legacy loop, as they would in production
+        loops = max(1, repeat * 40 // count)
+        legacy_us = min(timeit.repeat(legacy, number=loops, repeat=3)) / (loops * len(commands)) * 1e6
+        indexed_us = min(timeit.repeat(indexed, number=loops, repeat=3)) / (loops * len(commands)) * 1e6
+        print(f"{count:>6}  {legacy_us:>14.1f} us  {indexed_us:>7.1f} us  {legacy_us / indexed_us:>7.1f}x")
+
+    print()
+    print("Caution Word Scan Benchmark (per check)")
+    print(f"{'words':>6}  {'substring loop':>17}  {'scanner':>10}  {'speedup':>8}")
+    for count in (len(CAUTION_WORDS), 160, 1600):
+        words = list(CAUTION_WORDS)
+        index = 0
+        while len(words) < count:
+            words.append(f"site{index}")
+            index += 1
+
+        def substring():
+            for command in commands:
+                lowered = command.lower()
+                [w for w in words if w in lowered]
+
+        scanner = KeywordScanner(words)
+        scanner.scan("")  # build outside the timed loop
+
+        def automaton():
+            for command in commands:
+                scanner.scan(command)
+
+        loops = repeat * 10
+        substring_us = min(timeit.repeat(substring, number=loops, repeat=3)) / (loops * len(commands)) * 1e6
+        automaton_us = min(timeit.repeat(automaton, number=loops, repeat=3)) / (loops * len(commands)) * 1e6
+        print(f"{count:>6}  {substring_us:>14.1f} us  {automaton_us:>7.1f} us  {substring_us / automaton_us:>7.1f}x")
+
+
 if __name__ == "__main__":
+    if "--bench" in sys.argv[1:]:
+        _benchmark()
+        sys.exit(0)
+
     # Test the safety filter
     test_commands = [
         "delete all files",
@@ -21,7 +21,8 @@ from pathlib import Path
 HOME = Path.home()
 SCRIPT_DIR = Path(__file__).parent.parent
 CONFIG_TEMPLATES = SCRIPT_DIR / "config-templates"
-TTS_PATCH = SCRIPT_DIR / "tts-patch" / "daemon_streaming.py"
+TTS_PATCH_DIR = SCRIPT_DIR / "tts-patch"
+TTS_PATCH = TTS_PATCH_DIR / "daemon_streaming.py"
 
 # Installation locations
 GLOBAL_PLUGIN_DIR = HOME / ".claude" / "plugins"
@@ -195,9 +196,12 @@ def apply_streaming_patch() -> bool:
         shutil.copy(daemon_path, backup_path)
         print(f"✅ Backed up original to {backup_path.name}")
 
-    # Apply patch
+    # Apply patch (daemon plus its supporting modules)
     if TTS_PATCH.exists():
         shutil.copy(TTS_PATCH, daemon_path)
+        for module in TTS_PATCH_DIR.glob("*.py"):
+            if module != TTS_PATCH:
+                shutil.copy(module, daemon_path.parent / module.name)
         print("✅ True streaming patch applied")
         print("   Audio now plays as chunks arrive (~500ms latency)")
         return True
@@ -4,27 +4,35 @@
 Usage:
     python3 speak.py "Hello, this is a test"
     echo "Pipe input" | python3 speak.py
+    some-command | python3 speak.py --stream  # Speak lines as they arrive
+    some-command | python3 speak.py --lines   # Speak each line on its own
+    python3 speak.py --relay FIFO  # Speak each line written to FIFO
+    python3 speak.py --stop-relay FIFO
+    python3 speak.py --priority auto ...  # Any of the above at another priority
     python3 speak.py  # Interactive mode
 
 COR Solutions - ElevenLabs Voice Suite
 """
 
-import json
-import socket
+import fcntl
+import os
+import signal
+import stat
 import sys
+import uuid
 from pathlib import Path
+from typing import BinaryIO, Iterable
 
+from tts_client import TTSClient, TTSClientError, get_socket_path
 
-def get_socket_path() -> Path:
-    """Get the TTS daemon socket path."""
-    return Path.home() / ".claude" / "plugins" / "elevenlabs-tts" / "daemon.sock"
 
-
-def speak(text: str) -> bool:
+def speak(text: str, client: TTSClient | None = None, priority: str = "user") -> bool:
     """Send text to TTS daemon.
 
     Args:
         text: Text to speak.
+        client: Open connection to reuse (a new one is opened if None).
+        priority: Queue priority ("cue", "user" or "auto").
 
     Returns:
         True if successful, False otherwise.
@@ -38,24 +46,192 @@ def speak(text: str) -> bool:
         return False
 
     try:
-        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-        client.connect(str(socket_path))
+        if client is not None:
+            client.speak(text, priority)
+        else:
+            with TTSClient() as new_client:
+                new_client.speak(text, priority)
+        return True
+    except TTSClientError as e:
+        print(f"Error: {e}")
+        return False
+
+
+def speak_stream(pieces: Iterable[str], priority: str = "user") -> bool:
+    """Send text to TTS daemon piece by piece as it is produced.
+
+    The daemon starts speaking once the first sentence is complete,
+    without waiting for the rest.
+
+    Args:
+        pieces: Text pieces in order (e.g. lines read from a pipe).
+        priority: Queue priority ("cue", "user" or "auto").
+
+    Returns:
+        True if successful, False otherwise.
+    """
+    socket_path = get_socket_path()
+
+    if not socket_path.exists():
+        print(f"Error: TTS daemon not running (socket not found: {socket_path})")
+        return False
 
-        message = {"type": "speak", "text": text}
-        client.sendall(json.dumps(message).encode() + b"\n")
-        client.close()
+    stream_id = uuid.uuid4().hex
 
+    try:
+        with TTSClient() as client:
+            client.send({"type": "speak_begin", "id": stream_id, "priority": priority})
+            try:
+                for piece in pieces:
+                    if piece:
+                        client.send({"type": "speak_chunk", "id": stream_id, "text": piece})
+            finally:
+                client.send({"type": "speak_end", "id": stream_id})
         return True
-    except Exception as e:
+    except TTSClientError as e:
         print(f"Error: {e}")
         return False
 
 
+def speak_lines(lines: Iterable[bytes], client: TTSClient, priority: str = "user") -> None:
+    """Speak each line as a separate utterance over one connection.
+
+    A line the daemon could not be sent is reported and skipped.
+
+    Args:
+        lines: Newline-terminated UTF-8 texts.
+        client: Open connection to the daemon.
+        priority: Queue priority ("cue", "user" or "auto").
+    """
+    for line in lines:
+        text = line.decode("utf-8", errors="replace").strip()
+        if not text:
+            continue
+        try:
+            client.speak(text, priority)
+        except TTSClientError as e:
+            print(f"Error: {e}", file=sys.stderr)
+
+
+def relay(fifo_path: Path, priority: str = "user") -> None:
+    """Speak each line written to a FIFO, until terminated.
+
+    Lets shell callers speak by writing a line into the FIFO instead of
+    starting an interpreter per call (see claude-speak.sh). The relay
+    holds an exclusive lock on a ``.lock`` file next to the FIFO for as
+    long as it runs, which is how callers tell it is running; a relay
+    started while another holds it exits at once, so two callers starting
+    one together can't leave one reading a FIFO the other removed. The
+    FIFO and a PID file are removed when it exits. The daemon connection
+    is reopened if the daemon restarts.
+
+    Args:
+        fifo_path: FIFO to create and read.
+        priority: Queue priority of the lines spoken.
+    """
+    pid_path = fifo_path.with_suffix(".pid")
+    lock_fd = os.open(fifo_path.with_suffix(".lock"), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(lock_fd)
+        return
+
+    try:
+        if not stat.S_ISFIFO(fifo_path.lstat().st_mode):
+            fifo_path.unlink()
+    except FileNotFoundError:
+        pass
+    if not fifo_path.exists():
+        os.mkfifo(fifo_path, 0o600)
+
+    # Holding a write end open means the reader never sees end-of-file
+    # between callers
+    read_fd = os.open(fifo_path, os.O_RDONLY | os.O_NONBLOCK)
+    keep_open = os.open(fifo_path, os.O_WRONLY)
+    os.set_blocking(read_fd, True)
+    pid_path.write_text(f"{os.getpid()}\n")
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    try:
+        with TTSClient() as client, os.fdopen(read_fd, "rb") as fifo:
+            speak_lines(_lines(fifo), client, priority)
+    finally:
+        fifo_path.unlink(missing_ok=True)
+        pid_path.unlink(missing_ok=True)
+        os.close(keep_open)
+        os.close(lock_fd)
+
+
+def stop_relay(fifo_path: Path) -> bool:
+    """Stop the relay serving a FIFO, if one holds its lock.
+
+    The PID file is only trusted while the lock is held, so a PID left by
+    a relay that was killed, and since reused, is never signalled.
+    Leftovers of such a relay are removed instead.
+
+    Args:
+        fifo_path: FIFO the relay reads.
+
+    Returns:
+        True if a relay was running and has been told to stop.
+    """
+    pid_path = fifo_path.with_suffix(".pid")
+    try:
+        lock_fd = os.open(fifo_path.with_suffix(".lock"), os.O_RDWR)
+    except FileNotFoundError:
+        return False
+    try:
+        fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        try:
+            os.kill(int(pid_path.read_text()), signal.SIGTERM)
+        except (OSError, ValueError):
+            return False
+        return True
+    else:
+        fifo_path.unlink(missing_ok=True)
+        pid_path.unlink(missing_ok=True)
+        return False
+    finally:
+        os.close(lock_fd)
+
+
+def _lines(stream: BinaryIO) -> Iterable[bytes]:
+    """Lines of a stream as soon as each is complete."""
+    return iter(stream.readline, b"")
+
+
 def main():
+    args = sys.argv[1:]
+    # claude-speak.sh speaks at auto priority, like auto-read
+    priority = "user"
+    if len(args) >= 2 and args[0] == "--priority":
+        priority, args = args[1], args[2:]
+
+    # Stream piped input line by line
+    if args == ["--stream"]:
+        speak_stream(iter(sys.stdin.readline, ""), priority)
+        return
+
+    # Speak each piped line separately, over one connection
+    if args == ["--lines"]:
+        with TTSClient() as client:
+            speak_lines(_lines(sys.stdin.buffer), client, priority)
+        return
+
+    # Serve a FIFO for claude-speak.sh
+    if len(args) == 2 and args[0] == "--relay":
+        relay(Path(args[1]), priority)
+        return
+    if len(args) == 2 and args[0] == "--stop-relay":
+        stop_relay(Path(args[1]))
+        return
+
     # Check for command line argument
-    if len(sys.argv) > 1:
-        text = " ".join(sys.argv[1:])
-        if speak(text):
+    if args:
+        text = " ".join(args)
+        if speak(text, priority=priority):
             print(f"Speaking: {text[:50]}..." if len(text) > 50 else f"Speaking: {text}")
         return
 
@@ -63,7 +239,7 @@ def main():
     if not sys.stdin.isatty():
         text = sys.stdin.read().strip()
         if text:
-            if speak(text):
+            if speak(text, priority=priority):
                 print(f"Speaking: {text[:50]}..." if len(text) > 50 else f"Speaking: {text}")
         return
 
@@ -72,15 +248,17 @@ def main():
     print("Type text to speak, Ctrl+C to exit")
     print("-" * 40)
 
-    try:
-        while True:
-            text = input("> ").strip()
-            if text:
-                speak(text)
-    except KeyboardInterrupt:
-        print("\nBye!")
-    except EOFError:
-        pass
+    # One connection for the whole session
+    with TTSClient() as client:
+        try:
+            while True:
+                text = input("> ").strip()
+                if text:
+                    speak(text, client, priority)
+        except KeyboardInterrupt:
+            print("\nBye!")
+        except EOFError:
+            pass
 
 
 if __name__ == "__main__":
@@ -11,15 +11,9 @@ Usage in Claude's responses:
 COR Solutions - ElevenLabs Voice Suite
 """
 
-import json
-import socket
 import sys
-from pathlib import Path
 
-
-def get_socket_path() -> Path:
-    """Get the TTS daemon socket path."""
-    return Path.home() / ".claude" / "plugins" / "elevenlabs-tts" / "daemon.sock"
+from tts_client import TTSClient, TTSClientError, get_socket_path
 
 
 def is_daemon_running() -> bool:
@@ -27,30 +21,25 @@ def is_daemon_running() -> bool:
     return get_socket_path().exists()
 
 
-def speak(text: str, block: bool = False) -> bool:
+def speak(text: str, block: bool = False, timeout: float = 120.0) -> bool:
     """Send text to TTS daemon for speech output.
 
     Args:
         text: Text to speak.
-        block: If True, wait for speech to complete (not implemented yet).
+        block: If True, wait until the daemon has finished speaking it.
+        timeout: Longest time to wait when blocking, in seconds.
 
     Returns:
         True if message sent successfully, False otherwise.
     """
-    socket_path = get_socket_path()
-
-    if not socket_path.exists():
+    if not is_daemon_running():
         return False
 
     try:
-        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-        client.settimeout(5.0)
-        client.connect(str(socket_path))
-        message = {"type": "speak", "text": text}
-        client.sendall(json.dumps(message).encode() + b"\n")
-        client.close()
+        with TTSClient() as client:
+            client.speak(text, wait=block, timeout=timeout)
         return True
-    except Exception:
+    except TTSClientError:
         return False
 
 
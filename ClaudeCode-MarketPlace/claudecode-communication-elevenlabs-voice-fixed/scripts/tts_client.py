@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""Client for the TTS daemon's IPC socket.
+
+Shared by speak.py, tts.py and voice-manager.py. One connection is kept
+open and any number of requests are sent over it without waiting for each
+other; replies are matched to their request by ``request_id``. The
+connection can use length-prefixed framing instead of JSON lines, and is
+reopened once if the daemon restarted in between. Requests still waiting
+for replies when a connection closes fail with ``TTSClientError`` once
+the replies that did arrive are used up.
+
+Usage:
+    with TTSClient() as client:
+        client.send({"type": "speak", "text": "Hello", "priority": "user"})
+        request_id = client.submit({"type": "cue", "name": "got_it"}, notify=True)
+        client.wait_for(request_id, "finished", timeout=10)
+
+Benchmark (needs a running daemon):
+    python3 tts_client.py --bench
+
+COR Solutions - ElevenLabs Voice Suite
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import select
+import socket
+import sys
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable
+
+LINES = "lines"
+LENGTH = "length"
+LENGTH_PREFIX_BYTES = 4
+
+# Seconds to wait for the daemon to accept a connection or answer
+DEFAULT_TIMEOUT = 5.0
+# Seconds to read replies left on a connection that is being replaced
+DRAIN_TIMEOUT = 0.05
+
+
+def get_socket_path() -> Path:
+    """Get the TTS daemon socket path."""
+    return Path.home() / ".claude" / "plugins" / "elevenlabs-tts" / "daemon.sock"
+
+
+class TTSClientError(Exception):
+    """Raised when the daemon cannot be reached or rejects a request."""
+
+
+class TTSClient:
+    """Persistent, pipelined connection to the TTS daemon."""
+
+    def __init__(self, socket_path: Path | None = None, framing: str = LINES, timeout: float = DEFAULT_TIMEOUT):
+        """Initialize the client. Connects on first use.
+
+        Args:
+            socket_path: Daemon socket (default: the standard location).
+            framing: "lines" (newline-terminated JSON) or "length"
+                (4-byte big-endian length, then the JSON).
+            timeout: Seconds to wait when connecting or for a reply.
+        """
+        if framing not in (LINES, LENGTH):
+            raise ValueError(f"unknown framing {framing!r}")
+        self.socket_path = socket_path or get_socket_path()
+        self.framing = framing
+        self.timeout = timeout
+        self._sock: socket.socket | None = None
+        self._buffer = bytearray()
+        self._request_ids = itertools.count(1)
+        # Replies read for requests whose caller hasn't collected them yet
+        self._pending: dict[int, deque[dict]] = {}
+        # Pending requests whose connection closed: no more replies will come
+        self._lost: set[int] = set()
+
+    def __enter__(self) -> TTSClient:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def connect(self) -> None:
+        """Open the connection if it is not open.
+
+        Raises:
+            TTSClientError: If the daemon is not running or refuses the
+                framing.
+        """
+        if self._sock is not None:
+            return
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(str(self.socket_path))
+        except OSError as e:
+            sock.close()
+            raise TTSClientError(f"TTS daemon not running ({e})") from e
+        self._sock = sock
+        self._buffer.clear()
+
+        if self.framing != LINES:
+            # The hello is answered in line framing, everything after in the new one
+            self._write(_encode_line({"type": "hello", "framing": self.framing}))
+            reply = self._read(LINES, time.monotonic() + self.timeout)
+            if reply is None or reply.get("error") != "success":
+                self.close()
+                raise TTSClientError(f"daemon refused {self.framing} framing")
+
+    def close(self) -> None:
+        """Close the connection; requests still waiting for replies are lost."""
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+        self._lost.update(self._pending)
+
+    def send(self, message: dict) -> None:
+        """Send a message without asking for any reply.
+
+        Raises:
+            TTSClientError: If the daemon cannot be reached.
+        """
+        self._send(message)
+
+    def submit(self, message: dict, notify: bool = False) -> int:
+        """Send a request; collect its replies later with ``result`` or ``wait_for``.
+
+        Args:
+            message: IPC message.
+            notify: Also ask for the utterance's events (queued, first-audio,
+                finished, ...).
+
+        Returns:
+            The request id.
+
+        Raises:
+            TTSClientError: If the daemon cannot be reached.
+        """
+        request_id = next(self._request_ids)
+        message = {**message, "request_id": request_id}
+        if notify:
+            message["notify"] = True
+        self._send(message)
+        self._pending[request_id] = deque()
+        return request_id
+
+    def request(self, message: dict, timeout: float | None = None) -> dict:
+        """Send a request and wait for the daemon to accept it.
+
+        Raises:
+            TTSClientError: If the daemon rejects the request or doesn't answer.
+        """
+        return self.result(self.submit(message), timeout)
+
+    def result(self, request_id: int, timeout: float | None = None) -> dict:
+        """Wait for the daemon's acknowledgement of a request.
+
+        Events of a request submitted with ``notify`` stay available to
+        ``wait_for``.
+
+        Raises:
+            TTSClientError: If the daemon rejected the request, didn't
+                answer in time, or the connection closed first.
+        """
+        reply = self._next_reply(request_id, lambda r: "error" in r, timeout)
+        if reply is None:
+            raise TTSClientError("no answer from TTS daemon")
+        if reply["error"] != "success":
+            raise TTSClientError(reply["error"])
+        return reply
+
+    def wait_for(self, request_id: int, event: str, timeout: float | None = None) -> dict | None:
+        """Wait for an event of an utterance submitted with ``notify``.
+
+        Args:
+            request_id: Id returned by ``submit``.
+            event: "queued", "synthesis-started", "first-audio" or "finished".
+            timeout: Seconds to wait (default: the client's timeout).
+
+        Returns:
+            The event, the "finished" event if the utterance ended first, or
+            None on timeout.
+
+        Raises:
+            TTSClientError: If the connection closed before the event came.
+        """
+        reply = self._next_reply(request_id, lambda r: r.get("event") in (event, "finished"), timeout)
+        if reply is not None and reply["event"] == "finished":
+            self._pending.pop(request_id, None)
+            self._lost.discard(request_id)
+        return reply
+
+    def speak(self, text: str, priority: str = "user", wait: bool = False, timeout: float = 120.0) -> None:
+        """Speak text, optionally returning only once it has been spoken.
+
+        Raises:
+            TTSClientError: If the daemon cannot be reached.
+        """
+        message = {"type": "speak", "text": text, "priority": priority}
+        if not wait:
+            self.send(message)
+            return
+        self.wait_for(self.submit(message, notify=True), "finished", timeout)
+
+    def _send(self, message: dict) -> None:
+        """Write a message, reconnecting once if the daemon went away."""
+        data = _encode_line(message) if self.framing == LINES else _encode_length(message)
+        if self._sock is not None and _peer_closed(self._sock):
+            # A write would still succeed once and the message be lost
+            self.close()
+        for attempt in range(2):
+            self.connect()
+            try:
+                self._write(data)
+                return
+            except OSError as e:
+                self._drain()
+                self.close()
+                if attempt:
+                    raise TTSClientError(f"lost connection to TTS daemon ({e})") from e
+
+    def _write(self, data: bytes) -> None:
+        assert self._sock is not None
+        self._sock.sendall(data)
+
+    def _next_reply(
+        self,
+        request_id: int,
+        wanted: Callable[[dict], bool],
+        timeout: float | None,
+    ) -> dict | None:
+        """Return the first reply of a request matching ``wanted``.
+
+        Replies read on the way that belong to other requests are kept for
+        their callers; skipped replies of this request are discarded.
+
+        Raises:
+            TTSClientError: If the request's connection closed before a
+                matching reply came.
+        """
+        pending = self._pending.get(request_id)
+        if pending is None:
+            return None
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        while True:
+            while pending:
+                reply = pending.popleft()
+                if wanted(reply):
+                    return reply
+            if request_id in self._lost:
+                self._lost.discard(request_id)
+                del self._pending[request_id]
+                raise TTSClientError(f"lost connection to TTS daemon before it answered request {request_id}")
+            reply = self._read(self.framing, deadline)
+            if reply is None:
+                if request_id in self._lost:
+                    continue
+                return None
+            self._keep(reply)
+
+    def _keep(self, reply: dict) -> None:
+        """Queue a reply for its request's caller, if it has one."""
+        queue = self._pending.get(reply.get("request_id"))
+        if queue is not None:
+            queue.append(reply)
+
+    def _drain(self) -> None:
+        """Keep the replies already sent on a connection that is going away."""
+        deadline = time.monotonic() + DRAIN_TIMEOUT
+        while self._sock is not None and (reply := self._read(self.framing, deadline)) is not None:
+            self._keep(reply)
+
+    def _read(self, framing: str, deadline: float) -> dict | None:
+        """Read one message, or None on timeout or when the daemon hangs up."""
+        while True:
+            message = _decode(self._buffer, framing)
+            if message is not None:
+                return message
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._sock is None:
+                return None
+            self._sock.settimeout(remaining)
+            try:
+                data = self._sock.recv(65536)
+            except socket.timeout:
+                return None
+            except OSError:
+                data = b""
+            finally:
+                if self._sock is not None:
+                    self._sock.settimeout(self.timeout)
+            if not data:
+                self.close()
+                return None
+            self._buffer += data
+
+
+def _peer_closed(sock: socket.socket) -> bool:
+    """True if the other end has closed the connection."""
+    readable, _, _ = select.select([sock], [], [], 0)
+    if not readable:
+        return False
+    try:
+        return sock.recv(1, socket.MSG_PEEK) == b""
+    except OSError:
+        return True
+
+
+def _encode_line(message: dict) -> bytes:
+    return json.dumps(message).encode() + b"\n"
+
+
+def _encode_length(message: dict) -> bytes:
+    payload = json.dumps(message).encode()
+    return len(payload).to_bytes(LENGTH_PREFIX_BYTES, "big") + payload
+
+
+def _decode(buffer: bytearray, framing: str) -> dict | None:
+    """Remove and decode one complete message from the front of ``buffer``."""
+    if framing == LINES:
+        end = buffer.find(b"\n")
+        if end < 0:
+            return None
+        payload, start = buffer[:end], end + 1
+    else:
+        if len(buffer) < LENGTH_PREFIX_BYTES:
+            return None
+        size = int.from_bytes(buffer[:LENGTH_PREFIX_BYTES], "big")
+        start = LENGTH_PREFIX_BYTES + size
+        if len(buffer) < start:
+            return None
+        payload = buffer[LENGTH_PREFIX_BYTES:start]
+    del buffer[:start]
+    return json.loads(payload)
+
+
+def _bench(count: int, size: int) -> None:
+    """Compare connect-per-message against one pipelined connection."""
+    padding = "x" * size
+    message = {"type": "ping", "padding": padding}
+
+    def per_message() -> None:
+        for _ in range(count):
+            with TTSClient() as client:
+                client.request(message)
+
+    def persistent(framing: str):
+        def run() -> None:
+            with TTSClient(framing=framing) as client:
+                request_ids = [client.submit(message) for _ in range(count)]
+                for request_id in request_ids:
+                    client.result(request_id)
+
+        return run
+
+    print(f"{count} acknowledged pings, {size}-byte payload:")
+    for name, run in (
+        ("connect per message", per_message),
+        ("persistent, lines", persistent(LINES)),
+        ("persistent, length-prefixed", persistent(LENGTH)),
+    ):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        print(f"  {name:30s} {count / elapsed:9.0f} msg/s  {elapsed / count * 1e6:8.1f} µs/msg")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="TTS daemon IPC client")
+    parser.add_argument("--bench", action="store_true", help="Benchmark against the running daemon")
+    parser.add_argument("--count", type=int, default=2000, help="Messages per benchmark run")
+    args = parser.parse_args()
+
+    if not args.bench:
+        parser.print_help()
+        return 0
+    if not get_socket_path().exists():
+        print("TTS daemon not running")
+        return 1
+    for size in (100, 100_000):
+        _bench(args.count if size < 10_000 else max(1, args.count // 10), size)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -24,12 +24,21 @@ COR Solutions - ElevenLabs Voice Suite
 import argparse
 import json
 import os
+import select
+import shutil
 import socket
 import subprocess
 import sys
+import tempfile
 import time
 from pathlib import Path
 
+# process_stop is shared with the TTS daemon; its one copy is in tts-patch/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tts-patch"))
+
+from process_stop import KILLED, NOT_RUNNING, STOPPED, stop_processes
+from tts_client import TTSClient, TTSClientError
+
 
 # Paths
 HOME = Path.home()
@@ -43,6 +52,14 @@ MODE_FILE = HOME / ".claude" / "plugins" / "voice-mode.txt"
 # Find plugin cache paths
 PLUGIN_CACHE = HOME / ".claude" / "plugins" / "cache" / "elevenlabs"
 
+# Longest wait for the TTS daemon to finish speaking a confirmation
+SPEECH_TIMEOUT = 30.0
+
+# Longest wait for both daemons to come up, and how often to check the
+# ones that don't report readiness themselves
+STARTUP_TIMEOUT = 15.0
+READY_POLL_INTERVAL = 0.05
+
 
 def find_exec_script(plugin_name: str) -> Path | None:
     """Find the exec.py script for a plugin."""
@@ -57,25 +74,92 @@ def find_exec_script(plugin_name: str) -> Path | None:
     return None
 
 
-def speak(text: str, wait: bool = True) -> bool:
-    """Send text to TTS daemon."""
+def send_to_tts(message: dict, wait: bool) -> bool:
+    """Send a message to the TTS daemon.
+
+    Args:
+        message: IPC message.
+        wait: Return only once the daemon reports the utterance finished
+            (or SPEECH_TIMEOUT passes).
+    """
     if not TTS_SOCKET.exists():
         return False
 
     try:
-        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-        client.settimeout(5.0)
-        client.connect(str(TTS_SOCKET))
-        message = {"type": "speak", "text": text}
-        client.sendall(json.dumps(message).encode() + b"\n")
-        client.close()
-        if wait:
-            time.sleep(len(text) * 0.05 + 0.5)  # Rough estimate for speech duration
+        with TTSClient(TTS_SOCKET) as client:
+            if wait:
+                client.wait_for(client.submit(message, notify=True), "finished", SPEECH_TIMEOUT)
+            else:
+                client.send(message)
         return True
-    except Exception:
+    except TTSClientError:
         return False
 
 
+def speak(text: str, wait: bool = True) -> bool:
+    """Send text to TTS daemon.
+
+    Args:
+        text: Text to speak.
+        wait: Return once the daemon has finished speaking it.
+    """
+    return send_to_tts({"type": "speak", "text": text, "priority": "cue"}, wait)
+
+
+def cue(name: str, text: str, wait: bool = True) -> bool:
+    """Play a pre-rendered confirmation from the TTS daemon's phrase bank.
+
+    Args:
+        name: Cue name known to the daemon (e.g. "listening").
+        text: Phrase to speak if the daemon has no audio for the cue.
+        wait: Return once the daemon has finished playing it.
+    """
+    return send_to_tts({"type": "cue", "name": name, "text": text}, wait)
+
+
+def tts_request(message: dict) -> dict | None:
+    """Send a message to the TTS daemon and return its acknowledgement, or None."""
+    if not TTS_SOCKET.exists():
+        return None
+    try:
+        with TTSClient(TTS_SOCKET) as client:
+            return client.request(message)
+    except TTSClientError:
+        return None
+
+
+def tts_stats() -> dict | None:
+    """Live latency metrics from the running TTS daemon, or None."""
+    if not TTS_SOCKET.exists():
+        return None
+    try:
+        with TTSClient(TTS_SOCKET) as client:
+            return client.request({"type": "stats"}).get("stats")
+    except TTSClientError:
+        # Not running, or a daemon without the stats message
+        return None
+
+
+def print_tts_stats(stats: dict) -> None:
+    """Print p50/p95/p99 of each per-utterance metric."""
+    print(f"TTS latency ({stats['utterances']} utterances):")
+    print(f"  {'':24}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, metric in stats["metrics"].items():
+        if not metric["count"]:
+            continue
+        cells = ""
+        for key in ("p50", "p95", "p99"):
+            value = metric[key]
+            if metric["unit"] == "ms":
+                cells += f"{value:>7.1f} ms"
+            elif metric["unit"] == "bytes":
+                cells += f"{value / 1024:>7.0f} KB"
+            else:
+                cells += f"{value:>10.0f}"
+        print(f"  {name.replace('_', ' '):24}{cells}")
+    print()
+
+
 def get_mode() -> str:
     """Get current voice mode."""
     if MODE_FILE.exists():
@@ -89,73 +173,201 @@ def set_mode(mode: str) -> None:
     MODE_FILE.write_text(mode)
 
 
-def is_daemon_running(pid_file: Path) -> bool:
-    """Check if a daemon is running."""
-    if not pid_file.exists():
-        return False
-
+def read_pid(pid_file: Path) -> int | None:
+    """Read a daemon's PID file, or None if there is none."""
     try:
         content = pid_file.read_text().strip()
 
         # Handle JSON format (STT uses this)
         if content.startswith("{"):
-            data = json.loads(content)
-            pid = data.get("pid")
-        else:
-            # Plain number format (TTS uses this)
-            pid = int(content)
+            return int(json.loads(content).get("pid") or 0) or None
+        # Plain number format (TTS uses this)
+        return int(content)
+    except (ValueError, OSError, AttributeError):
+        return None
 
-        if pid:
-            os.kill(pid, 0)
-            return True
+
+def is_daemon_running(pid_file: Path) -> bool:
+    """Check if a daemon is running."""
+    pid = read_pid(pid_file)
+    if not pid:
         return False
-    except (ValueError, OSError, json.JSONDecodeError):
+    try:
+        os.kill(pid, 0)
+        return True
+    except OSError:
         return False
 
 
-def start_stt_daemon() -> bool:
-    """Start STT daemon."""
-    exec_script = find_exec_script("elevenlabs-stt")
-    if not exec_script:
-        print("STT plugin not found. Install with: claude plugin install elevenlabs/stt")
-        return False
+class ReadinessListener:
+    """Datagram socket a daemon reports its state to (sd_notify protocol).
 
-    try:
-        subprocess.Popen(
-            [sys.executable, str(exec_script), "-m", "elevenlabs_stt.daemon", "start", "--background"],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-        )
-        time.sleep(2)
-        return is_daemon_running(STT_PID_FILE)
-    except Exception as e:
-        print(f"Failed to start STT: {e}")
-        return False
+    Passed to the TTS daemon as NOTIFY_SOCKET. It sends READY=1 as soon as
+    its IPC socket accepts connections, or STOPPING=1 with a STATUS=reason
+    if it gives up first.
+    """
+
+    def __init__(self):
+        self._dir = tempfile.mkdtemp(prefix="voice-manager-")
+        self.path = os.path.join(self._dir, "notify.sock")
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(self.path)
+        self._sock.setblocking(False)
+
+    def __enter__(self) -> "ReadinessListener":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._sock.close()
+        shutil.rmtree(self._dir, ignore_errors=True)
 
+    def environment(self) -> dict:
+        """Environment for a daemon that should report to this listener."""
+        return {**os.environ, "NOTIFY_SOCKET": self.path}
 
-def start_tts_daemon() -> bool:
-    """Start TTS daemon."""
-    exec_script = find_exec_script("elevenlabs-tts")
+    def receive(self, timeout: float) -> dict:
+        """Wait up to ``timeout`` for state messages.
+
+        Returns:
+            State assignments received (e.g. {"READY": "1"}), empty if none.
+        """
+        state = {}
+        select.select([self._sock], [], [], timeout)
+        while True:
+            try:
+                datagram = self._sock.recv(4096)
+            except BlockingIOError:
+                break
+            for line in datagram.decode(errors="replace").splitlines():
+                key, _, value = line.partition("=")
+                state[key] = value
+        return state
+
+
+def spawn_daemon(plugin_name: str, env: dict | None = None) -> subprocess.Popen | None:
+    """Launch a daemon with ``start --background``.
+
+    Args:
+        plugin_name: "elevenlabs-stt" or "elevenlabs-tts".
+        env: Environment for the daemon (default: this one).
+
+    Returns:
+        The launcher process, or None if the plugin is missing or could not
+        be started.
+    """
+    exec_script = find_exec_script(plugin_name)
+    kind = plugin_name.rsplit("-", 1)[1]
     if not exec_script:
-        print("TTS plugin not found. Install with: claude plugin install elevenlabs/tts")
-        return False
+        print(f"{kind.upper()} plugin not found. Install with: claude plugin install elevenlabs/{kind}")
+        return None
 
+    module = plugin_name.replace("-", "_") + ".daemon"
     try:
-        subprocess.Popen(
-            [sys.executable, str(exec_script), "-m", "elevenlabs_tts.daemon", "start", "--background"],
+        return subprocess.Popen(
+            [sys.executable, str(exec_script), "-m", module, "start", "--background"],
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL,
+            env=env,
         )
-        time.sleep(2)
-        return is_daemon_running(TTS_PID_FILE)
-    except Exception as e:
-        print(f"Failed to start TTS: {e}")
+    except OSError as e:
+        print(f"Failed to start {kind.upper()}: {e}")
+        return None
+
+
+def tts_accepting() -> bool:
+    """Whether the TTS daemon's socket accepts connections."""
+    try:
+        with TTSClient(TTS_SOCKET, timeout=READY_POLL_INTERVAL) as client:
+            client.connect()
+        return True
+    except TTSClientError:
         return False
 
 
-def stop_daemon(name: str) -> None:
-    """Stop a daemon by name."""
-    subprocess.run(["pkill", "-f", f"elevenlabs_{name}.daemon"], capture_output=True)
+def start_daemons(timeout: float = STARTUP_TIMEOUT) -> dict:
+    """Start the TTS and STT daemons together and wait until both are up.
+
+    The TTS daemon reports readiness over a ReadinessListener the moment it
+    accepts IPC connections. One that is already running, or doesn't
+    report, is detected by connecting to its socket. The STT daemon is up
+    once its PID file names a live process.
+
+    Args:
+        timeout: Longest wait for both, in seconds.
+
+    Returns:
+        {"tts": ..., "stt": ...}: seconds until each daemon was up, or an
+        error message.
+    """
+    started = time.monotonic()
+    deadline = started + timeout
+    results = {}
+
+    with ReadinessListener() as listener:
+        launchers = {
+            "tts": spawn_daemon("elevenlabs-tts", listener.environment()),
+            "stt": spawn_daemon("elevenlabs-stt"),
+        }
+        pending = set()
+        for name, launcher in launchers.items():
+            if launcher is None:
+                results[name] = "could not be launched"
+            else:
+                pending.add(name)
+
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                for name in pending:
+                    results[name] = f"not up after {timeout:.0f} s"
+                break
+            state = listener.receive(min(remaining, READY_POLL_INTERVAL))
+
+            for name in list(pending):
+                if name == "tts" and "STOPPING" in state and "READY" not in state:
+                    results[name] = state.get("STATUS", "daemon exited during startup")
+                elif name == "tts" and ("READY" in state or tts_accepting()):
+                    results[name] = time.monotonic() - started
+                elif name == "stt" and is_daemon_running(STT_PID_FILE):
+                    results[name] = time.monotonic() - started
+                elif launchers[name].poll():
+                    results[name] = f"launcher exited with code {launchers[name].returncode}"
+                else:
+                    continue
+                pending.discard(name)
+
+    return results
+
+
+def stop_daemons() -> dict:
+    """Stop the STT and TTS daemons named by their PID files.
+
+    Both are sent SIGTERM together and waited for together (see
+    tts-patch/process_stop.py); one still running after the timeout is
+    killed. A PID whose process started after its PID file was written
+    belongs to another process and is left alone.
+
+    Returns:
+        {"stt": outcome, "tts": outcome}, see process_stop.stop_processes.
+    """
+    pid_files = {"stt": STT_PID_FILE, "tts": TTS_PID_FILE}
+    pids = {name: read_pid(pid_file) for name, pid_file in pid_files.items()}
+    started_by = {}
+    for name, pid in pids.items():
+        if pid:
+            try:
+                started_by[pid] = pid_files[name].stat().st_mtime
+            except OSError:
+                pass
+    outcomes = stop_processes([pid for pid in pids.values() if pid], started_by=started_by)
+
+    results = {}
+    for name, pid in pids.items():
+        results[name] = outcomes.get(pid, NOT_RUNNING) if pid else NOT_RUNNING
+        if results[name] in (KILLED, NOT_RUNNING):
+            # Killed daemons can't clean up after themselves
+            pid_files[name].unlink(missing_ok=True)
+    return results
 
 
 def cmd_start(args):
@@ -165,21 +377,18 @@ def cmd_start(args):
     print("=" * 50)
     print()
 
-    # Start TTS first (needed for confirmations)
-    print("Starting TTS daemon...")
-    if not start_tts_daemon():
-        print("❌ TTS failed to start")
-        return 1
-    print("✅ TTS running")
-
-    # Start STT
-    print("Starting STT daemon...")
-    if not start_stt_daemon():
-        print("❌ STT failed to start")
+    print("Starting TTS and STT daemons...")
+    results = start_daemons(args.timeout)
+    failed = False
+    for name in ("tts", "stt"):
+        result = results[name]
+        if isinstance(result, float):
+            print(f"✅ {name.upper()} running ({result * 1000:.0f} ms)")
+        else:
+            print(f"❌ {name.upper()} failed to start: {result}")
+            failed = True
+    if failed:
         return 1
-    print("✅ STT running")
-
-    time.sleep(1)
 
     # Mode selection
     print()
@@ -192,11 +401,11 @@ def cmd_start(args):
 
     if choice == "2":
         set_mode("conversation")
-        speak("Conversation mode activated. I'll speak my responses.", wait=True)
+        cue("conversation_activated", "Conversation mode activated. I'll speak my responses.", wait=True)
         print("✅ Conversation mode - Claude will speak responses")
     else:
         set_mode("instruction")
-        speak("Instruction mode. I'll respond in text only.", wait=True)
+        cue("instruction_activated", "Instruction mode. I'll respond in text only.", wait=True)
         print("✅ Instruction mode - Claude responds in text only")
 
     print()
@@ -210,17 +419,26 @@ def cmd_start(args):
 
 def cmd_stop(args):
     """Stop all voice daemons."""
-    speak("Voice system shutting down.", wait=False)
-    time.sleep(1)
-
-    stop_daemon("stt")
-    stop_daemon("tts")
+    cue("shutting_down", "Voice system shutting down.")
+
+    started = time.monotonic()
+    results = stop_daemons()
+    elapsed_ms = (time.monotonic() - started) * 1000
+    failed = False
+    for name, outcome in results.items():
+        if outcome not in (STOPPED, KILLED, NOT_RUNNING):
+            print(f"❌ {name.upper()} {outcome}")
+            failed = True
+        elif outcome != STOPPED:
+            print(f"{name.upper()}: {outcome}")
 
     # Clean up mode file
     if MODE_FILE.exists():
         MODE_FILE.unlink()
 
-    print("Voice system stopped.")
+    if failed:
+        return 1
+    print(f"Voice system stopped ({elapsed_ms:.0f} ms).")
     return 0
 
 
@@ -237,6 +455,10 @@ def cmd_status(args):
     print(f"Mode:               {mode.title()}")
     print()
 
+    stats = tts_stats() if tts_running else None
+    if stats and stats["utterances"]:
+        print_tts_stats(stats)
+
     if tts_running:
         speak(f"Voice system active. {mode} mode.", wait=False)
 
@@ -249,11 +471,11 @@ def cmd_mode(args):
 
     if mode_input in ("conv", "conversation", "chat", "2"):
         set_mode("conversation")
-        speak("Conversation mode. I'll speak my responses now.")
+        cue("conversation_mode", "Conversation mode. I'll speak my responses now.")
         print("✅ Switched to conversation mode")
     elif mode_input in ("inst", "instruction", "text", "1"):
         set_mode("instruction")
-        speak("Instruction mode. Text responses only.")
+        cue("instruction_mode", "Instruction mode. Text responses only.")
         print("✅ Switched to instruction mode")
     else:
         print(f"Unknown mode: {mode_input}")
@@ -274,15 +496,35 @@ def cmd_confirm(args):
     return 0
 
 
+def cmd_skip(args):
+    """Stop the utterance playing."""
+    reply = tts_request({"type": "skip"})
+    if reply is None:
+        print("TTS daemon not running")
+        return 1
+    print("Skipped" if reply.get("skipped") else "Nothing playing")
+    return 0
+
+
+def cmd_clear(args):
+    """Drop speech waiting to be played."""
+    reply = tts_request({"type": "clear", "skip": args.skip})
+    if reply is None:
+        print("TTS daemon not running")
+        return 1
+    print(f"Cleared {reply.get('cleared', 0)} waiting" + (", skipped the current one" if reply.get("skipped") else ""))
+    return 0
+
+
 def cmd_listening(args):
     """Announce listening started."""
-    speak("Listening", wait=False)
+    cue("listening", "Listening", wait=False)
     return 0
 
 
 def cmd_got_it(args):
     """Announce recording stopped."""
-    speak("Got it", wait=False)
+    cue("got_it", "Got it", wait=False)
     return 0
 
 
@@ -297,6 +539,8 @@ Examples:
   voice-manager.py mode inst       Switch to instruction mode
   voice-manager.py status          Show current status
   voice-manager.py confirm "Hi"    Speak confirmation
+  voice-manager.py skip            Stop what is being spoken
+  voice-manager.py clear --skip    Stop speaking and drop everything queued
   voice-manager.py stop            Stop all daemons
         """
     )
@@ -304,7 +548,13 @@ Examples:
     subparsers = parser.add_subparsers(dest="command", help="Command to run")
 
     # Start
-    subparsers.add_parser("start", help="Start voice system with mode selection")
+    start_parser = subparsers.add_parser("start", help="Start voice system with mode selection")
+    start_parser.add_argument(
+        "--timeout",
+        type=float,
+        default=STARTUP_TIMEOUT,
+        help=f"Seconds to wait for the daemons to come up (default: {STARTUP_TIMEOUT:.0f})",
+    )
 
     # Stop
     subparsers.add_parser("stop", help="Stop all voice daemons")
@@ -320,6 +570,11 @@ Examples:
     confirm_parser = subparsers.add_parser("confirm", help="Speak confirmation")
     confirm_parser.add_argument("text", nargs="*", help="Text to speak")
 
+    # Playback control
+    subparsers.add_parser("skip", help="Stop the utterance playing")
+    clear_parser = subparsers.add_parser("clear", help="Drop speech waiting to be played")
+    clear_parser.add_argument("--skip", action="store_true", help="Also stop the utterance playing")
+
     # Quick confirmations
     subparsers.add_parser("listening", help="Announce 'Listening'")
     subparsers.add_parser("got-it", help="Announce 'Got it'")
@@ -336,6 +591,10 @@ Examples:
         return cmd_mode(args)
     elif args.command == "confirm":
         return cmd_confirm(args)
+    elif args.command == "skip":
+        return cmd_skip(args)
+    elif args.command == "clear":
+        return cmd_clear(args)
     elif args.command == "listening":
         return cmd_listening(args)
     elif args.command == "got-it":
@@ -0,0 +1,83 @@
+"""Bridges from blocking code into the daemon's event loop.
+
+The official ``ElevenLabsClient`` streams over a blocking HTTP connection
+and the disk cache reads and writes plain files. Rather than polling, the
+blocking iterator runs in a worker thread that hands each item to the
+loop as soon as it exists, so the coroutine consuming it simply awaits.
+
+Credit: COR Solutions - True Streaming Patch
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import AsyncIterator, Iterable, TypeVar
+
+T = TypeVar("T")
+
+_END = object()
+
+
+class _Raised:
+    """An exception raised by the blocking iterator, passed to the loop."""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+async def iterate_in_thread(iterable: Iterable[T]) -> AsyncIterator[T]:
+    """Iterate a blocking iterable in a worker thread.
+
+    The iterable is only started (``iter()`` and every ``next()``) on the
+    worker thread, so a generator doing network or disk I/O never blocks
+    the loop. Closing the async iterator early stops the worker after its
+    current item and closes the underlying generator.
+
+    Args:
+        iterable: Blocking iterable, typically a generator.
+
+    Yields:
+        The iterable's items, in order.
+
+    Raises:
+        Exception: Whatever the iterable raised.
+    """
+    loop = asyncio.get_running_loop()
+    items: asyncio.Queue = asyncio.Queue()
+    cancelled = threading.Event()
+
+    def post(item: object) -> None:
+        try:
+            loop.call_soon_threadsafe(items.put_nowait, item)
+        except RuntimeError:
+            # Loop already closed: nobody is waiting any more
+            cancelled.set()
+
+    def pump() -> None:
+        iterator = None
+        try:
+            iterator = iter(iterable)
+            for item in iterator:
+                if cancelled.is_set():
+                    break
+                post(item)
+        except Exception as e:
+            post(_Raised(e))
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+            post(_END)
+
+    threading.Thread(target=pump, daemon=True).start()
+    try:
+        while True:
+            item = await items.get()
+            if item is _END:
+                return
+            if isinstance(item, _Raised):
+                raise item.error
+            yield item
+    finally:
+        cancelled.set()
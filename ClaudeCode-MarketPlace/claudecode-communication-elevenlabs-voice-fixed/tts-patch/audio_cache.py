@@ -0,0 +1,204 @@
+"""Content-addressed on-disk cache of synthesized audio.
+
+Status lines, mode announcements and recurring summaries are spoken over
+and over; each used to be a fresh API round-trip. Entries are keyed by a
+hash of the text and every voice setting that changes the audio, stored
+as one file per entry, and evicted least-recently-used once the cache
+grows past its size cap. Entries are written to a temporary file and
+renamed into place, so concurrent daemons never see a partial entry.
+
+Credit: COR Solutions - True Streaming Patch
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from elevenlabs_tts.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Bytes read per chunk when playing an entry from disk
+READ_CHUNK_SIZE = 16 * 1024
+# Temporary files older than this are leftovers from a crashed writer
+STALE_TEMP_AGE = 3600.0
+
+_TEMP_PREFIX = ".tmp-"
+
+
+def cache_key(text: str, config: Config) -> str:
+    """Hash text plus the voice settings that affect the audio.
+
+    Args:
+        text: Filtered text sent for synthesis.
+        config: TTS config providing the voice settings.
+
+    Returns:
+        Hex digest identifying the audio.
+    """
+    fields = [
+        text,
+        config.voice_id,
+        config.model_id,
+        config.output_format,
+        config.speed,
+        config.stability,
+        config.similarity_boost,
+    ]
+    return hashlib.sha256(json.dumps(fields).encode()).hexdigest()
+
+
+class AudioCache:
+    """LRU cache of encoded audio files under the plugin config dir."""
+
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        """Initialize the cache.
+
+        Args:
+            cache_dir: Directory holding the entries (created if missing).
+            max_bytes: Size cap; oldest entries are evicted above it.
+        """
+        self._dir = cache_dir
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._size = self._evict()
+
+    def get(self, key: str) -> Iterator[bytes] | None:
+        """Stream a cached entry from disk.
+
+        Args:
+            key: Entry key from ``cache_key``.
+
+        Returns:
+            Chunk iterator on a hit, None on a miss.
+        """
+        path = self._path(key)
+        try:
+            f = path.open("rb")
+        except FileNotFoundError:
+            with self._lock:
+                self._misses += 1
+            return None
+
+        # Bump mtime so eviction treats it as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self._hits += 1
+        return self._read(f)
+
+    def record(self, key: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Pass chunks through while writing them to a new entry.
+
+        The entry is only stored if the stream is consumed to the end;
+        a stopped or failed stream leaves the cache untouched.
+
+        Args:
+            key: Entry key from ``cache_key``.
+            chunks: Audio chunks from the API.
+
+        Yields:
+            The same chunks, unchanged.
+        """
+        fd, temp_name = tempfile.mkstemp(dir=self._dir, prefix=_TEMP_PREFIX)
+        complete = False
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+                    yield chunk
+            complete = size > 0
+        finally:
+            # Release the source now (an HTTP stream closes its connection)
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+            if complete:
+                os.replace(temp_name, self._path(key))
+                self._added(size)
+            else:
+                try:
+                    os.unlink(temp_name)
+                except OSError:
+                    pass
+
+    @property
+    def stats(self) -> dict:
+        """Get cache statistics."""
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "size_bytes": self._size,
+                "max_bytes": self._max_bytes,
+            }
+
+    def _path(self, key: str) -> Path:
+        return self._dir / f"{key}.audio"
+
+    def _read(self, f) -> Iterator[bytes]:
+        with f:
+            while chunk := f.read(READ_CHUNK_SIZE):
+                yield chunk
+
+    def _added(self, size: int) -> None:
+        """Account for a new entry and evict if over the cap."""
+        with self._lock:
+            self._size += size
+            over = self._size > self._max_bytes
+        if over:
+            size = self._evict()
+            with self._lock:
+                self._size = size
+
+    def _evict(self) -> int:
+        """Remove least-recently-used entries until under the cap.
+
+        Rescans the directory, so entries written by other daemons are
+        accounted for too.
+
+        Returns:
+            Total size of the remaining entries.
+        """
+        entries = []
+        now = time.time()
+        for path in self._dir.iterdir():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if path.name.startswith(_TEMP_PREFIX):
+                if now - stat.st_mtime > STALE_TEMP_AGE:
+                    path.unlink(missing_ok=True)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        if total <= self._max_bytes:
+            return total
+
+        entries.sort()
+        evicted = 0
+        for _, size, path in entries:
+            if total <= self._max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            evicted += 1
+        logger.debug("Evicted %d cached audio entries", evicted)
+        return total
@@ -0,0 +1,264 @@
+"""Output formats requested from the API, and how players are told about them.
+
+Everything used to go out as the configured ``output_format`` (by default
+``mp3_44100_128``) piped into ``mpv -``, which has to probe the stream and
+start an MP3 decoder before it makes a sound. The ``audio_format``
+setting picks the format by what matters most:
+
+    configured  output_format from [elevenlabs-tts], as before
+    latency     latency_format (pcm_24000): raw 16-bit PCM, which the
+                player is told the layout of, so nothing is probed or decoded
+    bandwidth   bandwidth_format (opus_48000_32): the fewest bytes per second
+
+or an ElevenLabs format name directly. Raw formats (``pcm_*``, ``ulaw_*``,
+``alaw_*``) carry no header, so mpv is started with (or, when persistent,
+switched to) its ``rawaudio`` demuxer and the stdin fallback player gets
+``fallback_raw_player``; the official player cannot play them.
+
+Benchmark (time to first audio and mpv CPU time per format; needs mpv,
+and ffmpeg or an API key for the audio):
+    python3 -m elevenlabs_tts.audio_format --bench
+
+Credit: COR Solutions - True Streaming Patch
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import resource
+import shutil
+import statistics
+import subprocess
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+PROFILES = ("configured", "latency", "bandwidth")
+
+# Sample format names as mpv's rawaudio demuxer (and ffmpeg) spell them
+RAW_SAMPLE_FORMATS = {"pcm": "s16le", "ulaw": "mulaw", "alaw": "alaw"}
+# Bytes per sample of each raw codec
+RAW_SAMPLE_BYTES = {"pcm": 2, "ulaw": 1, "alaw": 1}
+EXTENSIONS = {"mp3": "mp3", "opus": "ogg", "pcm": "pcm", "ulaw": "ulaw", "alaw": "alaw"}
+
+
+@dataclass(frozen=True)
+class AudioFormat:
+    """An ElevenLabs ``output_format``, e.g. "mp3_44100_128" or "pcm_24000"."""
+
+    name: str
+    codec: str
+    sample_rate: int
+    # Compressed formats only
+    kbps: int | None = None
+    channels: int = 1
+
+    @classmethod
+    def parse(cls, name: str) -> AudioFormat:
+        """Parse an output format name.
+
+        Raises:
+            ValueError: If the name is not a format this module knows.
+        """
+        codec, _, rest = name.partition("_")
+        parts = rest.split("_")
+        try:
+            if codec in ("mp3", "opus") and len(parts) == 2:
+                return cls(name, codec, int(parts[0]), kbps=int(parts[1]))
+            if codec in RAW_SAMPLE_FORMATS and len(parts) == 1:
+                return cls(name, codec, int(parts[0]))
+        except ValueError:
+            pass
+        raise ValueError(f"unknown output format {name!r}")
+
+    @property
+    def raw(self) -> bool:
+        """Headerless samples the player must be told the layout of."""
+        return self.codec in RAW_SAMPLE_FORMATS
+
+    @property
+    def byte_rate(self) -> float:
+        """Bytes per second of playback."""
+        if self.kbps is not None:
+            return self.kbps * 1000 / 8
+        return float(self.sample_rate * self.channels * RAW_SAMPLE_BYTES[self.codec])
+
+    @property
+    def extension(self) -> str:
+        return EXTENSIONS[self.codec]
+
+    def mpv_options(self) -> dict[str, str]:
+        """mpv options for playing this format from a pipe or FIFO.
+
+        An empty ``demuxer`` (mpv's default: probe) undoes a previous
+        raw format on a persistent mpv.
+        """
+        if not self.raw:
+            return {"demuxer": ""}
+        return {
+            "demuxer": "rawaudio",
+            "demuxer-rawaudio-format": RAW_SAMPLE_FORMATS[self.codec],
+            "demuxer-rawaudio-rate": str(self.sample_rate),
+            "demuxer-rawaudio-channels": str(self.channels),
+        }
+
+    def mpv_args(self) -> list[str]:
+        """``mpv_options`` as command-line arguments."""
+        return [f"--{name}={value}" for name, value in self.mpv_options().items() if value]
+
+    def player_fields(self) -> dict[str, str]:
+        """Placeholders for ``fallback_raw_player``: {format}, {rate}, {channels}."""
+        return {
+            "format": RAW_SAMPLE_FORMATS.get(self.codec, self.codec),
+            "rate": str(self.sample_rate),
+            "channels": str(self.channels),
+        }
+
+
+def choose_format(setting: str, configured: str, latency_format: str, bandwidth_format: str) -> AudioFormat:
+    """The format to request, from the ``audio_format`` setting.
+
+    Args:
+        setting: A profile in ``PROFILES`` or an output format name.
+        configured: ``output_format`` from [elevenlabs-tts].
+        latency_format: Format for the "latency" profile.
+        bandwidth_format: Format for the "bandwidth" profile.
+
+    Returns:
+        The chosen format; the configured one if the setting is not usable.
+    """
+    name = {"configured": configured, "latency": latency_format, "bandwidth": bandwidth_format}.get(setting, setting)
+    try:
+        return AudioFormat.parse(name)
+    except ValueError as e:
+        if name != configured:
+            logger.warning("audio_format %r: %s, using %s", setting, e, configured)
+    try:
+        return AudioFormat.parse(configured)
+    except ValueError:
+        # A format this module doesn't know: let the player probe it, and
+        # assume 128 kbps for underrun estimates
+        return AudioFormat(configured, configured.partition("_")[0], 0, kbps=128)
+
+
+BENCH_FORMATS = ("mp3_44100_128", "pcm_24000", "opus_48000_32", "opus_48000_64")
+BENCH_TEXT = (
+    "Here is the summary you asked for. The build passed, two tests were flaky, "
+    "and the deployment is waiting for your approval before it goes out."
+)
+
+
+def _encode(audio_format: AudioFormat, seconds: float, directory: Path) -> bytes:
+    """A test signal in the given format, made with ffmpeg."""
+    source = ["-f", "lavfi", "-i", f"sine=frequency=220:sample_rate={audio_format.sample_rate}:duration={seconds}"]
+    if audio_format.raw:
+        output = ["-f", RAW_SAMPLE_FORMATS[audio_format.codec], "-ac", "1"]
+    elif audio_format.codec == "mp3":
+        output = ["-f", "mp3", "-b:a", f"{audio_format.kbps}k", "-ac", "1"]
+    else:
+        output = ["-f", "ogg", "-c:a", "libopus", "-b:a", f"{audio_format.kbps}k", "-ac", "1"]
+    path = directory / f"{audio_format.name}.{audio_format.extension}"
+    subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-y", *source, *output, str(path)],
+        check=True,
+    )
+    return path.read_bytes()
+
+
+def _synthesize(audio_format: AudioFormat) -> tuple[bytes, float]:
+    """Real speech in the given format from the API, with its time to first byte."""
+    from elevenlabs_tts.config import Config
+    from elevenlabs_tts.streaming_config import StreamingConfig
+    from elevenlabs_tts.synthesis_client import ConnectionPool, SynthesisClient
+
+    config = Config.load()
+    streaming = StreamingConfig.load(config.get_config_dir())
+    config.output_format = audio_format.name
+    timings = []
+    pool = ConnectionPool(streaming.api_url)
+    client = SynthesisClient(config.get_api_key(), config, pool, timings.append)
+    try:
+        audio = b"".join(client.stream(BENCH_TEXT))
+    finally:
+        client.close()
+    return audio, timings[0].ttfb if timings else 0.0
+
+
+async def _play_runs(mpv_path: str, audio_format: AudioFormat, audio: bytes, runs: int) -> tuple[list[float], float]:
+    """Play audio through a persistent mpv with null output, ``runs`` times.
+
+    Returns:
+        (seconds to first audio per run, mpv CPU seconds in total).
+    """
+    from elevenlabs_tts.mpv_player import MpvPlayer
+
+    async def chunks():
+        for start in range(0, len(audio), 4096):
+            yield audio[start:start + 4096]
+
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # Decode as fast as possible, so CPU time is the decoder's, not waiting
+    player = MpvPlayer(mpv_path, extra_args=["--ao=null", "--ao-null-untimed"])
+    first_audio = []
+    try:
+        await player.start()
+        for _ in range(runs):
+            result = await player.play_stream(chunks(), options=audio_format.mpv_options())
+            if result.first_audio is not None:
+                first_audio.append(result.first_audio)
+    finally:
+        await player.stop()
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    return first_audio, cpu
+
+
+def _bench(formats: list[str], runs: int, seconds: float, from_api: bool, mpv_path: str) -> int:
+    if shutil.which(mpv_path) is None:
+        print(f"Error: {mpv_path} not found; the benchmark plays through mpv")
+        return 1
+    if not from_api and shutil.which("ffmpeg") is None:
+        print("Error: ffmpeg is needed to make test audio (or use --api for real speech)")
+        return 1
+
+    print(f"{runs} plays per format through mpv (null output), audio from {'the API' if from_api else 'ffmpeg'}:")
+    print(f"  {'format':16}{'bytes':>9}{'KB/s':>7}{'TTFB':>9}{'first audio':>14}{'mpv CPU / s audio':>19}")
+    with tempfile.TemporaryDirectory(prefix="tts-format-") as directory:
+        for name in formats:
+            audio_format = AudioFormat.parse(name)
+            if from_api:
+                audio, ttfb = _synthesize(audio_format)
+                ttfb_cell = f"{ttfb * 1000:.0f} ms"
+            else:
+                audio, ttfb_cell = _encode(audio_format, seconds, Path(directory)), "-"
+            audio_seconds = len(audio) / audio_format.byte_rate
+            first_audio, cpu = asyncio.run(_play_runs(mpv_path, audio_format, audio, runs))
+            first_cell = f"{statistics.median(first_audio) * 1000:.1f} ms" if first_audio else "-"
+            print(
+                f"  {name:16}{len(audio):>9}{audio_format.byte_rate / 1000:>7.1f}{ttfb_cell:>9}"
+                f"{first_cell:>14}{cpu / runs / audio_seconds * 1000:>16.1f} ms"
+            )
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Audio output formats")
+    parser.add_argument("--bench", action="store_true", help="Compare formats through mpv")
+    parser.add_argument("--format", action="append", help=f"Format to compare (repeatable; default {', '.join(BENCH_FORMATS)})")
+    parser.add_argument("--runs", type=int, default=10, help="Plays per format")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Length of the ffmpeg test audio")
+    parser.add_argument("--api", action="store_true", help="Synthesize real speech with the configured API key")
+    parser.add_argument("--mpv", default="mpv", help="mpv executable")
+    args = parser.parse_args()
+    if not args.bench:
+        parser.print_help()
+        return 0
+    return _bench(args.format or list(BENCH_FORMATS), args.runs, args.seconds, args.api, args.mpv)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,545 @@
+"""Audio sinks: where the daemon sends an utterance's audio.
+
+Playback used to be hard-wired into the daemon (mpv, or the official
+player without it), so latency and throughput could only be measured on
+a machine with speakers. A sink plays one utterance at a time from an
+async stream of encoded chunks, and the daemon picks them from the
+``sink`` setting:
+
+    mpv     mpv fed over a FIFO (persistent) or stdin (per utterance)
+    pipe    any player reading stdin (fallback_player), fed from a ring
+    player  the official in-process player, given whole utterances
+    null    discards audio, timestamping each chunk
+    file    writes each utterance to its own file
+    paced   discards audio at the format's byte rate, like a real device
+
+``auto`` is mpv, then pipe, then player: a sink that is not installed
+raises ``FileNotFoundError`` before it reads any audio, and the next one
+is tried.
+
+Every sink counts the bytes it is given and how long they took to arrive
+(``SinkStats``). Underruns are estimated from the format's byte rate: one
+is counted whenever a chunk arrives after the audio before it would have
+finished playing, so null and paced sinks show whether synthesis keeps up
+with real time on a box without audio.
+
+Benchmark (sinks against a jittery synthetic source):
+    python3 audio_sink.py --bench
+
+Credit: COR Solutions - True Streaming Patch
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import subprocess
+import tempfile
+import time
+from contextlib import aclosing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, AsyncIterator, Callable
+
+from elevenlabs_tts.audio_format import AudioFormat
+from elevenlabs_tts.mpv_player import MpvPlayer, PlayerError
+from elevenlabs_tts.stream_buffer import AudioRing
+
+if TYPE_CHECKING:
+    from elevenlabs_tts.audio_player import AudioPlayer
+
+logger = logging.getLogger(__name__)
+
+SINKS = ("auto", "mpv", "pipe", "player", "null", "file", "paced")
+
+# Most bytes handed to a stdin player's pipe per write
+PIPE_WRITE_SIZE = 16 * 1024
+# Byte rate assumed when the output format doesn't say (128 kbps MP3)
+DEFAULT_BYTE_RATE = 16000.0
+
+
+@dataclass
+class SinkStats:
+    """What a sink has been given since the daemon started."""
+
+    utterances: int = 0
+    bytes: int = 0
+    # Summed per utterance: play call to last byte
+    seconds: float = 0.0
+    # Chunks that arrived after the audio before them would have finished
+    # playing (0 if the byte rate is unknown)
+    underruns: int = 0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes / self.seconds if self.seconds > 0 else 0.0
+
+
+class _Delivery:
+    """One utterance's chunks as they reach a sink."""
+
+    def __init__(self, byte_rate: float | None):
+        self.byte_rate = byte_rate
+        self.started = time.monotonic()
+        self.last = self.started
+        self.bytes = 0
+        self.underruns = 0
+        # When the audio delivered so far would finish playing in real time
+        self.play_end = 0.0
+
+    def feed(self, size: int) -> None:
+        now = time.monotonic()
+        if self.byte_rate:
+            if self.bytes and now > self.play_end:
+                self.underruns += 1
+            # Playback resumes with this chunk if it had run dry
+            self.play_end = max(self.play_end, now) + size / self.byte_rate
+        self.bytes += size
+        self.last = now
+
+
+class AudioSink:
+    """Plays utterances; subclasses implement ``play``."""
+
+    name = ""
+
+    def __init__(
+        self,
+        audio_format: AudioFormat | None = None,
+        byte_rate: float | None = None,
+        on_first_audio: Callable[[str, float], None] | None = None,
+    ):
+        """Initialize the sink.
+
+        Args:
+            audio_format: Format of the audio it will be given (None:
+                compressed, left to the player to probe). The daemon
+                updates it when the format changes.
+            byte_rate: Playback bytes per second, for underrun estimates
+                (default: the format's; None without one: not counted).
+            on_first_audio: Called with a label for how the audio was
+                played and the seconds from utterance start to first audio.
+        """
+        self.stats = SinkStats()
+        self.audio_format = audio_format
+        self._byte_rate = byte_rate
+        self._on_first_audio = on_first_audio
+        self._delivery: _Delivery | None = None
+
+    @property
+    def byte_rate(self) -> float | None:
+        if self._byte_rate:
+            return self._byte_rate
+        return self.audio_format.byte_rate if self.audio_format else None
+
+    async def start(self) -> None:
+        """Get ready ahead of the first utterance (optional)."""
+
+    async def play(
+        self,
+        chunks: AsyncIterator[bytes],
+        started_at: float,
+        on_playing: Callable[[], None],
+        label: str = "",
+    ) -> None:
+        """Play one utterance and wait for it to finish.
+
+        Cancelling the call stops playback.
+
+        Args:
+            chunks: Encoded audio, consumed as it arrives.
+            started_at: Monotonic time the utterance started.
+            on_playing: Called once when the audio starts playing.
+            label: Utterance id, for sinks that name their output.
+
+        Raises:
+            FileNotFoundError: If the sink's player is not installed or
+                cannot play the audio format (raised before any audio is
+                read).
+        """
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Release whatever the sink holds."""
+
+    def _first_audio(self, kind: str, started_at: float, on_playing: Callable[[], None]) -> None:
+        """Report first audio now."""
+        if self._on_first_audio:
+            self._on_first_audio(kind, time.monotonic() - started_at)
+        on_playing()
+
+    async def _metered(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """Pass chunks through, counting them into ``stats``."""
+        delivery = self._delivery = _Delivery(self.byte_rate)
+        try:
+            async for chunk in chunks:
+                if chunk:
+                    delivery.feed(len(chunk))
+                    yield chunk
+        finally:
+            if delivery.bytes:
+                self.stats.utterances += 1
+                self.stats.bytes += delivery.bytes
+                self.stats.seconds += delivery.last - delivery.started
+                self.stats.underruns += delivery.underruns
+                logger.debug(
+                    "%s sink: %d bytes at %.0f KB/s, %d underruns",
+                    self.name,
+                    delivery.bytes,
+                    delivery.bytes / max(delivery.last - delivery.started, 1e-6) / 1000,
+                    delivery.underruns,
+                )
+
+
+async def _feed_stdin(
+    process: asyncio.subprocess.Process,
+    chunks: AsyncIterator[bytes],
+    on_first_write: Callable[[], None],
+) -> None:
+    """Write chunks to a player's stdin, then wait for it to finish."""
+    assert process.stdin is not None
+    try:
+        first_write = True
+        async for chunk in chunks:
+            # The pipe copies what it can't send at once, so a view can be reused
+            process.stdin.write(chunk)
+            await process.stdin.drain()
+            if first_write:
+                on_first_write()
+                first_write = False
+        process.stdin.close()
+        await process.wait()
+    finally:
+        if process.returncode is None:
+            process.terminate()
+
+
+class MpvSink(AudioSink):
+    """mpv: one persistent process fed over IPC, or one per utterance."""
+
+    name = "mpv"
+
+    def __init__(self, mpv_path: str = "mpv", persistent: bool = True, **kwargs):
+        """Initialize the sink.
+
+        Args:
+            mpv_path: mpv executable.
+            persistent: Keep one mpv running between utterances (see
+                mpv_player.py); otherwise spawn one per utterance.
+            **kwargs: See ``AudioSink``.
+        """
+        super().__init__(**kwargs)
+        self._mpv_path = mpv_path
+        self._player = MpvPlayer(mpv_path) if persistent else None
+
+    async def start(self) -> None:
+        """Warm up the persistent mpv so the first utterance skips the spawn."""
+        if self._player is None:
+            return
+        try:
+            await self._player.start()
+        except (PlayerError, FileNotFoundError) as e:
+            logger.warning("Persistent player unavailable, spawning per utterance: %s", e)
+            self._player = None
+
+    async def play(self, chunks, started_at, on_playing, label=""):
+        audio_format = self.audio_format
+        async with aclosing(self._metered(chunks)) as metered:
+            if self._player is not None:
+                result = await self._player.play_stream(
+                    metered,
+                    started_at=started_at,
+                    on_playing=on_playing,
+                    options=audio_format.mpv_options() if audio_format else None,
+                )
+                if result.first_audio is not None and self._on_first_audio:
+                    self._on_first_audio("cold player" if result.cold else "warm player", result.first_audio)
+                return
+
+            # Time to first audio is measured to the first chunk written, as
+            # there is no IPC connection to report actual playback start
+            process = await asyncio.create_subprocess_exec(
+                self._mpv_path,
+                "--no-video",
+                "--really-quiet",
+                *(audio_format.mpv_args() if audio_format else []),
+                "-",
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            await _feed_stdin(process, metered, lambda: self._first_audio("spawn player", started_at, on_playing))
+
+    async def close(self) -> None:
+        if self._player is not None:
+            await self._player.stop()
+
+
+class PipeSink(AudioSink):
+    """A player reading stdin, fed from a fixed-size ring (see stream_buffer.py)."""
+
+    name = "pipe"
+
+    def __init__(self, command: list[str], prebuffer: int, raw_command: list[str] | None = None, **kwargs):
+        """Initialize the sink.
+
+        Args:
+            command: Player command line, reading audio from stdin.
+            prebuffer: Bytes buffered before the player is fed.
+            raw_command: Command line for raw formats, with {format},
+                {rate} and {channels} filled in from the format (None:
+                raw formats are not played).
+            **kwargs: See ``AudioSink``.
+        """
+        super().__init__(**kwargs)
+        self._command = command
+        self._raw_command = raw_command
+        self._prebuffer = prebuffer
+
+    def _player_command(self) -> list[str]:
+        audio_format = self.audio_format
+        if audio_format is None or not audio_format.raw:
+            return self._command
+        if not self._raw_command:
+            raise FileNotFoundError(f"no fallback player for raw {audio_format.name}")
+        fields = audio_format.player_fields()
+        return [arg.format(**fields) for arg in self._raw_command]
+
+    async def play(self, chunks, started_at, on_playing, label=""):
+        process = await asyncio.create_subprocess_exec(
+            *self._player_command(),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        ring = AudioRing(prebuffer=self._prebuffer)
+
+        async def fill() -> None:
+            try:
+                async with aclosing(self._metered(chunks)) as metered:
+                    async for chunk in metered:
+                        await ring.write(chunk)
+            finally:
+                await ring.close()
+
+        async def drain() -> AsyncIterator[memoryview]:
+            while view := await ring.read(PIPE_WRITE_SIZE):
+                yield view
+
+        filling = asyncio.create_task(fill())
+        try:
+            await _feed_stdin(process, drain(), lambda: self._first_audio("fallback player", started_at, on_playing))
+            # Raises whatever synthesis raised, after the audio before it played
+            await filling
+        finally:
+            if not filling.done():
+                filling.cancel()
+                await asyncio.wait({filling})
+
+
+class PlayerSink(AudioSink):
+    """The official in-process player, handed whole utterances."""
+
+    name = "player"
+
+    def __init__(self, player: Callable[[], AudioPlayer], **kwargs):
+        """Initialize the sink.
+
+        Args:
+            player: Returns the official player, creating it on first use
+                (blocking; called in a worker thread).
+            **kwargs: See ``AudioSink``.
+        """
+        super().__init__(**kwargs)
+        self._player = player
+
+    async def play(self, chunks, started_at, on_playing, label=""):
+        if self.audio_format is not None and self.audio_format.raw:
+            raise FileNotFoundError(f"the official player cannot play raw {self.audio_format.name}")
+        # The official player only takes whole audio; collect it into one
+        # buffer rather than joining a list of chunks
+        audio = bytearray()
+        async with aclosing(self._metered(chunks)) as metered:
+            async for chunk in metered:
+                audio += chunk
+        player = await asyncio.to_thread(self._player)
+        if not audio:
+            return
+        self._first_audio("official player", started_at, on_playing)
+        try:
+            await asyncio.to_thread(_play_blocking, player, audio)
+        except asyncio.CancelledError:
+            player.stop()
+            raise
+
+
+def _play_blocking(player: AudioPlayer, audio: bytearray) -> None:
+    """Play audio with the official player and wait for it."""
+    player.play_audio(audio)
+    player.wait_until_done()
+
+
+class NullSink(AudioSink):
+    """Discards audio, keeping when each chunk of the last utterance arrived."""
+
+    name = "null"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # (seconds after utterance start, bytes) per chunk
+        self.timeline: list[tuple[float, int]] = []
+
+    async def play(self, chunks, started_at, on_playing, label=""):
+        self.timeline = []
+        async with aclosing(self._metered(chunks)) as metered:
+            async for chunk in metered:
+                if not self.timeline:
+                    self._first_audio("null sink", started_at, on_playing)
+                self.timeline.append((time.monotonic() - started_at, len(chunk)))
+
+
+class FileSink(AudioSink):
+    """Writes each utterance to its own file in a directory."""
+
+    name = "file"
+
+    def __init__(self, directory: Path, **kwargs):
+        """Initialize the sink.
+
+        Args:
+            directory: Where to write; created if missing.
+            **kwargs: See ``AudioSink``.
+        """
+        super().__init__(**kwargs)
+        self.directory = directory
+        self._count = 0
+
+    async def play(self, chunks, started_at, on_playing, label=""):
+        self._count += 1
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        extension = self.audio_format.extension if self.audio_format else "mp3"
+        path = self.directory / f"{stamp}-{label or self._count}.{extension}"
+        # Written next to its final name, which it only takes once complete
+        partial = path.with_name(path.name + ".part")
+        await asyncio.to_thread(self.directory.mkdir, parents=True, exist_ok=True)
+        f = await asyncio.to_thread(partial.open, "wb")
+        try:
+            first = True
+            async with aclosing(self._metered(chunks)) as metered:
+                async for chunk in metered:
+                    await asyncio.to_thread(f.write, chunk)
+                    if first:
+                        self._first_audio("file sink", started_at, on_playing)
+                        first = False
+            await asyncio.to_thread(f.close)
+            await asyncio.to_thread(os.replace, partial, path)
+        finally:
+            if not f.closed:
+                f.close()
+                partial.unlink(missing_ok=True)
+
+
+class PacedSink(AudioSink):
+    """Discards audio at the byte rate of real playback.
+
+    Like a device with ``buffer_seconds`` of buffer: it takes chunks as
+    fast as they come until it is that far ahead of the playback clock,
+    then only as fast as it plays, and finishes when the last byte would
+    have been heard.
+    """
+
+    name = "paced"
+
+    def __init__(self, byte_rate: float, buffer_seconds: float = 1.0, **kwargs):
+        """Initialize the sink.
+
+        Args:
+            byte_rate: Bytes played per second.
+            buffer_seconds: Audio accepted ahead of the playback clock.
+            **kwargs: See ``AudioSink``.
+        """
+        super().__init__(byte_rate=byte_rate, **kwargs)
+        self._buffer_seconds = buffer_seconds
+
+    async def play(self, chunks, started_at, on_playing, label=""):
+        first = True
+        async with aclosing(self._metered(chunks)) as metered:
+            async for _ in metered:
+                if first:
+                    self._first_audio("paced sink", started_at, on_playing)
+                    first = False
+                assert self._delivery is not None
+                ahead = self._delivery.play_end - time.monotonic() - self._buffer_seconds
+                if ahead > 0:
+                    await asyncio.sleep(ahead)
+        if not first:
+            assert self._delivery is not None
+            await asyncio.sleep(max(0.0, self._delivery.play_end - time.monotonic()))
+
+
+async def _bench(utterances: int, byte_rate: float, chunk_size: int, chunks: int, speedup: float) -> None:
+    """Feed null, file and paced sinks from a jittery source."""
+
+    async def source(seed: int) -> AsyncIterator[bytes]:
+        # Chunks arrive about `speedup` times faster than real time, with
+        # random stalls (e.g. between pipelined segments)
+        jitter = random.Random(seed)
+        for _ in range(chunks):
+            await asyncio.sleep(chunk_size / byte_rate / speedup * jitter.uniform(0.2, 1.8))
+            if jitter.random() < 0.05:
+                await asyncio.sleep(jitter.uniform(0.1, 0.4))
+            yield b"\xff" * chunk_size
+
+    first_audio: list[float] = []
+
+    def record(kind: str, seconds: float) -> None:
+        first_audio.append(seconds)
+
+    with tempfile.TemporaryDirectory(prefix="tts-sink-") as directory:
+        sinks: list[AudioSink] = [
+            NullSink(byte_rate=byte_rate, on_first_audio=record),
+            FileSink(Path(directory), byte_rate=byte_rate, on_first_audio=record),
+            PacedSink(byte_rate, buffer_seconds=0.5, on_first_audio=record),
+        ]
+        print(
+            f"{utterances} utterances of {chunks} x {chunk_size}-byte chunks at {byte_rate / 1000:.0f} KB/s playback, "
+            f"source {speedup:g}x real time with stalls:"
+        )
+        for sink in sinks:
+            first_audio.clear()
+            started = time.monotonic()
+            for n in range(utterances):
+                await sink.play(source(n), time.monotonic(), lambda: None, label=str(n))
+            wall = time.monotonic() - started
+            stats = sink.stats
+            print(
+                f"  {sink.name:6s} first audio {sum(first_audio) / len(first_audio) * 1000:6.1f} ms  "
+                f"{stats.bytes_per_second / 1000:7.1f} KB/s  {stats.underruns:3d} underruns  "
+                f"wall {wall:5.2f} s"
+            )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Audio sinks")
+    parser.add_argument("--bench", action="store_true", help="Run sinks against a synthetic source")
+    parser.add_argument("--utterances", type=int, default=2, help="Utterances per sink")
+    parser.add_argument(
+        "--speedup",
+        type=float,
+        action="append",
+        help="Source speed relative to real time (repeatable; default 2 and 0.8)",
+    )
+    args = parser.parse_args()
+    if not args.bench:
+        parser.print_help()
+        return 0
+    for speedup in args.speedup or [2.0, 0.8]:
+        asyncio.run(_bench(args.utterances, DEFAULT_BYTE_RATE, 2048, 20, speedup))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
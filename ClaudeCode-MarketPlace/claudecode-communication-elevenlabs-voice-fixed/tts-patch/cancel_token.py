@@ -0,0 +1,88 @@
+"""Per-utterance cancellation, reaching into worker threads.
+
+Cancelling an utterance's task stops its player, but the synthesis behind
+it runs in worker threads that only notice between chunks: a thread
+waiting on the server for the first byte, or on a slow chunk, keeps its
+HTTPS connection busy until data arrives. Every utterance now carries a
+``CancelToken``. Whoever stops the utterance cancels the token along with
+the task; code that blocks on its behalf registers a callback that
+unblocks it at once (the synthesis client shuts its socket down, the rate
+limiter wakes its waits) and raises ``Cancelled`` in the thread.
+
+Credit: COR Solutions - True Streaming Patch
+"""
+
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from typing import Callable
+
+
+class Cancelled(Exception):
+    """Raised in a worker thread whose utterance was cancelled."""
+
+
+class CancelToken:
+    """Thread-safe, one-shot cancellation flag with callbacks."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+        self._callbacks: dict[int, Callable[[], None]] = {}
+        self._ids = itertools.count()
+        # Why and when it was cancelled (time.monotonic())
+        self.reason = ""
+        self.cancelled_at: float | None = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "") -> bool:
+        """Cancel, running the registered callbacks on this thread.
+
+        Returns:
+            False if it was already cancelled.
+        """
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self.cancelled_at = time.monotonic()
+            self._event.set()
+            callbacks, self._callbacks = list(self._callbacks.values()), {}
+        for callback in callbacks:
+            callback()
+        return True
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Run ``callback`` when cancelled (at once if it already is).
+
+        The callback runs on the cancelling thread, so it must only do
+        something quick and thread-safe, such as shutting a socket down.
+
+        Returns:
+            Call to unregister the callback.
+        """
+        with self._lock:
+            if not self._event.is_set():
+                key = next(self._ids)
+                self._callbacks[key] = callback
+                return lambda: self._forget(key)
+        callback()
+        return _nothing
+
+    def check(self) -> None:
+        """Raise ``Cancelled`` if cancelled."""
+        if self._event.is_set():
+            raise Cancelled(self.reason or "cancelled")
+
+    def _forget(self, key: int) -> None:
+        with self._lock:
+            self._callbacks.pop(key, None)
+
+
+def _nothing() -> None:
+    pass
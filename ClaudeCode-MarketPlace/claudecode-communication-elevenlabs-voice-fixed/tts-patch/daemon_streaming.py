@@ -5,10 +5,53 @@ directly to mpv as chunks arrive, instead of buffering everything first.
 
 Result: ~500ms latency vs ~2-3 seconds with buffered playback.
 
+A single mpv is kept running in idle mode (see mpv_player.py), so each
+utterance skips process startup and audio device open as well. Long text
+is split into sentences that are synthesized ahead of playback (see
+speech_pipeline.py), audio for text spoken before is replayed from an
+on-disk cache (see audio_cache.py), and voice-manager confirmations are
+pre-rendered into memory (see phrase_bank.py). A response that is still
+being written can be sent in pieces (speak_begin / speak_chunk /
+speak_end); each sentence is spoken as soon as it is final.
+
+The daemon runs on a single asyncio event loop: IPC connections (see
+ipc_server.py), the speak queue, synthesis and the player pipe are all
+awaited, blocking HTTP and disk reads run in worker threads that hand
+their chunks to the loop (see async_bridge.py), and hotkeys are bridged
+in from the listener's thread. Nothing wakes up while the daemon is idle.
+
+Startup is lazy: the IPC socket comes up first, so clients can queue
+speech immediately, and the API client, connection check, persistent
+player, hotkey listener and cues are loaded behind it, concurrently where
+they can be. The audio player and sound effects are only imported when
+first needed. ``start --startup-profile`` prints what each phase cost.
+Synthesis requests go over kept-alive HTTPS connections that are opened
+ahead of time (see synthesis_client.py), paced to the plan's limits and
+retried or circuit-broken on failure (see rate_limiter.py).
+Audio is played through a sink picked from config (see audio_sink.py),
+which can also be a null, file or paced sink for measuring without audio.
+The format requested can be raw PCM that the player is told the layout
+of, skipping the probe and decode (see audio_format.py).
+Bursts of speak requests are merged, and exact repeats dropped, before
+they are queued (see speak_coalescer.py).
+If started with ``NOTIFY_SOCKET`` set, the daemon sends ``READY=1`` there
+once the socket is up (see service_notify.py).
+
+``{"type": "skip"}`` (and the skip hotkey) stops the utterance playing at
+once: its token (see cancel_token.py) shuts its API connections down and
+its task stops the sink. ``{"type": "clear"}`` drops everything waiting.
+
+A client that sets ``"notify": true`` on a message keeps its connection
+open and is sent the utterance's id and events as JSON lines: queued,
+synthesis-started, first-audio and finished (with how it ended).
+``{"type": "stats"}`` is answered with percentiles of per-utterance
+latency kept since startup (see latency_stats.py).
+
 INSTALLATION:
 1. Find your daemon.py: find ~/.claude/plugins -name "daemon.py" -path "*elevenlabs-tts*"
 2. Backup: cp daemon.py daemon.py.backup
 3. Replace with this file
+4. Copy the other tts-patch/*.py modules next to it
 
 Credit: COR Solutions - True Streaming Patch
 """
@@ -16,27 +59,75 @@ Credit: COR Solutions - True Streaming Patch
 from __future__ import annotations
 
 import argparse
+import asyncio
+import itertools
+import json
 import logging
 import os
-import queue
-import re
+import shlex
 import signal
+import socket
+import ssl
 import subprocess
 import sys
 import threading
 import time
+from contextlib import aclosing, nullcontext
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Callable
-
-from elevenlabs_tts.audio_player import AudioPlayer
+from typing import TYPE_CHECKING, AsyncIterator, Callable, ContextManager, Iterator
+
+from elevenlabs_tts.async_bridge import iterate_in_thread
+from elevenlabs_tts.audio_sink import (
+    DEFAULT_BYTE_RATE,
+    SINKS,
+    AudioSink,
+    FileSink,
+    MpvSink,
+    NullSink,
+    PacedSink,
+    PipeSink,
+    PlayerSink,
+)
+from elevenlabs_tts.audio_cache import AudioCache, cache_key
+from elevenlabs_tts.audio_format import AudioFormat, choose_format
+from elevenlabs_tts.cancel_token import CancelToken
 from elevenlabs_tts.config import Config
-from elevenlabs_tts.elevenlabs_client import ElevenLabsClient
-from elevenlabs_tts.hotkey import HotkeyListener
-from elevenlabs_tts.ipc import IpcServer, get_socket_path
-from elevenlabs_tts.sound_effects import play_sound
+from elevenlabs_tts.ipc import get_socket_path
+from elevenlabs_tts.ipc_server import AsyncIpcServer, IpcRequestError, Reply
+from elevenlabs_tts.latency_stats import LatencyStats, UtteranceSample, format_snapshot
+from elevenlabs_tts.phrase_bank import DEFAULT_CUES, PhraseBank
+from elevenlabs_tts.process_stop import KILLED, NOT_PERMITTED, NOT_RUNNING, STILL_RUNNING, stop_processes
+from elevenlabs_tts.rate_limiter import RateLimiter
+from elevenlabs_tts.service_notify import ServiceNotifier
+from elevenlabs_tts.speak_coalescer import SpeakCoalescer, SpeakRequest
+from elevenlabs_tts.speak_queue import AUTO, CUE, PRIORITIES, SpeakQueue
+from elevenlabs_tts.speech_filter import IncrementalFilter, markdown_to_speech
+from elevenlabs_tts.speech_pipeline import SegmentFeed, SegmentPipeline, split_segments
+from elevenlabs_tts.startup_profile import StartupProfile
+from elevenlabs_tts.streaming_config import StreamingConfig
+from elevenlabs_tts.synthesis_client import API_URL, ConnectionPool, RequestTiming, SynthesisClient
+
+# Imported when first needed, after the IPC socket is up
+if TYPE_CHECKING:
+    from elevenlabs_tts.audio_player import AudioPlayer
+    from elevenlabs_tts.elevenlabs_client import ElevenLabsClient
+    from elevenlabs_tts.hotkey import HotkeyListener
 
 logger = logging.getLogger(__name__)
 
+# Seconds between checks of config.toml for voice setting changes
+CONFIG_POLL_INTERVAL = 2.0
+
+# Modules whose import cost --startup-profile reports
+PROFILED_IMPORTS = [
+    "elevenlabs_tts.daemon",
+    "elevenlabs_tts.elevenlabs_client",
+    "elevenlabs_tts.hotkey",
+    "elevenlabs_tts.audio_player",
+    "elevenlabs_tts.sound_effects",
+]
+
 
 def _get_plugin_root() -> Path:
     """Get the plugin root directory."""
@@ -46,121 +137,760 @@ def _get_plugin_root() -> Path:
     return Path(__file__).resolve().parents[2]
 
 
+def _new_client(api_key: str, config: Config) -> ElevenLabsClient:
+    """Import the API client and create one."""
+    from elevenlabs_tts.elevenlabs_client import ElevenLabsClient
+
+    return ElevenLabsClient(api_key, config)
+
+
+def _play_sound(name: str) -> None:
+    """Import sound effects and play one (blocking)."""
+    from elevenlabs_tts.sound_effects import play_sound
+
+    play_sound(name)
+
+
+def _send_event(reply: Reply | None, utterance_id: str, event: str, **fields: object) -> None:
+    """Send an utterance event to the client that asked for it, if any."""
+    if reply is not None:
+        reply({"event": event, "utterance": utterance_id, **fields})
+
+
+def _fan_out(targets: list[tuple[Reply | None, str]]) -> Reply | None:
+    """A reply that sends each event to several clients, each under its own id.
+
+    Used for speak requests merged into one utterance.
+    """
+    targets = [(reply, utterance_id) for reply, utterance_id in targets if reply is not None]
+    if not targets:
+        return None
+
+    def reply(message: dict) -> None:
+        for target, utterance_id in targets:
+            target({**message, "utterance": utterance_id})
+
+    return reply
+
+
+def _voice_settings(config: Config) -> tuple:
+    """Settings that change the synthesized audio."""
+    return (
+        config.get_api_key(),
+        config.voice_id,
+        config.model_id,
+        config.output_format,
+        config.speed,
+        config.stability,
+        config.similarity_boost,
+    )
+
+
+@dataclass
+class Utterance:
+    """A queued unit of speech."""
+
+    text: str
+    # Pre-rendered audio (cues); synthesized from text when None
+    audio: bytes | None = None
+    # Segments still arriving (speak_chunk streams); replaces text when set
+    segments: SegmentFeed | None = None
+    # Queue class (see speak_queue.PRIORITIES)
+    priority: str = AUTO
+    # Id reported in events, and where to send them (None: nobody asked)
+    id: str = ""
+    reply: Reply | None = None
+    # Where its time went, recorded into the daemon's stats once it ends
+    sample: UtteranceSample = field(default_factory=UtteranceSample)
+    # Cancelled to stop it, along with its synthesis in worker threads
+    cancel: CancelToken = field(default_factory=CancelToken)
+
+
+@dataclass
+class SpeechStream:
+    """A response arriving in pieces via speak_begin / speak_chunk / speak_end."""
+
+    filter: IncrementalFilter
+    feed: SegmentFeed
+    priority: str
+    begun_at: float
+    last_seen: float
+    # Filtered characters released so far (for max_text_length)
+    chars: int = 0
+    # Queued for playback once its first sentence was final
+    queued: bool = False
+    truncated: bool = False
+    reply: Reply | None = None
+    # Shared with the utterance once queued
+    sample: UtteranceSample = field(default_factory=UtteranceSample)
+
+
 class TTSDaemon:
     """Main daemon that coordinates TTS playback."""
 
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, profile: StartupProfile | None = None):
         self.config = config
-        self._running = False
+        self.streaming = StreamingConfig.load(config.get_config_dir())
+        self._audio_format = self._apply_audio_format(config)
         self._auto_read_enabled = config.auto_read
+        self._profile = profile
+        # Told when the socket is up, for whoever started the daemon
+        self._notifier = ServiceNotifier.from_environment()
 
-        # Components (initialized later)
+        # Components (initialized later; the audio player only if needed)
         self._client: ElevenLabsClient | None = None
+        # Streams using the official client, and clients replaced by a voice
+        # change that are closed once those streams are done
+        self._client_lock = threading.Lock()
+        self._client_streams = 0
+        self._retired_clients: list[ElevenLabsClient] = []
+        # Keep-alive synthesis over our own connections (http_pool)
+        self._pool: ConnectionPool | None = None
+        self._synthesis: SynthesisClient | None = None
+        # Every synthesis request, from any thread, goes through it
+        self._limiter = RateLimiter(
+            chars_per_minute=self.streaming.rate_limit_chars_per_minute,
+            max_concurrent=self.streaming.max_concurrent_requests,
+            retries=self.streaming.synthesis_retries,
+            backoff_base=self.streaming.retry_backoff,
+            backoff_max=self.streaming.retry_backoff_max,
+            breaker_failures=self.streaming.circuit_breaker_failures,
+            breaker_reset=self.streaming.circuit_breaker_reset,
+        )
         self._player: AudioPlayer | None = None
+        # Where audio is played, in fallback order (see audio_sink.py); a
+        # sink that turns out not to be installed is dropped
+        self._sinks: list[AudioSink] = []
+        self._pipeline: SegmentPipeline | None = None
+        self._cache: AudioCache | None = None
+        self._phrases: PhraseBank | None = None
         self._hotkey_listener: HotkeyListener | None = None
-        self._ipc_server: IpcServer | None = None
+        self._ipc_server: AsyncIpcServer | None = None
+
+        # Speak queue, and the utterance playing (with its task) if any
+        self._speak_queue: SpeakQueue[Utterance] = SpeakQueue(
+            max_depth=self.streaming.queue_max_depth,
+            auto_max_age=self.streaming.auto_read_max_age,
+            supersede_auto=self.streaming.supersede_auto_read,
+            on_drop=lambda utterance, reason: self._notify(utterance, "finished", outcome="dropped", reason=reason),
+        )
+        self._utterance_ids = itertools.count(1)
+        # Holds speak requests briefly to merge bursts and drop repeats
+        self._coalescer: SpeakCoalescer[tuple[str, Reply | None, float]] = SpeakCoalescer(
+            self._queue_requests,
+            window=self.streaming.coalesce_window,
+            dedupe_window=self.streaming.dedupe_window,
+            max_chars=config.max_text_length,
+            is_idle=lambda: self._current is None and not len(self._speak_queue),
+        )
+        self._speak_task: asyncio.Task | None = None
+        self._current: Utterance | None = None
+        self._current_task: asyncio.Task | None = None
+
+        # Incremental utterances by client-chosen id (None: auto-read was off)
+        self._streams: dict[str, SpeechStream | None] = {}
+
+        # Time-to-first-audio per player kind: [count, total seconds]
+        self._first_audio: dict[str, list[float]] = {}
+        # Per-utterance metrics served by the stats message
+        self._latency = LatencyStats()
+
+        # Synthesis request TTFB split, recorded from worker threads
+        self._request_timing = {"requests": 0, "reused": 0, "connect": 0.0, "server": 0.0}
+        self._request_timing_lock = threading.Lock()
+        self._warm_task: asyncio.Task | None = None
+        # Re-opens a connection once the last one has idled out
+        self._rewarm_handle: asyncio.TimerHandle | None = None
+
+        # config.toml mtime, to notice voice setting changes, and the timer
+        # that checks it
+        self._config_mtime: float | None = None
+        self._config_watch: asyncio.TimerHandle | None = None
+
+        # Set by SIGTERM/SIGINT, or when the API connection check fails
+        self._stop_requested = asyncio.Event()
+        self._exit_code = 0
+
+        # Set once the API client exists; utterances queued earlier wait for it
+        self._client_ready = asyncio.Event()
+        self._startup_task: asyncio.Task | None = None
+
+    def _phase(self, name: str) -> ContextManager[None]:
+        """Time a startup phase if profiling, else do nothing."""
+        return self._profile.phase(name) if self._profile else nullcontext()
+
+    async def _start_components(self, api_key: str) -> None:
+        """Load everything behind the IPC socket.
+
+        The API client comes first since synthesis waits for it; then the
+        connection check, persistent player, hotkey listener and cue
+        rendering run concurrently. A failed connection check stops the
+        daemon, as it always has.
 
-        # Speak queue
-        self._speak_queue: queue.Queue[str] = queue.Queue()
-        self._speak_thread: threading.Thread | None = None
+        Args:
+            api_key: ElevenLabs API key.
+        """
+        try:
+            with self._phase("api client"):
+                self._client = await asyncio.to_thread(_new_client, api_key, self.config)
+        except Exception as e:
+            logger.error("Could not create the API client: %s", e)
+            self._exit_code = 1
+            self._stop_requested.set()
+            return
+        if self._pool:
+            self._synthesis = SynthesisClient(api_key, self.config, self._pool, self._record_request_timing)
+        self._client_ready.set()
+
+        # Render cues in the background
+        if self._phrases:
+            self._phrases.refresh()
+
+        connected, *_ = await asyncio.gather(
+            self._test_connection(),
+            self._warm_connection(),
+            self._start_sinks(),
+            self._start_hotkeys(),
+        )
+        if not connected:
+            logger.error("API connection failed. Check your API key.")
+            self._exit_code = 1
+            self._stop_requested.set()
+            return
 
-        # Threading
-        self._stop_event = threading.Event()
-        self._lock = threading.Lock()
+        if self._profile:
+            report = await asyncio.to_thread(self._profile.report, PROFILED_IMPORTS)
+            print(report, flush=True)
 
-    def _init_components(self) -> bool:
-        """Initialize daemon components.
+    async def _test_connection(self) -> bool:
+        """Check the API key and connectivity in a worker thread.
 
-        Returns:
-            True if initialization succeeded, False otherwise.
+        With ``api_url`` overridden, the check goes there too (the official
+        client only knows the real API).
         """
-        api_key = self.config.get_api_key()
-        if not api_key:
-            logger.error("No API key configured. Run /elevenlabs-tts:setup first.")
-            return False
+        assert self._client is not None
+        check = self._client.test_connection
+        if self._synthesis and self.streaming.api_url.rstrip("/") != API_URL:
+            check = self._synthesis.check_connection
+        with self._phase("api connection check"):
+            return await asyncio.to_thread(check)
+
+    async def _warm_connection(self) -> None:
+        """Open a synthesis connection ahead of the next request."""
+        if not self._pool:
+            return
+        with self._phase("api pre-connect"):
+            try:
+                seconds = await asyncio.to_thread(self._pool.warm)
+            except OSError as e:
+                logger.warning("Could not pre-connect to the API: %s", e)
+                return
+        if seconds is not None:
+            logger.debug("Pre-connected to the API in %.0f ms", seconds * 1000)
 
-        # Initialize client
-        self._client = ElevenLabsClient(api_key, self.config)
+    def _warm_soon(self) -> None:
+        """Pre-connect in the background unless already doing so."""
+        if self._pool and (self._warm_task is None or self._warm_task.done()):
+            self._warm_task = asyncio.create_task(self._warm_connection())
 
-        # Test connection
-        if not self._client.test_connection():
-            logger.error("API connection failed. Check your API key.")
-            return False
+    def _schedule_rewarm(self) -> None:
+        """Replace the connection once it idles out, ready for the next request.
 
-        # Initialize player
-        self._player = AudioPlayer()
-
-        # Initialize hotkey listener
-        self._hotkey_listener = HotkeyListener(
-            on_toggle=self._on_toggle,
-            on_pause=self._on_pause,
-            on_skip=self._on_skip,
-            hotkey_toggle=self.config.hotkey_toggle,
-            hotkey_pause=self.config.hotkey_pause,
-            hotkey_skip=self.config.hotkey_skip,
+        Fires once per idle gap, so an idle daemon goes quiet again after
+        one reconnect.
+        """
+        if not self._pool:
+            return
+        if self._rewarm_handle:
+            self._rewarm_handle.cancel()
+        self._rewarm_handle = asyncio.get_running_loop().call_later(
+            self.streaming.http_idle_timeout, self._warm_soon
         )
 
-        # Initialize IPC server
-        socket_path = get_socket_path()
-        self._ipc_server = IpcServer(socket_path, self._on_ipc_message)
+    def _record_request_timing(self, timing: RequestTiming) -> None:
+        """Add a synthesis request's TTFB split (called from worker threads)."""
+        with self._request_timing_lock:
+            stats = self._request_timing
+            stats["requests"] += 1
+            stats["reused"] += timing.reused
+            stats["connect"] += timing.connect
+            stats["server"] += timing.server
+
+    def _make_sinks(self) -> list[AudioSink]:
+        """Create the sinks the ``sink`` setting names, in fallback order."""
+        streaming = self.streaming
+        common = {
+            "audio_format": self._audio_format,
+            "byte_rate": streaming.sink_byte_rate or None,
+            "on_first_audio": self._record_first_audio,
+        }
+
+        choice = streaming.sink
+        if choice not in SINKS:
+            logger.warning("Unknown sink %r, using auto", choice)
+            choice = "auto"
+        if choice == "null":
+            return [NullSink(**common)]
+        if choice == "file":
+            directory = Path(streaming.sink_dir).expanduser() if streaming.sink_dir else None
+            return [FileSink(directory or self.config.get_config_dir() / "sink-audio", **common)]
+        if choice == "paced":
+            return [
+                PacedSink(
+                    streaming.sink_byte_rate or self._audio_format.byte_rate or DEFAULT_BYTE_RATE,
+                    streaming.sink_buffer_seconds,
+                    audio_format=self._audio_format,
+                    on_first_audio=self._record_first_audio,
+                )
+            ]
+
+        sinks: list[AudioSink] = []
+        if choice in ("auto", "mpv"):
+            sinks.append(MpvSink(streaming.mpv_path, streaming.persistent_player, **common))
+        command = shlex.split(streaming.fallback_player)
+        if choice in ("auto", "pipe") and command:
+            raw_command = shlex.split(streaming.fallback_raw_player) or None
+            sinks.append(PipeSink(command, streaming.fallback_prebuffer_kb * 1024, raw_command, **common))
+        if choice in ("auto", "player"):
+            sinks.append(PlayerSink(self._audio_player, **common))
+        return sinks
+
+    def _apply_audio_format(self, config: Config) -> AudioFormat:
+        """Choose the output format by the ``audio_format`` setting.
+
+        The choice replaces ``config.output_format``, which the synthesis
+        clients, the cache key and the cues all read.
+        """
+        streaming = self.streaming
+        audio_format = choose_format(
+            streaming.audio_format,
+            config.output_format,
+            streaming.latency_format,
+            streaming.bandwidth_format,
+        )
+        config.output_format = audio_format.name
+        return audio_format
+
+    async def _start_sinks(self) -> None:
+        """Warm up the sinks (mpv, so the first utterance skips the spawn)."""
+        with self._phase("audio sink"):
+            for sink in self._sinks:
+                await sink.start()
+
+    async def _start_hotkeys(self) -> None:
+        """Import and start the hotkey listener; its callbacks run on the loop."""
+        loop = asyncio.get_running_loop()
+
+        def on_loop(callback: Callable[[], None]) -> Callable[[], None]:
+            return lambda: loop.call_soon_threadsafe(callback)
+
+        def start() -> HotkeyListener:
+            from elevenlabs_tts.hotkey import HotkeyListener
+
+            listener = HotkeyListener(
+                on_toggle=on_loop(self._on_toggle),
+                on_pause=on_loop(self._on_pause),
+                on_skip=on_loop(self._on_skip),
+                hotkey_toggle=self.config.hotkey_toggle,
+                hotkey_pause=self.config.hotkey_pause,
+                hotkey_skip=self.config.hotkey_skip,
+            )
+            listener.start()
+            return listener
 
-        return True
+        with self._phase("hotkey listener"):
+            self._hotkey_listener = await asyncio.to_thread(start)
+
+    def _audio_player(self) -> AudioPlayer:
+        """The official buffered player, created on first use (blocking)."""
+        if self._player is None:
+            from elevenlabs_tts.audio_player import AudioPlayer
+
+            self._player = AudioPlayer()
+        return self._player
+
+    def _sound(self, name: str) -> asyncio.Future:
+        """Play a sound effect in a worker thread, off the event loop."""
+        return asyncio.get_running_loop().run_in_executor(None, _play_sound, name)
 
     def _on_toggle(self) -> None:
         """Handle toggle hotkey."""
-        with self._lock:
-            self._auto_read_enabled = not self._auto_read_enabled
+        self._auto_read_enabled = not self._auto_read_enabled
         status = "enabled" if self._auto_read_enabled else "disabled"
         logger.info("Auto-read %s", status)
         if self.config.sound_effects:
-            play_sound("start" if self._auto_read_enabled else "stop")
+            self._sound("start" if self._auto_read_enabled else "stop")
 
     def _on_pause(self) -> None:
         """Handle pause hotkey."""
         if self._player:
             self._player.toggle_pause()
             if self.config.sound_effects:
-                play_sound("start" if not self._player.is_paused else "stop")
+                self._sound("start" if not self._player.is_paused else "stop")
 
     def _on_skip(self) -> None:
         """Handle skip hotkey."""
-        if self._player:
-            self._player.skip()
-            if self.config.sound_effects:
-                play_sound("stop")
+        if self.skip() and self.config.sound_effects:
+            self._sound("stop")
 
-    def _on_ipc_message(self, message: dict) -> None:
+    def _on_ipc_message(self, message: dict, reply: Reply) -> dict | None:
         """Handle IPC message from hook handler.
 
         Args:
             message: Message dictionary with 'type' and 'text' keys.
+            reply: Sends a message back to the client; used for utterance
+                events when the message asks for them with "notify".
+
+        Returns:
+            Fields for the acknowledgement ("stats" answers with them).
+
+        Raises:
+            IpcRequestError: If the message is not understood.
         """
+        # A voice change must apply to this message
+        self._check_voice_config()
+
+        events = reply if message.get("notify") else None
         msg_type = message.get("type")
+        priority = message.get("priority", AUTO)
+        if priority not in PRIORITIES:
+            logger.warning("Unknown priority %r, using %r", priority, AUTO)
+            priority = AUTO
+
         if msg_type == "speak":
             text = message.get("text", "")
             if text:
-                self.speak(text)
+                self.speak(text, priority, reply=events)
+        elif msg_type == "cue":
+            name = message.get("name", "")
+            if name == "listening":
+                # The user is dictating; a response to synthesize follows
+                self._warm_soon()
+            if name:
+                self.cue(name, fallback_text=message.get("text"), reply=events)
+        elif msg_type in ("speak_begin", "speak_chunk", "speak_end"):
+            stream_id = message.get("id")
+            if not stream_id:
+                raise IpcRequestError(f"{msg_type} without an utterance id")
+            if msg_type == "speak_begin":
+                self.speak_begin(str(stream_id), priority, reply=events)
+            elif msg_type == "speak_chunk":
+                self.speak_chunk(str(stream_id), message.get("text", ""))
+            else:
+                self.speak_end(str(stream_id))
+        elif msg_type == "skip":
+            return {"skipped": self.skip()}
+        elif msg_type == "clear":
+            cleared = self.clear_queue()
+            return {"cleared": cleared, "skipped": bool(message.get("skip")) and self.skip()}
+        elif msg_type == "ping":
+            # Answered by the IPC server's acknowledgement
+            pass
+        elif msg_type == "stats":
+            return {"stats": self.stats()}
         else:
-            logger.warning("Unknown IPC message type: %s", msg_type)
+            raise IpcRequestError(f"unknown message type {msg_type!r}")
+        return None
+
+    def stats(self) -> dict:
+        """Live metrics: per-utterance percentiles, sinks and the queue."""
+        snapshot = self._latency.snapshot()
+        snapshot["sinks"] = {
+            sink.name: {
+                "utterances": sink.stats.utterances,
+                "bytes_per_second": round(sink.stats.bytes_per_second),
+                "underruns": sink.stats.underruns,
+            }
+            for sink in self._sinks
+        }
+        snapshot["queue"] = {"depth": len(self._speak_queue), "dropped": dict(self._speak_queue.dropped)}
+        snapshot["coalesce"] = self._coalescer.stats.as_dict()
+        snapshot["rate_limit"] = self._limiter.stats()
+        return snapshot
+
+    def skip(self) -> bool:
+        """Stop the utterance playing now.
+
+        Returns:
+            False if nothing was playing.
+        """
+        return self._interrupt("skipped")
 
-    def speak(self, text: str) -> None:
+    def clear_queue(self) -> int:
+        """Drop every utterance waiting, and speak requests not yet queued.
+
+        Each is reported as finished with outcome "dropped", reason
+        "cleared". The utterance playing is left alone (see ``skip``).
+
+        Returns:
+            How many were dropped.
+        """
+        pending = self._coalescer.clear()
+        for request in pending:
+            utterance_id, reply, _ = request.context
+            _send_event(reply, utterance_id, "finished", outcome="dropped", reason="cleared")
+        cleared = len(pending) + self._speak_queue.clear("cleared")
+        if cleared:
+            logger.info("Cleared %d waiting utterances", cleared)
+        return cleared
+
+    def _interrupt(self, reason: str) -> bool:
+        """Stop the utterance playing now, and its synthesis.
+
+        Its token is cancelled first, so worker threads blocked on the API
+        for it return at once, then its task, which stops the sink.
+
+        Args:
+            reason: Why, reported with its "finished" event.
+
+        Returns:
+            False if nothing was playing.
+        """
+        utterance, task = self._current, self._current_task
+        if utterance is None or task is None or task.done():
+            return False
+        if utterance.cancel.cancel(reason):
+            utterance.sample.cancelled = utterance.cancel.cancelled_at
+        task.cancel()
+        return True
+
+    def speak(self, text: str, priority: str = AUTO, reply: Reply | None = None) -> None:
         """Queue text for TTS playback.
 
+        The text goes through the coalescer first: it may wait up to
+        ``coalesce_window`` to be merged with more text of the same
+        priority, and is dropped if it repeats a recent request.
+
         Args:
             text: Text to speak.
+            priority: Queue class (see speak_queue.PRIORITIES).
+            reply: Where to send the utterance's events, if anywhere.
         """
+        utterance_id = str(next(self._utterance_ids))
         if not self._auto_read_enabled:
             logger.debug("Auto-read disabled, skipping")
+            _send_event(reply, utterance_id, "finished", outcome="ignored")
             return
 
         # Filter text
+        started = time.monotonic()
         filtered_text = self._filter_text(text)
+        filter_seconds = time.monotonic() - started
         if not filtered_text:
             logger.debug("No text after filtering")
+            _send_event(reply, utterance_id, "finished", outcome="ignored")
+            return
+
+        request = SpeakRequest(filtered_text, priority, (utterance_id, reply, filter_seconds))
+        if not self._coalescer.add(request):
+            logger.debug("Dropped repeated text (%d chars)", len(filtered_text))
+            _send_event(reply, utterance_id, "finished", outcome="dropped", reason="duplicate")
+
+    def _queue_requests(self, requests: list[SpeakRequest[tuple[str, Reply | None, float]]]) -> None:
+        """Queue a batch of speak requests from the coalescer as one utterance.
+
+        The utterance takes the first request's id; every request's client
+        is sent the utterance's events under its own id.
+        """
+        # Separate requests are separate text (the filter strips their ends)
+        text = " ".join(request.text for request in requests)
+        sample = UtteranceSample(filter=sum(request.context[2] for request in requests), chars=len(text))
+        utterance_id, reply, _ = requests[0].context
+        if len(requests) > 1:
+            reply = _fan_out([(request.context[1], request.context[0]) for request in requests])
+        utterance = Utterance(text, priority=requests[0].priority, id=utterance_id, reply=reply, sample=sample)
+        if self._enqueue(utterance):
+            if len(requests) > 1:
+                logger.debug("Queued %d merged requests for TTS (%d chars)", len(requests), len(text))
+            else:
+                logger.debug("Queued text for TTS (%d chars)", len(text))
+
+    def speak_begin(self, stream_id: str, priority: str = AUTO, reply: Reply | None = None) -> None:
+        """Start an utterance whose text arrives in pieces.
+
+        Args:
+            stream_id: Client-chosen id for the following speak_chunk and
+                speak_end messages, also used as the utterance id in events.
+            priority: Queue class (see speak_queue.PRIORITIES).
+            reply: Where to send the utterance's events, if anywhere.
+        """
+        # Text already sent with speak goes first
+        self._coalescer.flush()
+        now = time.monotonic()
+        stream = None
+        if self._auto_read_enabled:
+            stream = SpeechStream(
+                IncrementalFilter(self.config.skip_code_blocks),
+                SegmentFeed(self.streaming.stream_idle_timeout),
+                priority=priority,
+                begun_at=now,
+                last_seen=now,
+                reply=reply,
+            )
+        else:
+            logger.debug("Auto-read disabled, skipping")
+            _send_event(reply, stream_id, "finished", outcome="ignored")
+
+        # Forget streams whose client went away without speak_end
+        for old_id, old in list(self._streams.items()):
+            if old is None or now - old.last_seen > self.streaming.stream_idle_timeout:
+                if old is not None:
+                    old.feed.close()
+                del self._streams[old_id]
+        self._streams[stream_id] = stream
+
+    def speak_chunk(self, stream_id: str, text: str) -> None:
+        """Add a piece of text to an utterance started with speak_begin.
+
+        Sentences that became final are filtered and queued for synthesis
+        right away; the rest waits for more text.
+
+        Args:
+            stream_id: Id given to speak_begin.
+            text: Next piece of raw text.
+        """
+        if stream_id not in self._streams:
+            logger.warning("speak_chunk for unknown utterance %r", stream_id)
             return
+        stream = self._streams[stream_id]
+        if stream is not None:
+            stream.last_seen = time.monotonic()
+            text = stream.filter.feed(text)
+            stream.sample.filter += time.monotonic() - stream.last_seen
+            self._release(stream, text, stream_id)
 
-        self._speak_queue.put(filtered_text)
-        logger.debug("Queued text for TTS (%d chars)", len(filtered_text))
+    def speak_end(self, stream_id: str) -> None:
+        """Finish an utterance started with speak_begin.
+
+        Args:
+            stream_id: Id given to speak_begin.
+        """
+        if stream_id not in self._streams:
+            logger.warning("speak_end for unknown utterance %r", stream_id)
+            return
+        stream = self._streams.pop(stream_id)
+        if stream is None:
+            return
+        started = time.monotonic()
+        text = stream.filter.finish()
+        stream.sample.filter += time.monotonic() - started
+        self._release(stream, text, stream_id)
+        stream.feed.close()
+        if not stream.queued:
+            logger.debug("No text after filtering")
+            _send_event(stream.reply, stream_id, "finished", outcome="ignored")
+
+    def _release(self, stream: SpeechStream, text: str, stream_id: str) -> None:
+        """Send newly final text of a stream on to synthesis.
+
+        Args:
+            stream: The utterance.
+            text: Filtered text released by its filter.
+            stream_id: Id given to speak_begin.
+        """
+        if not text or stream.truncated:
+            return
+        remaining = self.config.max_text_length - stream.chars
+        if len(text) > remaining:
+            text = text[: max(remaining, 0)] + "... text truncated."
+            stream.truncated = True
+        stream.chars += len(text)
+        stream.sample.chars = stream.chars
+
+        # Only the very first segment of the utterance is kept short
+        first_max_chars = self.streaming.first_segment_max_chars
+        if stream.queued:
+            first_max_chars = self.streaming.segment_max_chars
+        segments = split_segments(
+            text,
+            first_max_chars=first_max_chars,
+            max_chars=self.streaming.segment_max_chars,
+        )
+        for segment in segments:
+            stream.feed.put(segment)
+
+        if not stream.queued and segments:
+            stream.queued = True
+            utterance = Utterance(
+                text,
+                segments=stream.feed,
+                priority=stream.priority,
+                id=stream_id,
+                reply=stream.reply,
+                sample=stream.sample,
+            )
+            if not self._enqueue(utterance):
+                return
+            logger.debug(
+                "Queued streamed text for TTS, first sentence final after %.0f ms",
+                (time.monotonic() - stream.begun_at) * 1000,
+            )
+
+    def cue(self, name: str, fallback_text: str | None = None, reply: Reply | None = None) -> None:
+        """Queue a pre-rendered confirmation phrase.
+
+        If the cue has not been rendered yet (or failed to render), its
+        text is spoken through the normal path instead.
+
+        Args:
+            name: Cue name (see phrase_bank.DEFAULT_CUES).
+            fallback_text: Text to speak for a cue the daemon doesn't know.
+            reply: Where to send the utterance's events, if anywhere.
+        """
+        utterance_id = str(next(self._utterance_ids))
+        if not self._auto_read_enabled:
+            logger.debug("Auto-read disabled, skipping")
+            _send_event(reply, utterance_id, "finished", outcome="ignored")
+            return
+
+        audio = self._phrases.get(name) if self._phrases else None
+        if audio is None:
+            text = (self._phrases.text(name) if self._phrases else None) or fallback_text
+            if not text:
+                logger.warning("Unknown cue: %s", name)
+                _send_event(reply, utterance_id, "finished", outcome="ignored")
+                return
+            logger.debug("Cue %r not rendered, synthesizing", name)
+            self.speak(text, CUE, reply=reply)
+            return
+
+        utterance = Utterance(name, audio=audio, priority=CUE, id=utterance_id, reply=reply)
+        if self._enqueue(utterance):
+            logger.debug("Queued cue %r", name)
+
+    def _enqueue(self, utterance: Utterance) -> bool:
+        """Queue an utterance, interrupting auto-read for anything higher.
+
+        Args:
+            utterance: Utterance to queue.
+
+        Returns:
+            True if queued, False if dropped because the queue is full.
+        """
+        if not self._speak_queue.put(utterance, utterance.priority):
+            return False
+        self._notify(utterance, "queued", priority=utterance.priority)
+        current = self._current
+        if (
+            self.streaming.preempt_auto_read
+            and current is not None
+            and current.priority == AUTO
+            and utterance.priority != AUTO
+            and self._interrupt("preempted")
+        ):
+            logger.info("Interrupting auto-read for %s speech", utterance.priority)
+        return True
+
+    def _notify(self, utterance: Utterance, event: str, **fields: object) -> None:
+        """Send an event for an utterance to the client that asked for it.
+
+        Args:
+            utterance: The utterance.
+            event: "queued", "synthesis-started", "first-audio" or
+                "finished".
+            **fields: Extra fields, e.g. the outcome of "finished".
+        """
+        _send_event(utterance.reply, utterance.id, event, **fields)
 
     def _filter_text(self, text: str) -> str:
         """Filter text for TTS output.
@@ -171,21 +901,7 @@ class TTSDaemon:
         Returns:
             Filtered text suitable for TTS.
         """
-        # Remove code blocks if configured
-        if self.config.skip_code_blocks:
-            text = re.sub(r"```[\s\S]*?```", "[code block]", text)
-            # Keep inline code content but remove backticks
-            text = re.sub(r"`([^`]+)`", r"\1", text)
-
-        # Remove markdown formatting
-        text = re.sub(r"\*\*([^*]+)\*\*", r"\1", text)  # bold
-        text = re.sub(r"\*([^*]+)\*", r"\1", text)  # italic
-        text = re.sub(r"\[([^\]]+)\]\([^)]+\)", r"\1", text)  # links
-        text = re.sub(r"^#+\s*", "", text, flags=re.MULTILINE)  # headers
-
-        # Remove excessive whitespace
-        text = re.sub(r"\n\s*\n", "\n\n", text)
-        text = text.strip()
+        text = markdown_to_speech(text, self.config.skip_code_blocks)
 
         # Truncate if too long
         if len(text) > self.config.max_text_length:
@@ -193,22 +909,48 @@ class TTSDaemon:
 
         return text
 
-    def _speak_worker(self) -> None:
-        """Worker thread for TTS playback."""
-        while not self._stop_event.is_set():
-            try:
-                text = self._speak_queue.get(timeout=0.5)
-            except queue.Empty:
-                continue
+    async def _speak_worker(self) -> None:
+        """Play queued utterances one at a time."""
+        while True:
+            utterance = await self._speak_queue.get()
+            utterance.sample.queue_wait = self._speak_queue.last_wait
 
+            # Played in its own task so a higher priority can cancel it
+            task = asyncio.create_task(self._stream_and_play(utterance))
+            self._current, self._current_task = utterance, task
             try:
-                self._stream_and_play(text)
-            except Exception as e:
-                logger.error("TTS playback failed: %s", e)
+                await asyncio.wait({task})
+            except asyncio.CancelledError:
+                task.cancel()
+                await asyncio.wait({task})
+                raise
+            finally:
+                self._current = self._current_task = None
+                sample = utterance.sample
+                if sample.cancelled is not None:
+                    sample.silenced = time.monotonic()
+                    logger.info(
+                        "Utterance %s %s, silent after %.0f ms",
+                        utterance.id,
+                        utterance.cancel.reason,
+                        (sample.silenced - sample.cancelled) * 1000,
+                    )
+                self._latency.record(sample)
+
+            if task.cancelled():
+                reason = {"reason": utterance.cancel.reason} if utterance.cancel.reason else {}
+                self._notify(utterance, "finished", outcome="interrupted", **reason)
+                continue
+            error = task.exception()
+            if error is not None:
+                logger.error("TTS playback failed: %s", error)
                 if self.config.sound_effects:
-                    play_sound("error")
+                    self._sound("error")
+            played = error is None and task.result()
+            self._notify(utterance, "finished", outcome="played" if played else "failed")
+            self._schedule_rewarm()
 
-    def _stream_and_play(self, text: str) -> None:
+    async def _stream_and_play(self, utterance: Utterance) -> bool:
         """Stream TTS audio and play it with TRUE STREAMING.
 
         ============================================================
@@ -219,66 +961,359 @@ class TTSDaemon:
         directly to mpv as chunks arrive. This reduces latency
         from ~2-3 seconds to ~500ms.
 
+        The audio goes to the first available sink (see audio_sink.py):
+        by default the persistent mpv, or a new mpv per utterance, and
+        without mpv at all a stdin player or the official player. Cues
+        play their pre-rendered audio without the start/complete sound
+        effects.
+
         Args:
-            text: Text to convert and play.
+            utterance: Text (or cue audio) to play.
+
+        Returns:
+            True if the utterance was played, False if it failed.
         """
-        if not self._client or not self._player:
-            return
+        # Queued before the API client finished loading
+        await self._client_ready.wait()
 
-        if self.config.sound_effects:
-            play_sound("start")
+        sound_effects = self.config.sound_effects and utterance.audio is None
+        if sound_effects:
+            await self._sound("start")
 
-        # TRUE STREAMING: Pipe chunks directly to mpv as they arrive
-        try:
-            # Start mpv with stdin streaming
-            process = subprocess.Popen(
-                ["mpv", "--no-video", "--really-quiet", "-"],
-                stdin=subprocess.PIPE,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-            )
+        def on_playing() -> None:
+            utterance.sample.first_audio = time.monotonic()
+            self._notify(utterance, "first-audio")
 
-            # Stream chunks directly to player AS they arrive
-            for chunk in self._client.stream(text):
-                if self._stop_event.is_set():
-                    process.terminate()
-                    return
-                if chunk and process.stdin:
-                    process.stdin.write(chunk)
-                    process.stdin.flush()
-
-            # Close stdin and wait for playback
-            if process.stdin:
-                process.stdin.close()
-            process.wait()
-
-        except FileNotFoundError:
-            logger.warning("mpv not found, falling back to buffered playback")
-            logger.warning("Install mpv for true streaming: brew install mpv (macOS) or apt install mpv (Linux)")
-            # Fallback to original buffered approach
-            chunks: list[bytes] = []
-            try:
-                for chunk in self._client.stream(text):
-                    if self._stop_event.is_set():
-                        return
-                    chunks.append(chunk)
-            except Exception as e:
-                logger.error("TTS streaming failed: %s", e)
-                if self.config.sound_effects:
-                    play_sound("error")
-                return
-            if chunks:
-                audio_data = b"".join(chunks)
-                self._player.play_audio(audio_data)
-                self._player.wait_until_done()
+        started_at = time.monotonic()
+        try:
+            while True:
+                if not self._sinks:
+                    raise RuntimeError("no audio sink available")
+                sink = self._sinks[0]
+                try:
+                    async with aclosing(self._chunks(utterance)) as chunks:
+                        await sink.play(chunks, started_at, on_playing, label=utterance.id)
+                    break
+                except FileNotFoundError as e:
+                    # Not installed; no audio was read, so the next sink starts over
+                    self._sinks.pop(0)
+                    if self._sinks:
+                        logger.warning(
+                            "%s sink unavailable (%s), falling back to %s", sink.name, e, self._sinks[0].name
+                        )
+                    else:
+                        logger.warning("%s sink unavailable: %s", sink.name, e)
+                    if isinstance(sink, MpvSink):
+                        logger.warning(
+                            "Install mpv for true streaming: brew install mpv (macOS) or apt install mpv (Linux)"
+                        )
         except Exception as e:
             logger.error("TTS streaming failed: %s", e)
             if self.config.sound_effects:
-                play_sound("error")
+                self._sound("error")
+            return False
+
+        if sound_effects:
+            await self._sound("complete")
+        return True
+
+    async def _chunks(self, utterance: Utterance) -> AsyncIterator[bytes]:
+        """Audio source for an utterance, timed into its sample."""
+        sample = utterance.sample
+        if utterance.audio is not None:
+            sample.first_byte = time.monotonic()
+            yield utterance.audio
             return
+        self._notify(utterance, "synthesis-started")
+        # A sink that wasn't installed starts over with a new source
+        sample.synthesis_started = time.monotonic()
+        sample.first_byte = sample.last_byte = None
+        sample.bytes = 0
+        if utterance.segments is not None:
+            source = self._segment_stream(utterance.segments, utterance.cancel)
+        else:
+            source = self._audio_stream(utterance.text, utterance.cancel)
+        async with aclosing(source):
+            async for chunk in source:
+                if sample.first_byte is None:
+                    sample.first_byte = time.monotonic()
+                sample.bytes += len(chunk)
+                yield chunk
+        sample.last_byte = time.monotonic()
+
+    def _audio_stream(self, text: str, cancel: CancelToken | None = None) -> AsyncIterator[bytes]:
+        """Stream encoded audio for text, pipelined by sentence if enabled.
 
-        if self.config.sound_effects:
-            play_sound("complete")
+        Args:
+            text: Filtered text.
+            cancel: The utterance's token.
+
+        Returns:
+            Audio chunks in playback order.
+        """
+        if not self.streaming.pipeline or self._pipeline is None:
+            return self._synthesize(text, cancel)
+
+        segments = split_segments(
+            text,
+            first_max_chars=self.streaming.first_segment_max_chars,
+            max_chars=self.streaming.segment_max_chars,
+        )
+        if len(segments) <= 1:
+            return self._synthesize(text, cancel)
+        logger.debug("Synthesizing %d segments", len(segments))
+        return self._pipeline.stream(segments, lambda segment: self._synthesize(segment, cancel))
+
+    async def _segment_stream(self, segments: SegmentFeed, cancel: CancelToken | None = None) -> AsyncIterator[bytes]:
+        """Stream encoded audio for segments that may still be arriving.
+
+        Args:
+            segments: Filtered segments in playback order.
+            cancel: The utterance's token.
+
+        Yields:
+            Audio chunks in playback order.
+        """
+        if self.streaming.pipeline and self._pipeline is not None:
+            source = self._pipeline.stream(segments, lambda segment: self._synthesize(segment, cancel))
+            async with aclosing(source):
+                async for chunk in source:
+                    yield chunk
+            return
+
+        async for segment in segments:
+            async with aclosing(self._synthesize(segment, cancel)) as source:
+                async for chunk in source:
+                    yield chunk
+
+    def _synthesize(self, text: str, cancel: CancelToken | None = None) -> AsyncIterator[bytes]:
+        """Stream audio for one synthesis request without blocking the loop.
+
+        Args:
+            text: Text for a single request (whole text or one segment).
+            cancel: The utterance's token.
+
+        Returns:
+            Audio chunks, handed over from a worker thread.
+        """
+        return iterate_in_thread(self._synthesize_blocking(text, cancel))
+
+    def _synthesize_blocking(self, text: str, cancel: CancelToken | None = None) -> Iterator[bytes]:
+        """Stream audio for one synthesis request, via the cache if enabled.
+
+        Blocking; runs in a worker thread (or the phrase bank's thread).
+
+        Args:
+            text: Text for a single request (whole text or one segment).
+            cancel: The utterance's token. Our own client's connection is
+                shut down the moment it is cancelled; the official client
+                stops after its current chunk.
+
+        Yields:
+            Audio chunks, read from disk on a cache hit.
+        """
+        synthesis = self._synthesis
+        if synthesis is not None:
+            open_stream = synthesis.stream
+            if cancel is not None:
+
+                def open_stream(text: str) -> Iterator[bytes]:
+                    return synthesis.stream(text, cancel)
+
+            yield from self._stream_through(text, open_stream, cancel)
+            return
+
+        # Held so a voice change doesn't close the client under this stream
+        with self._client_lock:
+            client = self._client
+            self._client_streams += 1
+        assert client is not None
+        try:
+            yield from self._stream_through(text, client.stream, cancel)
+        finally:
+            with self._client_lock:
+                self._client_streams -= 1
+                retired = [] if self._client_streams else self._retired_clients
+                if retired:
+                    self._retired_clients = []
+            for old in retired:
+                old.close()
+
+    def _stream_through(
+        self,
+        text: str,
+        open_stream: Callable[[str], Iterator[bytes]],
+        cancel: CancelToken | None,
+    ) -> Iterator[bytes]:
+        """Stream audio from ``open_stream`` through the limiter and cache."""
+        if self._cache is None:
+            yield from self._limiter.stream(text, open_stream, cancel)
+            return
+
+        key = cache_key(text, self.config)
+        cached = self._cache.get(key)
+        if cached is not None:
+            logger.debug("Audio cache hit (%d chars)", len(text))
+            yield from cached
+            return
+        yield from self._cache.record(key, self._limiter.stream(text, open_stream, cancel))
+
+    def _watch_config(self) -> None:
+        """Check config.toml now and every CONFIG_POLL_INTERVAL seconds.
+
+        A voice change is picked up while the daemon is idle, so the cues
+        are re-rendered before the next one is asked for.
+        """
+        self._check_voice_config()
+        self._config_watch = asyncio.get_running_loop().call_later(CONFIG_POLL_INTERVAL, self._watch_config)
+
+    def _check_voice_config(self) -> None:
+        """Pick up voice setting changes in config.toml.
+
+        Rebuilds the client synthesis goes through with the new settings
+        (the official one only without http_pool, where it is the one used)
+        and re-renders the cues. In-flight streams finish on the old client,
+        which is closed once the last of them has.
+        """
+        config_path = self.config.get_config_dir() / "config.toml"
+        try:
+            mtime = config_path.stat().st_mtime
+        except OSError:
+            return
+        if mtime == self._config_mtime:
+            return
+        first_check = self._config_mtime is None
+        self._config_mtime = mtime
+        if first_check:
+            return
+
+        new_config = Config.load()
+        audio_format = self._apply_audio_format(new_config)
+        if _voice_settings(new_config) == _voice_settings(self.config):
+            return
+        api_key = new_config.get_api_key()
+        if not api_key:
+            return
+
+        logger.info("Voice settings changed, reloading")
+        self.config = new_config
+        self._audio_format = audio_format
+        for sink in self._sinks:
+            sink.audio_format = audio_format
+        if self._pool:
+            self._synthesis = SynthesisClient(api_key, new_config, self._pool, self._record_request_timing)
+        else:
+            # Streams still on the old client finish first, then it is closed
+            client = _new_client(api_key, new_config)
+            with self._client_lock:
+                old, self._client = self._client, client
+                if old is not None:
+                    if self._client_streams:
+                        self._retired_clients.append(old)
+                        old = None
+            if old is not None:
+                old.close()
+        if self._phrases:
+            self._phrases.refresh()
+
+    def _record_first_audio(self, kind: str, seconds: float) -> None:
+        """Record a time-to-first-audio sample.
+
+        Args:
+            kind: How it was played, as the sink reports it: "cold
+                player" (mpv spawned for this utterance), "warm player"
+                (persistent mpv reused), "spawn player" (mpv per
+                utterance), "fallback player" (stdin player), "official
+                player", or the null, file or paced sink.
+            seconds: Time from utterance start to first audio.
+        """
+        stats = self._first_audio.setdefault(kind, [0, 0.0])
+        stats[0] += 1
+        stats[1] += seconds
+        logger.info("Time to first audio: %.0f ms (%s)", seconds * 1000, kind)
+
+    def _log_first_audio_summary(self) -> None:
+        """Log average time-to-first-audio per player kind."""
+        for kind, (count, total) in sorted(self._first_audio.items()):
+            logger.info(
+                "Average time to first audio (%s): %.0f ms over %d utterances",
+                kind,
+                total / count * 1000,
+                count,
+            )
+
+    def _log_request_timing_summary(self) -> None:
+        """Log where synthesis time to first byte went."""
+        stats = self._request_timing
+        if not stats["requests"]:
+            return
+        count = stats["requests"]
+        logger.info(
+            "Synthesis TTFB: %.0f ms average (connect %.0f ms, server %.0f ms) over %d requests, %d on open connections",
+            (stats["connect"] + stats["server"]) / count * 1000,
+            stats["connect"] / count * 1000,
+            stats["server"] / count * 1000,
+            count,
+            stats["reused"],
+        )
+
+    def _log_queue_summary(self) -> None:
+        """Log queue wait per priority class and dropped utterances."""
+        for priority, waits in self._speak_queue.waits.items():
+            if waits.count:
+                logger.info(
+                    "Queue wait (%s): %.0f ms average, %.0f ms max over %d utterances",
+                    priority,
+                    waits.total / waits.count * 1000,
+                    waits.max * 1000,
+                    waits.count,
+                )
+        for reason, count in sorted(self._speak_queue.dropped.items()):
+            logger.info("Dropped utterances (%s): %d", reason, count)
+
+    def _log_coalesce_summary(self) -> None:
+        """Log the synthesis requests and characters coalescing saved."""
+        stats = self._coalescer.stats
+        if stats.requests_saved:
+            logger.info(
+                "Coalescing: %d of %d speak requests saved (%d merged, %d repeats of %d chars dropped)",
+                stats.requests_saved,
+                stats.requests,
+                stats.merged,
+                stats.duplicates,
+                stats.duplicate_chars,
+            )
+
+    def _log_rate_limit_summary(self) -> None:
+        """Log synthesis retries, failures and time spent throttled."""
+        stats = self._limiter.stats()
+        if not stats["requests"]:
+            return
+        failures = ", ".join(f"{count} {kind}" for kind, count in sorted(stats["failures"].items()))
+        logger.info(
+            "Synthesis requests: %d, %d retries, %d given up, %d refused by the circuit breaker "
+            "(%d trips), %.1f s throttled; failures: %s",
+            stats["requests"],
+            stats["retries"],
+            stats["gave_up"],
+            stats["rejected"],
+            stats["circuit_trips"],
+            stats["throttled_seconds"],
+            failures or "none",
+        )
+
+    def _log_sink_summary(self) -> None:
+        """Log what each sink was given: throughput and underruns."""
+        for sink in self._sinks:
+            stats = sink.stats
+            if stats.utterances:
+                logger.info(
+                    "Audio sink (%s): %d utterances, %.1f KB/s delivered, %d underruns",
+                    sink.name,
+                    stats.utterances,
+                    stats.bytes_per_second / 1000,
+                    stats.underruns,
+                )
 
     def run(self) -> int:
         """Run the daemon.
@@ -286,73 +1321,125 @@ class TTSDaemon:
         Returns:
             Exit code (0 for success, non-zero for failure).
         """
-        if not self._init_components():
-            return 1
+        return asyncio.run(self._run())
 
-        self._running = True
+    async def _run(self) -> int:
+        """Start the components and serve until a shutdown signal.
 
-        # Setup signal handlers
-        signal.signal(signal.SIGTERM, self._signal_handler)
-        signal.signal(signal.SIGINT, self._signal_handler)
-
-        # Start components
-        if self._ipc_server:
-            self._ipc_server.start()
+        Returns:
+            Exit code (0 for success, non-zero for failure).
+        """
+        api_key = self.config.get_api_key()
+        if not api_key:
+            logger.error("No API key configured. Run /elevenlabs-tts:setup first.")
+            self._notifier.send("STOPPING=1", "STATUS=No API key configured")
+            return 1
 
-        if self._hotkey_listener:
-            self._hotkey_listener.start()
+        # Setup signal handlers
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, self._signal_handler, signum)
+
+        # Accept speech first; everything it needs loads behind the socket
+        with self._phase("ipc server"):
+            self._ipc_server = AsyncIpcServer(get_socket_path(), self._on_ipc_message)
+            await self._ipc_server.start()
+
+        self._pipeline = SegmentPipeline(self._synthesize, self.streaming.pipeline_concurrency)
+        if self.streaming.http_pool:
+            context = None
+            if self.streaming.api_ca_file:
+                context = ssl.create_default_context(cafile=self.streaming.api_ca_file)
+            try:
+                self._pool = ConnectionPool(
+                    self.streaming.api_url,
+                    self.streaming.http_pool_size,
+                    self.streaming.http_idle_timeout,
+                    context,
+                )
+            except ValueError as e:
+                logger.warning("Not using http_pool (%s); synthesizing through the official client", e)
+            else:
+                if self._pool.proxy:
+                    logger.info("http_pool connects through proxy %s:%d", *self._pool.proxy[:2])
+        if self.streaming.cache:
+            self._cache = AudioCache(
+                self.config.get_config_dir() / "audio-cache",
+                self.streaming.cache_max_mb * 1024 * 1024,
+            )
+        self._phrases = PhraseBank(self._synthesize_blocking, {**DEFAULT_CUES, **self.streaming.cues})
+        self._sinks = self._make_sinks()
 
-        # Start speak worker
-        self._speak_thread = threading.Thread(target=self._speak_worker, daemon=True)
-        self._speak_thread.start()
+        self._speak_task = asyncio.create_task(self._speak_worker())
+        self._startup_task = asyncio.create_task(self._start_components(api_key))
+        self._watch_config()
 
         # Write PID file
         pid_path = self.config.get_config_dir() / "daemon.pid"
         pid_path.parent.mkdir(parents=True, exist_ok=True)
         pid_path.write_text(str(os.getpid()))
+        self._notifier.send("READY=1", f"MAINPID={os.getpid()}")
 
         logger.info("TTS daemon started (PID %d)", os.getpid())
         logger.info("Auto-read: %s", "enabled" if self._auto_read_enabled else "disabled")
         logger.info("Voice: %s", self.config.voice_id)
+        logger.info("Audio format: %s", self._audio_format.name)
         logger.info("Toggle hotkey: %s", self.config.hotkey_toggle)
         logger.info("Pause hotkey: %s", self.config.hotkey_pause)
         logger.info("Skip hotkey: %s", self.config.hotkey_skip)
 
-        # Main loop
-        try:
-            while self._running and not self._stop_event.is_set():
-                time.sleep(0.5)
-        except KeyboardInterrupt:
-            pass
+        # Idle until asked to stop: all work is driven by events
+        await self._stop_requested.wait()
 
-        self.stop()
-        return 0
+        await self.stop()
+        return self._exit_code
 
-    def _signal_handler(self, signum: int, frame) -> None:
+    def _signal_handler(self, signum: int) -> None:
         """Handle shutdown signals."""
         logger.info("Received signal %d, shutting down...", signum)
-        self._running = False
-        self._stop_event.set()
+        self._stop_requested.set()
 
-    def stop(self) -> None:
+    async def stop(self) -> None:
         """Stop the daemon and cleanup."""
-        self._running = False
-        self._stop_event.set()
+        self._notifier.send("STOPPING=1")
+
+        if self._startup_task and not self._startup_task.done():
+            self._startup_task.cancel()
+            await asyncio.wait({self._startup_task})
 
         if self._hotkey_listener:
             self._hotkey_listener.stop()
 
         if self._ipc_server:
-            self._ipc_server.stop()
+            await self._ipc_server.stop()
 
         if self._player:
             self._player.stop()
 
-        if self._client:
-            self._client.close()
+        # Cancelling the worker stops the current utterance
+        if self._speak_task:
+            self._speak_task.cancel()
+            try:
+                await asyncio.wait_for(self._speak_task, 2.0)
+            except (asyncio.CancelledError, asyncio.TimeoutError):
+                pass
 
-        if self._speak_thread and self._speak_thread.is_alive():
-            self._speak_thread.join(timeout=2.0)
+        self._coalescer.close()
+        self._limiter.close()
+        for sink in self._sinks:
+            await sink.close()
+
+        if self._rewarm_handle:
+            self._rewarm_handle.cancel()
+        if self._config_watch:
+            self._config_watch.cancel()
+        if self._warm_task and not self._warm_task.done():
+            self._warm_task.cancel()
+        if self._pool:
+            self._pool.close()
+        for client in [self._client, *self._retired_clients]:
+            if client:
+                client.close()
 
         # Remove PID file
         pid_path = self.config.get_config_dir() / "daemon.pid"
@@ -362,6 +1449,15 @@ class TTSDaemon:
             except OSError:
                 pass
 
+        self._log_first_audio_summary()
+        self._log_request_timing_summary()
+        self._log_queue_summary()
+        self._log_coalesce_summary()
+        self._log_rate_limit_summary()
+        self._log_sink_summary()
+        if self._cache:
+            stats = self._cache.stats
+            logger.info("Audio cache: %d hits, %d misses", stats["hits"], stats["misses"])
         logger.info("TTS daemon stopped")
 
 
@@ -394,25 +1490,31 @@ def is_running() -> bool:
     return get_pid() is not None
 
 
-def start_daemon(background: bool = False) -> int:
+def start_daemon(background: bool = False, startup_profile: bool = False) -> int:
     """Start the TTS daemon.
 
     Args:
         background: If True, spawn daemon in background.
+        startup_profile: Print startup phase timings once startup is done
+            (foreground only).
 
     Returns:
         Exit code.
     """
+    profile = StartupProfile() if startup_profile else None
     if is_running():
         logger.warning("Daemon is already running (PID %d)", get_pid())
         return 0
 
-    config = Config.load()
+    with profile.phase("config") if profile else nullcontext():
+        config = Config.load()
 
     if background:
+        if profile:
+            logger.warning("--startup-profile only applies in the foreground")
         return _spawn_background()
 
-    daemon = TTSDaemon(config)
+    daemon = TTSDaemon(config, profile)
     return daemon.run()
 
 
@@ -466,6 +1568,10 @@ def _spawn_background() -> int:
 def stop_daemon() -> int:
     """Stop the running daemon.
 
+    Waits for it to exit (see process_stop.py), sending SIGKILL if it is
+    still running after STOP_TIMEOUT. A process that started after the PID
+    file was written reused the PID and is left alone.
+
     Returns:
         Exit code.
     """
@@ -474,34 +1580,56 @@ def stop_daemon() -> int:
         logger.info("Daemon is not running")
         return 0
 
+    pid_path = Config.get_config_dir() / "daemon.pid"
     try:
-        os.kill(pid, signal.SIGTERM)
-        logger.info("Sent SIGTERM to daemon (PID %d)", pid)
+        started_by = {pid: pid_path.stat().st_mtime}
+    except OSError:
+        started_by = None
+
+    started = time.monotonic()
+    outcome = stop_processes([pid], started_by=started_by)[pid]
+    elapsed_ms = (time.monotonic() - started) * 1000
+    if outcome in (NOT_PERMITTED, STILL_RUNNING):
+        logger.error("Failed to stop daemon (PID %d): %s", pid, outcome)
+        return 1
+    if outcome == KILLED:
+        logger.warning("Force killed daemon (PID %d) after %.0f ms", pid, elapsed_ms)
+        # It had no chance to clean up
+        pid_path.unlink(missing_ok=True)
+    elif outcome == NOT_RUNNING:
+        logger.info("Daemon is not running (PID %d belongs to another process)", pid)
+        pid_path.unlink(missing_ok=True)
+    else:
+        logger.info("Daemon stopped in %.0f ms", elapsed_ms)
+    return 0
 
-        # Wait for process to exit
-        for _ in range(30):  # 3 seconds
-            try:
-                os.kill(pid, 0)
-                time.sleep(0.1)
-            except OSError:
-                logger.info("Daemon stopped")
-                return 0
 
-        # Force kill if still running
-        try:
-            os.kill(pid, signal.SIGKILL)
-            logger.warning("Force killed daemon (PID %d)", pid)
-        except OSError:
-            pass
+def _query_stats(timeout: float = 2.0) -> dict | None:
+    """Ask the running daemon for its live metrics.
 
-        return 0
-    except OSError as e:
-        logger.error("Failed to stop daemon: %s", e)
-        return 1
+    Returns:
+        The stats snapshot, or None if the daemon did not give one (not
+        answering, or a version without the stats message).
+    """
+    data = b""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(get_socket_path()))
+            sock.sendall(json.dumps({"type": "stats", "request_id": 1}).encode() + b"\n")
+            while not data.endswith(b"\n"):
+                chunk = sock.recv(65536)
+                if not chunk:
+                    return None
+                data += chunk
+        reply = json.loads(data)
+    except (OSError, ValueError):
+        return None
+    return reply.get("stats") if isinstance(reply, dict) else None
 
 
 def status_daemon() -> int:
-    """Print daemon status.
+    """Print daemon status, with latency percentiles from the live process.
 
     Returns:
         Exit code.
@@ -520,6 +1648,36 @@ def status_daemon() -> int:
     print(f"Pause hotkey: {config.hotkey_pause}")
     print(f"Skip hotkey: {config.hotkey_skip}")
 
+    stats = _query_stats()
+    if stats is None:
+        print("Live stats: not available")
+        return 0
+    print()
+    for line in format_snapshot(stats):
+        print(line)
+    for name, sink in stats.get("sinks", {}).items():
+        if sink["utterances"]:
+            print(
+                f"Audio sink ({name}): {sink['bytes_per_second'] / 1000:.1f} KB/s delivered, "
+                f"{sink['underruns']} underruns"
+            )
+    queue = stats.get("queue", {})
+    dropped = ", ".join(f"{count} {reason}" for reason, count in sorted(queue.get("dropped", {}).items()))
+    print(f"Queue: {queue.get('depth', 0)} waiting, dropped: {dropped or 'none'}")
+    coalesce = stats.get("coalesce", {})
+    if coalesce.get("requests"):
+        print(
+            f"Coalescing: {coalesce['requests_saved']} of {coalesce['requests']} speak requests saved "
+            f"({coalesce['merged']} merged, {coalesce['duplicates']} repeats, {coalesce['chars_saved']} chars)"
+        )
+    limit = stats.get("rate_limit", {})
+    if limit:
+        chars = limit["chars_available"]
+        print(
+            f"Synthesis limiter: circuit {limit['circuit']}, {limit['in_flight']} streaming, "
+            f"{limit['waiting']} waiting, {limit['retries']} retries, {limit['gave_up']} given up"
+            + (f", {chars} chars available" if chars is not None else "")
+        )
     return 0
 
 
@@ -538,6 +1696,11 @@ def main() -> int:
         action="store_true",
         help="Run daemon in background",
     )
+    parser.add_argument(
+        "--startup-profile",
+        action="store_true",
+        help="Print how long each startup phase and import took",
+    )
     parser.add_argument(
         "--log-level",
         choices=["DEBUG", "INFO", "WARNING", "ERROR"],
@@ -554,14 +1717,15 @@ def main() -> int:
     )
 
     if args.command == "start":
-        return start_daemon(background=args.background)
+        return start_daemon(background=args.background, startup_profile=args.startup_profile)
     elif args.command == "stop":
         return stop_daemon()
     elif args.command == "status":
         return status_daemon()
     elif args.command == "restart":
-        stop_daemon()
-        time.sleep(0.5)
+        # stop_daemon returns once the old daemon has exited
+        if stop_daemon() != 0:
+            return 1
         return start_daemon(background=args.background)
 
     return 0
@@ -0,0 +1,201 @@
+"""IPC server on the daemon's event loop.
+
+The official ``IpcServer`` accepts connections on its own thread and calls
+back from there. The streaming daemon runs on a single asyncio loop, so
+the socket is served with ``asyncio.start_unix_server`` instead: accepting
+and reading are awaited on the loop and each message is dispatched there
+without crossing threads. The wire format is unchanged: one JSON object
+per line, any number of lines per connection.
+
+Each message is handed a reply function that writes JSON back on the
+connection it arrived on, so a client that keeps the connection open can
+follow what happens to its request. Replies to a client that has gone
+away are dropped.
+
+A client can send many requests over one connection without waiting: a
+message carrying ``"request_id"`` is answered with
+``{"request_id": ..., "error": "success"}`` once handled (or the error),
+and every reply for it carries the same ``request_id``. A handler can
+return fields to add to the acknowledgement (how ``stats`` answers); for
+a message without a request id they are sent as a reply of their own.
+Sending
+``{"type": "hello", "framing": "length"}`` switches the connection to
+length-prefixed framing (a 4-byte big-endian length, then the JSON), so
+large texts are read in one piece instead of being scanned for a newline.
+
+Credit: COR Solutions - True Streaming Patch
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# Longest accepted message (a whole response can be sent in one)
+MAX_MESSAGE_BYTES = 8 * 1024 * 1024
+
+# Connection framings: newline-terminated JSON, or length-prefixed JSON
+LINES = "lines"
+LENGTH = "length"
+FRAMINGS = (LINES, LENGTH)
+LENGTH_PREFIX_BYTES = 4
+
+# Writes one JSON object back to the client that sent a message
+Reply = Callable[[dict], None]
+# Handles a message; may return fields for its acknowledgement
+Handler = Callable[[dict, Reply], dict | None]
+
+
+class IpcRequestError(Exception):
+    """Raised by a message handler to reject a request.
+
+    The message is sent back to the client as the request's error instead
+    of being logged as a handler failure.
+    """
+
+
+class _Connection:
+    """One client connection and its current framing."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.framing = LINES
+
+    async def read(self) -> bytes | None:
+        """Read the next message payload, or None at end of stream.
+
+        Raises:
+            ValueError: If a message is longer than MAX_MESSAGE_BYTES.
+        """
+        if self.framing == LINES:
+            return await self.reader.readline() or None
+
+        try:
+            prefix = await self.reader.readexactly(LENGTH_PREFIX_BYTES)
+        except asyncio.IncompleteReadError:
+            return None
+        size = int.from_bytes(prefix, "big")
+        if size > MAX_MESSAGE_BYTES:
+            raise ValueError(f"message of {size} bytes is over the limit")
+        try:
+            return await self.reader.readexactly(size)
+        except asyncio.IncompleteReadError:
+            return None
+
+    def send(self, message: dict) -> None:
+        """Write a message in the connection's framing."""
+        if self.writer.is_closing():
+            return
+        payload = json.dumps(message).encode()
+        if self.framing == LINES:
+            self.writer.write(payload + b"\n")
+        else:
+            self.writer.write(len(payload).to_bytes(LENGTH_PREFIX_BYTES, "big") + payload)
+
+
+class AsyncIpcServer:
+    """Unix socket server delivering JSON messages on the event loop."""
+
+    def __init__(self, socket_path: Path, on_message: Handler):
+        """Initialize the server.
+
+        Args:
+            socket_path: Path of the Unix socket to listen on.
+            on_message: Called on the loop with each decoded message and a
+                function replying on its connection. May return a dict of
+                fields to answer with, and may raise IpcRequestError to
+                reject the message.
+        """
+        self._socket_path = socket_path
+        self._on_message = on_message
+        self._server: asyncio.AbstractServer | None = None
+        self._connections: set[asyncio.StreamWriter] = set()
+
+    async def start(self) -> None:
+        """Bind the socket and start accepting connections."""
+        self._socket_path.parent.mkdir(parents=True, exist_ok=True)
+        self._socket_path.unlink(missing_ok=True)
+        self._server = await asyncio.start_unix_server(
+            self._serve,
+            path=str(self._socket_path),
+            limit=MAX_MESSAGE_BYTES,
+        )
+        os.chmod(self._socket_path, 0o600)
+        logger.debug("IPC server listening on %s", self._socket_path)
+
+    async def stop(self) -> None:
+        """Stop accepting, drop open connections and remove the socket."""
+        if self._server is None:
+            return
+        self._server.close()
+        for writer in list(self._connections):
+            writer.close()
+        await self._server.wait_closed()
+        self._server = None
+        self._socket_path.unlink(missing_ok=True)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Read messages from one connection until the client closes it."""
+        self._connections.add(writer)
+        connection = _Connection(reader, writer)
+        try:
+            while (payload := await connection.read()) is not None:
+                if not payload.strip():
+                    continue
+                try:
+                    message = json.loads(payload)
+                except ValueError:
+                    logger.warning("Ignoring malformed IPC message")
+                    continue
+                if not isinstance(message, dict):
+                    logger.warning("Ignoring IPC message that is not an object")
+                    continue
+                self._dispatch(connection, message)
+        except (OSError, ValueError) as e:
+            # Connection reset, or a message over MAX_MESSAGE_BYTES
+            logger.warning("IPC connection dropped: %s", e)
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    def _dispatch(self, connection: _Connection, message: dict) -> None:
+        """Handle one message and acknowledge it if it has a request id."""
+        request_id = message.get("request_id")
+        if request_id is None:
+            reply = connection.send
+        else:
+
+            def reply(response: dict) -> None:
+                connection.send({**response, "request_id": request_id})
+
+        error = "success"
+        result = None
+        if message.get("type") == "hello":
+            framing = message.get("framing", LINES)
+            if framing in FRAMINGS:
+                # Acknowledged in the old framing, everything after in the new
+                reply({"error": error, "framing": framing})
+                connection.framing = framing
+                return
+            error = f"unknown framing {framing!r}"
+        else:
+            try:
+                result = self._on_message(message, reply)
+            except IpcRequestError as e:
+                logger.warning("Rejected IPC message: %s", e)
+                error = str(e)
+            except Exception:
+                logger.exception("IPC message handler failed")
+                error = "handler failed"
+
+        if request_id is not None:
+            reply({**(result or {}), "error": error})
+        elif result:
+            reply(result)
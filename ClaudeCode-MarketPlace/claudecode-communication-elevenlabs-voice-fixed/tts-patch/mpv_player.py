@@ -0,0 +1,379 @@
+"""Persistent mpv player controlled over its JSON IPC socket.
+
+Spawning ``mpv -`` for every utterance costs process startup plus opening
+the audio device (~100-300ms) before the first sample plays. Instead we keep
+one mpv running with ``--idle=yes`` and hand it a fresh FIFO per utterance
+via ``loadfile``; the streamed chunks are written into that FIFO. If mpv
+dies it is respawned on the next utterance.
+
+Everything runs on the daemon's event loop: IPC replies and playback
+events are read by a task, and the FIFO is written non-blocking, waiting
+for writability when mpv's buffer is full. Cancelling ``play_stream``
+stops playback.
+
+Credit: COR Solutions - True Streaming Patch
+"""
+
+from __future__ import annotations
+
+import asyncio
+import errno
+import itertools
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterable, Callable, Sequence
+
+logger = logging.getLogger(__name__)
+
+# How long to wait for mpv to create its IPC socket / open a FIFO
+SPAWN_TIMEOUT = 5.0
+OPEN_TIMEOUT = 2.0
+COMMAND_TIMEOUT = 2.0
+
+
+class PlayerError(Exception):
+    """Raised when the persistent player cannot be started or fed."""
+
+
+@dataclass
+class PlaybackResult:
+    """Outcome of a single streamed utterance."""
+
+    # Seconds from the caller's start time to mpv reporting playback start
+    first_audio: float | None
+    # True if mpv had to be (re)spawned for this utterance
+    cold: bool
+    # True if mpv stopped reading before the stream ended (skipped elsewhere)
+    stopped: bool = False
+
+
+class MpvPlayer:
+    """Long-lived mpv process fed one FIFO per utterance."""
+
+    def __init__(self, mpv_path: str = "mpv", extra_args: Sequence[str] = ()):
+        """Initialize the player. mpv is spawned by ``start`` or on first use.
+
+        Args:
+            mpv_path: mpv executable.
+            extra_args: More mpv command-line options.
+        """
+        self._mpv_path = mpv_path
+        self._extra_args = list(extra_args)
+        # Options set over IPC since the spawn, so each is only sent on change
+        self._options: dict[str, str] = {}
+        self._runtime_dir: Path | None = None
+        self._process: asyncio.subprocess.Process | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._reader: asyncio.Task | None = None
+        self._start_lock = asyncio.Lock()
+
+        self._request_ids = itertools.count(1)
+        self._fifo_ids = itertools.count(1)
+        self._replies: dict[int, asyncio.Future] = {}
+
+        # Per-utterance playback events, reset before each loadfile
+        self._loaded = asyncio.Event()
+        self._playing = asyncio.Event()
+        self._finished = asyncio.Event()
+        self._first_audio_at = 0.0
+        self._on_playing: Callable[[], None] | None = None
+
+    @property
+    def is_alive(self) -> bool:
+        """True if mpv is running and the IPC connection is open."""
+        return (
+            self._process is not None
+            and self._process.returncode is None
+            and self._writer is not None
+            and not self._writer.is_closing()
+        )
+
+    async def start(self) -> bool:
+        """Spawn mpv if it is not already running.
+
+        Returns:
+            True if a new process was spawned, False if one was already up.
+
+        Raises:
+            FileNotFoundError: If mpv is not installed.
+            PlayerError: If mpv never opens its IPC socket.
+        """
+        # The warm-up at startup and the first utterance can both get here
+        async with self._start_lock:
+            if self.is_alive:
+                return False
+
+            await self._shutdown_process()
+
+            if shutil.which(self._mpv_path) is None:
+                raise FileNotFoundError(f"{self._mpv_path} not found")
+
+            if self._runtime_dir is None:
+                self._runtime_dir = Path(tempfile.mkdtemp(prefix="elevenlabs-tts-"))
+            socket_path = self._runtime_dir / "mpv.sock"
+            if socket_path.exists():
+                socket_path.unlink()
+
+            self._process = await asyncio.create_subprocess_exec(
+                self._mpv_path,
+                "--idle=yes",
+                "--no-video",
+                "--no-terminal",
+                "--really-quiet",
+                f"--input-ipc-server={socket_path}",
+                *self._extra_args,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+
+            deadline = time.monotonic() + SPAWN_TIMEOUT
+            while True:
+                if self._process.returncode is not None:
+                    raise PlayerError(f"mpv exited during startup (code {self._process.returncode})")
+                try:
+                    reader, writer = await asyncio.open_unix_connection(str(socket_path))
+                    break
+                except OSError:
+                    if time.monotonic() > deadline:
+                        await self._shutdown_process()
+                        raise PlayerError("mpv did not open its IPC socket") from None
+                    await asyncio.sleep(0.01)
+
+            self._writer = writer
+            self._reader = asyncio.create_task(self._read_events(reader, writer))
+            self._options = {}
+            logger.debug("mpv player started (PID %d)", self._process.pid)
+            return True
+
+    async def play_stream(
+        self,
+        chunks: AsyncIterable[bytes],
+        started_at: float | None = None,
+        on_playing: Callable[[], None] | None = None,
+        options: dict[str, str] | None = None,
+    ) -> PlaybackResult:
+        """Stream audio chunks into mpv and wait for playback to finish.
+
+        Cancelling the call stops playback and leaves mpv idle.
+
+        Args:
+            chunks: Encoded audio chunks, consumed as they arrive.
+            started_at: ``time.monotonic()`` the utterance started at, used
+                for the time-to-first-audio measurement.
+            on_playing: Called once when mpv reports that playback started.
+            options: mpv options for this stream, e.g. the raw audio layout
+                (see audio_format.py); set before it is loaded if they
+                differ from the last stream's.
+
+        Returns:
+            Playback result with time-to-first-audio.
+
+        Raises:
+            FileNotFoundError: If mpv is not installed.
+            PlayerError: If mpv cannot be started or dies mid-stream.
+        """
+        if started_at is None:
+            started_at = time.monotonic()
+
+        cold = await self.start()
+        assert self._runtime_dir is not None
+        for name, value in (options or {}).items():
+            if self._options.get(name, "") != value:
+                await self._command("set_property", name, value)
+                self._options[name] = value
+
+        fifo_path = self._runtime_dir / f"stream-{next(self._fifo_ids)}.fifo"
+        os.mkfifo(fifo_path, 0o600)
+        try:
+            self._loaded.clear()
+            self._playing.clear()
+            self._finished.clear()
+            self._on_playing = on_playing
+            await self._command("loadfile", str(fifo_path), "replace")
+            fd = await self._open_fifo(fifo_path)
+        finally:
+            fifo_path.unlink(missing_ok=True)
+
+        stopped = False
+        try:
+            try:
+                async for chunk in chunks:
+                    if chunk:
+                        await _write_all(fd, chunk)
+            except BrokenPipeError:
+                # mpv closed the FIFO: skipped or died, either way stop feeding
+                stopped = True
+            finally:
+                os.close(fd)
+
+            if stopped:
+                await self.skip()
+            else:
+                await self._finished.wait()
+        except asyncio.CancelledError:
+            await self.skip()
+            raise
+        finally:
+            self._on_playing = None
+
+        first_audio = None
+        if self._playing.is_set():
+            first_audio = self._first_audio_at - started_at
+        if not self.is_alive:
+            raise PlayerError("mpv exited during playback")
+        return PlaybackResult(first_audio=first_audio, cold=cold, stopped=stopped)
+
+    async def skip(self) -> None:
+        """Stop the current utterance, leaving mpv idle."""
+        if not self.is_alive:
+            return
+        try:
+            await self._command("stop")
+        except PlayerError as e:
+            logger.debug("mpv stop failed: %s", e)
+
+    async def stop(self) -> None:
+        """Quit mpv and remove the runtime directory."""
+        if self.is_alive:
+            try:
+                await self._command("quit", timeout=0.5)
+            except PlayerError:
+                pass
+        await self._shutdown_process()
+        if self._runtime_dir is not None:
+            shutil.rmtree(self._runtime_dir, ignore_errors=True)
+            self._runtime_dir = None
+
+    async def _open_fifo(self, fifo_path: Path) -> int:
+        """Open the FIFO for non-blocking writes once mpv has opened it."""
+        deadline = time.monotonic() + OPEN_TIMEOUT
+        while True:
+            try:
+                return os.open(fifo_path, os.O_WRONLY | os.O_NONBLOCK)
+            except OSError as e:
+                if e.errno != errno.ENXIO:
+                    raise
+            if not self.is_alive:
+                raise PlayerError("mpv exited before opening the stream")
+            if time.monotonic() > deadline:
+                raise PlayerError("mpv did not open the stream")
+            await asyncio.sleep(0.002)
+
+    async def _command(self, *args: str, timeout: float = COMMAND_TIMEOUT) -> dict:
+        """Send an IPC command and wait for its reply."""
+        if self._writer is None:
+            raise PlayerError("mpv is not running")
+        request_id = next(self._request_ids)
+        payload = json.dumps({"command": list(args), "request_id": request_id}).encode() + b"\n"
+        reply_future = asyncio.get_running_loop().create_future()
+        self._replies[request_id] = reply_future
+        try:
+            try:
+                self._writer.write(payload)
+                await self._writer.drain()
+            except OSError as e:
+                raise PlayerError(f"mpv IPC write failed: {e}") from e
+            try:
+                reply = await asyncio.wait_for(reply_future, timeout)
+            except asyncio.TimeoutError:
+                raise PlayerError(f"mpv did not answer {args[0]!r}") from None
+        finally:
+            self._replies.pop(request_id, None)
+
+        if reply.get("error") != "success":
+            raise PlayerError(f"mpv {args[0]!r} failed: {reply.get('error')}")
+        return reply
+
+    async def _read_events(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Reader task: route command replies and playback events."""
+        try:
+            while line := await reader.readline():
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    continue
+                self._dispatch(message)
+        except (OSError, ValueError):
+            pass
+        finally:
+            # Connection gone: wake anyone waiting on it
+            if self._writer is writer:
+                self._writer = None
+            writer.close()
+            for reply_future in self._replies.values():
+                if not reply_future.done():
+                    reply_future.set_exception(PlayerError("mpv IPC connection closed"))
+            self._finished.set()
+
+    def _dispatch(self, message: dict) -> None:
+        """Handle one message from mpv."""
+        if "request_id" in message:
+            reply_future = self._replies.get(message["request_id"])
+            if reply_future is not None and not reply_future.done():
+                reply_future.set_result(message)
+            return
+
+        # Ignore a late end-file from a skipped utterance: only count it once
+        # the file we loaded has started
+        event = message.get("event")
+        if event == "start-file":
+            self._loaded.set()
+        elif event == "playback-restart" and not self._playing.is_set():
+            self._first_audio_at = time.monotonic()
+            self._playing.set()
+            if self._on_playing is not None:
+                self._on_playing()
+        elif event == "end-file" and self._loaded.is_set():
+            self._finished.set()
+
+    async def _shutdown_process(self) -> None:
+        """Close the IPC connection and make sure mpv has exited."""
+        writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.close()
+        reader, self._reader = self._reader, None
+        if reader is not None:
+            reader.cancel()
+
+        process, self._process = self._process, None
+        if process is not None and process.returncode is None:
+            try:
+                process.terminate()
+            except ProcessLookupError:
+                return
+            try:
+                await asyncio.wait_for(process.wait(), 1.0)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+
+
+async def _write_all(fd: int, data: bytes) -> None:
+    """Write all of ``data`` to a non-blocking file descriptor."""
+    view = memoryview(data)
+    while view:
+        try:
+            written = os.write(fd, view)
+        except BlockingIOError:
+            await _writable(fd)
+            continue
+        view = view[written:]
+
+
+async def _writable(fd: int) -> None:
+    """Wait until ``fd`` can be written without blocking."""
+    loop = asyncio.get_running_loop()
+    ready = loop.create_future()
+    loop.add_writer(fd, lambda: ready.done() or ready.set_result(None))
+    try:
+        await ready
+    finally:
+        loop.remove_writer(fd)
@@ -0,0 +1,100 @@
+"""Pre-rendered confirmation phrases ("cues").
+
+voice-manager.py sends the same handful of confirmations over and over
+("Listening", "Got it", mode announcements). Rendering them through the
+API on demand makes "Listening" arrive after the user has started talking.
+The phrase bank synthesizes every declared cue in the background at
+startup (and again when the voice changes) and keeps the audio in memory,
+so a cue request plays without touching the network. On a voice change
+each cue keeps its old audio until the new one has rendered, so a cue
+asked for meanwhile still plays at once.
+
+Credit: COR Solutions - True Streaming Patch
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+# Cue name -> phrase. Extended or overridden by [streaming.cues] in config.toml.
+DEFAULT_CUES = {
+    "listening": "Listening",
+    "got_it": "Got it",
+    "instruction_mode": "Instruction mode. Text responses only.",
+    "conversation_mode": "Conversation mode. I'll speak my responses now.",
+    "instruction_activated": "Instruction mode. I'll respond in text only.",
+    "conversation_activated": "Conversation mode activated. I'll speak my responses.",
+    "shutting_down": "Voice system shutting down.",
+}
+
+
+class PhraseBank:
+    """In-memory audio for a fixed set of named phrases."""
+
+    def __init__(self, synthesize: Callable[[str], Iterable[bytes]], phrases: dict[str, str]):
+        """Initialize the phrase bank.
+
+        Args:
+            synthesize: Streams encoded audio for a phrase.
+            phrases: Cue name -> text, rendered in this order.
+        """
+        self._synthesize = synthesize
+        self._phrases = dict(phrases)
+        self._audio: dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def text(self, name: str) -> str | None:
+        """Get the phrase declared for a cue name."""
+        return self._phrases.get(name)
+
+    def get(self, name: str) -> bytes | None:
+        """Get rendered audio for a cue.
+
+        Args:
+            name: Cue name.
+
+        Returns:
+            Encoded audio, or None if not (yet) rendered.
+        """
+        with self._lock:
+            return self._audio.get(name)
+
+    def refresh(self) -> None:
+        """Re-render every phrase in the background.
+
+        Each phrase's audio is replaced once its new render finishes (and
+        dropped if that fails); any render still running from an earlier
+        refresh is discarded.
+        """
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+        threading.Thread(target=self._render_all, args=(generation,), daemon=True).start()
+
+    def _render_all(self, generation: int) -> None:
+        """Render thread: synthesize each phrase in declaration order."""
+        rendered = 0
+        for name, text in self._phrases.items():
+            with self._lock:
+                if generation != self._generation:
+                    return
+            try:
+                audio = b"".join(self._synthesize(text))
+            except Exception as e:
+                logger.warning("Failed to render cue %r: %s", name, e)
+                with self._lock:
+                    if generation == self._generation:
+                        # Not played in the previous voice
+                        self._audio.pop(name, None)
+                continue
+            with self._lock:
+                if generation != self._generation:
+                    return
+                self._audio[name] = audio
+            rendered += 1
+        logger.debug("Rendered %d/%d cues", rendered, len(self._phrases))
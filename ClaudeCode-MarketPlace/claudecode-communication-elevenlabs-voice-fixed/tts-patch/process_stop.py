@@ -0,0 +1,222 @@
+"""Stop processes by PID and wait for them to exit without polling.
+
+Each process is opened as a handle before it is signalled: a pidfd on
+Linux (``os.pidfd_open``), which is also what the signal is sent through,
+so once a daemon has been opened, a PID reused after it exits while being
+stopped can't be hit. The handles are waited on with ``select``, which
+returns the moment a process exits. On macOS the exit is waited for with
+a kqueue ``NOTE_EXIT`` filter instead, and elsewhere liveness is polled.
+
+The PID comes from a PID file and may have been reused before it is
+opened. Callers can pass the time each PID file was written; on Linux a
+process that started after it is another process and is left alone.
+Elsewhere, where the start time isn't read, the PID is trusted.
+
+A process still running when the timeout passes is sent SIGKILL and
+waited for again, so a stop takes at most ``timeout + kill_timeout``.
+
+Also used by the Voice Manager (scripts/voice-manager.py), which imports
+it from tts-patch/ to stop the STT daemon as well.
+
+Credit: COR Solutions - True Streaming Patch
+"""
+
+from __future__ import annotations
+
+import os
+import select
+import signal
+import time
+
+# Seconds to wait after SIGTERM before SIGKILL, and after SIGKILL
+STOP_TIMEOUT = 3.0
+KILL_TIMEOUT = 1.0
+
+# Liveness check interval where exits can't be waited for
+_POLL_INTERVAL = 0.05
+
+# Allowed lead of a process's start time over its PID file's time
+# (/proc start times count from a boot time rounded to the second)
+_START_TIME_SLACK = 2.0
+
+# Outcomes reported by stop_processes
+STOPPED = "stopped"
+KILLED = "killed"
+NOT_RUNNING = "not running"
+NOT_PERMITTED = "not permitted"
+STILL_RUNNING = "still running"
+
+
+class _ProcessHandle:
+    """A process to signal and wait on."""
+
+    def __init__(self, pid: int):
+        """Open the process.
+
+        Raises:
+            ProcessLookupError: If it is not running.
+        """
+        self.pid = pid
+        self.fd: int | None = None
+        if hasattr(os, "pidfd_open"):
+            try:
+                self.fd = os.pidfd_open(pid)
+            except OSError as e:
+                if isinstance(e, ProcessLookupError):
+                    raise
+                # Kernel without pidfd support: signal by PID and poll
+        if self.fd is None:
+            os.kill(pid, 0)
+
+    def send_signal(self, signum: int) -> None:
+        """Signal the process (through its pidfd when there is one)."""
+        if self.fd is not None:
+            signal.pidfd_send_signal(self.fd, signum)
+        else:
+            os.kill(self.pid, signum)
+
+    def exited(self) -> bool:
+        """Whether the process has exited (checked without waiting)."""
+        if self.fd is not None:
+            readable, _, _ = select.select([self.fd], [], [], 0)
+            return bool(readable)
+        try:
+            os.kill(self.pid, 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+        return False
+
+    def close(self) -> None:
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def _start_time(pid: int) -> float | None:
+    """When a process started (epoch seconds), or None where /proc can't tell."""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            # Fields after the command name, which may contain spaces
+            fields = f.read().rsplit(b")", 1)[1].split()
+        with open("/proc/stat", "rb") as f:
+            boot = next(int(line.split()[1]) for line in f if line.startswith(b"btime "))
+        return boot + int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError, StopIteration):
+        return None
+
+
+def _wait(handles: list[_ProcessHandle], timeout: float) -> list[_ProcessHandle]:
+    """Wait until every process has exited or ``timeout`` passes.
+
+    Returns:
+        The handles of processes still running.
+    """
+    deadline = time.monotonic() + timeout
+    running = [handle for handle in handles if not handle.exited()]
+
+    if all(handle.fd is not None for handle in running):
+        while running and (remaining := deadline - time.monotonic()) > 0:
+            readable, _, _ = select.select([handle.fd for handle in running], [], [], remaining)
+            running = [handle for handle in running if handle.fd not in readable]
+        return running
+
+    if hasattr(select, "kqueue"):
+        queue = select.kqueue()
+        try:
+            watched = {}
+            for handle in running:
+                event = select.kevent(
+                    handle.pid,
+                    filter=select.KQ_FILTER_PROC,
+                    flags=select.KQ_EV_ADD | select.KQ_EV_ONESHOT,
+                    fflags=select.KQ_NOTE_EXIT,
+                )
+                try:
+                    queue.control([event], 0, 0)
+                    watched[handle.pid] = handle
+                except ProcessLookupError:
+                    pass  # Exited in between
+            while watched and (remaining := deadline - time.monotonic()) > 0:
+                for event in queue.control(None, len(watched), remaining):
+                    watched.pop(event.ident, None)
+            return list(watched.values())
+        finally:
+            queue.close()
+
+    while running and time.monotonic() < deadline:
+        time.sleep(_POLL_INTERVAL)
+        running = [handle for handle in running if not handle.exited()]
+    return running
+
+
+def stop_processes(
+    pids: list[int],
+    timeout: float = STOP_TIMEOUT,
+    kill_timeout: float = KILL_TIMEOUT,
+    started_by: dict[int, float] | None = None,
+) -> dict[int, str]:
+    """Send SIGTERM to processes, and SIGKILL to any that outlast ``timeout``.
+
+    Args:
+        pids: Processes to stop. They are signalled together and waited
+            for together.
+        timeout: Seconds to wait for them to exit after SIGTERM.
+        kill_timeout: Seconds to wait after SIGKILL.
+        started_by: Time (epoch seconds) by which each PID's process must
+            have started, e.g. its PID file's modification time. A process
+            that started later reused the PID and is reported NOT_RUNNING
+            without being signalled (checked where /proc is available).
+
+    Returns:
+        Outcome per PID: STOPPED, KILLED, NOT_RUNNING, NOT_PERMITTED or
+        STILL_RUNNING (survived SIGKILL, e.g. stuck in the kernel).
+    """
+    outcomes: dict[int, str] = {}
+    handles: list[_ProcessHandle] = []
+    for pid in dict.fromkeys(pids):
+        try:
+            handle = _ProcessHandle(pid)
+        except ProcessLookupError:
+            outcomes[pid] = NOT_RUNNING
+            continue
+        except PermissionError:
+            outcomes[pid] = NOT_PERMITTED
+            continue
+        # Checked once the handle pins the process, so it is the one signalled
+        limit = (started_by or {}).get(pid)
+        start = _start_time(pid) if limit is not None else None
+        if start is not None and start > limit + _START_TIME_SLACK:
+            outcomes[pid] = NOT_RUNNING
+            handle.close()
+            continue
+        try:
+            handle.send_signal(signal.SIGTERM)
+        except (ProcessLookupError, PermissionError) as e:
+            outcomes[pid] = NOT_RUNNING if isinstance(e, ProcessLookupError) else NOT_PERMITTED
+            handle.close()
+            continue
+        handles.append(handle)
+
+    try:
+        running = _wait(handles, timeout)
+        for handle in running:
+            try:
+                handle.send_signal(signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        killed = set(running)
+        running = _wait(running, kill_timeout)
+
+        for handle in handles:
+            if handle in running:
+                outcomes[handle.pid] = STILL_RUNNING
+            elif handle in killed:
+                outcomes[handle.pid] = KILLED
+            else:
+                outcomes[handle.pid] = STOPPED
+    finally:
+        for handle in handles:
+            handle.close()
+    return outcomes
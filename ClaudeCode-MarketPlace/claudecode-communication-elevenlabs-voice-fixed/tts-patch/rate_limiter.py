@@ -0,0 +1,522 @@
+"""Client-side rate limiting, retries and a circuit breaker for synthesis.
+
+Any error from a synthesis request used to lose the utterance: a 429 from
+the API's rate limit or a passing 503 was logged and answered with the
+error sound, and nothing kept a burst of sentences and cues from opening
+more concurrent streams than the plan allows, which only earned more 429s.
+Every synthesis request now goes through a ``RateLimiter``:
+
+* a ``TokenBucket`` of characters per minute, and a cap on concurrent
+  streams, make requests wait for their turn instead of being refused
+* a request that fails before its first audio byte with a 429, a 5xx or a
+  connection error is retried after a jittered exponential backoff (at
+  least the server's Retry-After); one that fails after audio was played
+  is not, since that would repeat speech
+* 5xx and connection failures in a row trip a ``CircuitBreaker``: while it
+  is open, requests fail at once instead of each waiting out its retries,
+  and after ``reset_timeout`` one trial request decides whether it closes
+
+It runs on the synthesis worker threads and blocks them, never the loop.
+A request whose utterance is cancelled (see cancel_token.py) stops waiting
+at once and is not counted as a failure.
+``RateLimiter.stats`` reports its state for the daemon's stats message.
+
+Benchmark against the local stand-in, refusing requests beyond 2 at once
+and failing some with 503 (see bench/api_standin.py, which must be on
+``PYTHONPATH``):
+    PYTHONPATH=bench python3 -m elevenlabs_tts.rate_limiter --bench
+
+Credit: COR Solutions - True Streaming Patch
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator
+
+from elevenlabs_tts.cancel_token import CancelToken
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+# The API's answer to too many requests: retried, but not a sign of an outage
+RATE_LIMITED = 429
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while the circuit is open."""
+
+    def __init__(self, retry_in: float):
+        super().__init__(f"synthesis API unavailable, circuit open for {retry_in:.1f} s more")
+        self.retry_in = retry_in
+
+
+class LimiterClosedError(Exception):
+    """Raised to a request still waiting for its turn at shutdown."""
+
+
+def error_status(error: BaseException) -> int | None:
+    """HTTP status of a failed request's error, if it has one.
+
+    Our own client raises ``SynthesisError.status``; the official client's
+    errors carry ``status_code``.
+    """
+    status = getattr(error, "status", None) or getattr(error, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether a request that failed with this error may succeed if sent again."""
+    status = error_status(error)
+    if status is not None:
+        return status == RATE_LIMITED or status >= 500
+    return isinstance(error, OSError)
+
+
+def backoff_delay(attempt: int, base: float, cap: float, rng: random.Random | None = None) -> float:
+    """Seconds to wait before retry number ``attempt`` (0 for the first).
+
+    "Full jitter": uniform between 0 and the exponential bound, so clients
+    that failed together don't all come back together.
+    """
+    return (rng or random).uniform(0, min(cap, base * 2**attempt))
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens a second, ``capacity`` at most."""
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    @property
+    def tokens(self) -> float:
+        """Tokens available now."""
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def take(self, amount: float) -> float:
+        """Take tokens, going into debt if there are not enough.
+
+        More than ``capacity`` is taken as ``capacity``, so a long text
+        waits for a full bucket rather than forever.
+
+        Returns:
+            Seconds until the debt is paid off (0 if there was no debt);
+            the caller waits that long before using the tokens.
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= min(amount, self.capacity)
+            return max(0.0, -self._tokens / self.rate)
+
+    def _refill(self) -> None:
+        """Add the tokens earned since the last update. Call with the lock held."""
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class CircuitBreaker:
+    """Stops sending requests to an endpoint that keeps failing.
+
+    Closed: requests go through, and ``failure_threshold`` failures in a
+    row open it. Open: requests are refused for ``reset_timeout`` seconds.
+    Half-open: one trial request goes through; success closes the circuit,
+    failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        # Times it opened since startup
+        self.trips = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def check(self) -> None:
+        """Allow a request, or refuse it.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with its
+                trial request still running.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            retry_in = self._opened_at + self.reset_timeout - time.monotonic()
+            if self.state == OPEN and retry_in <= 0:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return
+            raise CircuitOpenError(max(retry_in, 0.0))
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.state = OPEN
+                self.trips += 1
+                self._opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Let another trial through after one ended without a verdict."""
+        with self._lock:
+            self._trial_running = False
+
+
+class RateLimiter:
+    """Paces, caps, retries and circuit-breaks synthesis requests."""
+
+    def __init__(
+        self,
+        chars_per_minute: int = 0,
+        max_concurrent: int = 0,
+        retries: int = 3,
+        backoff_base: float = 0.25,
+        backoff_max: float = 4.0,
+        breaker_failures: int = 5,
+        breaker_reset: float = 30.0,
+        rng: random.Random | None = None,
+    ):
+        """Initialize the limiter.
+
+        Args:
+            chars_per_minute: Characters sent per minute, in bursts of up to
+                a minute's worth (0 = no limit).
+            max_concurrent: Most requests streaming at once (0 = no limit).
+            retries: Extra attempts for a retryable failure.
+            backoff_base: Upper bound of the first retry's delay (seconds);
+                doubled for each further retry.
+            backoff_max: Most a retry's delay is drawn from (seconds).
+            breaker_failures: 5xx or connection failures in a row that open
+                the circuit (0 = never).
+            breaker_reset: Seconds the circuit stays open before a trial.
+            rng: Random source for the jitter.
+        """
+        self.bucket = TokenBucket(chars_per_minute / 60, chars_per_minute) if chars_per_minute > 0 else None
+        self.max_concurrent = max_concurrent
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = CircuitBreaker(breaker_failures, breaker_reset) if breaker_failures > 0 else None
+        self._rng = rng or random.Random()
+
+        self._slots = threading.Condition()
+        self._in_flight = 0
+        self._waiting = 0
+        self._closed = threading.Event()
+        # Events of threads sleeping out a backoff or the bucket (under _slots)
+        self._sleepers: set[threading.Event] = set()
+
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.retried = 0
+        # Requests that failed after their retries, or were refused
+        self.gave_up = 0
+        self.rejected = 0
+        # Failed attempts by HTTP status, or "connection"
+        self.failures: Counter[str] = Counter()
+        # Seconds spent waiting for the bucket or a slot
+        self.throttled = 0.0
+
+    def stream(
+        self,
+        text: str,
+        open_stream: Callable[[str], Iterator[bytes]],
+        cancel: CancelToken | None = None,
+    ) -> Iterator[bytes]:
+        """Stream audio for text through the limits (blocking).
+
+        Args:
+            text: Text for one synthesis request.
+            open_stream: Starts the request, e.g. ``SynthesisClient.stream``.
+            cancel: The utterance's token; cancelling it ends any wait.
+
+        Yields:
+            Audio chunks.
+
+        Raises:
+            CircuitOpenError: If the circuit is open.
+            LimiterClosedError: If the limiter closed while waiting.
+            Cancelled: If ``cancel`` was cancelled.
+            Exception: The request's last error once it is not retried.
+        """
+        with self._stats_lock:
+            self.requests += 1
+        attempt = 0
+        while True:
+            if cancel:
+                cancel.check()
+            self._check_breaker()
+            self._wait_for_tokens(len(text), cancel)
+            self._acquire_slot(cancel)
+            source = None
+            decided = False
+            try:
+                try:
+                    source = iter(open_stream(text))
+                    first = next(source)
+                except StopIteration:
+                    decided = True
+                    self._succeeded()
+                    return
+                except Exception as e:
+                    if cancel and cancel.cancelled:
+                        # Skipped: says nothing about the endpoint
+                        raise
+                    decided = True
+                    delay = self._failed(e, attempt)
+                    if delay is None:
+                        raise
+                else:
+                    decided = True
+                    self._succeeded()
+                    yield first
+                    try:
+                        yield from source
+                    except Exception as e:
+                        # Audio was already played: not retried
+                        if not (cancel and cancel.cancelled):
+                            self._failed(e, self.retries)
+                        raise
+                    return
+            finally:
+                if source is not None:
+                    close = getattr(source, "close", None)
+                    if close is not None:
+                        close()
+                if not decided and self.breaker:
+                    # Closed before the first byte (skipped): no verdict
+                    self.breaker.release()
+                self._release_slot()
+            attempt += 1
+            self._sleep(delay, cancel)
+
+    def close(self) -> None:
+        """Wake requests waiting for their turn; they fail."""
+        self._closed.set()
+        with self._slots:
+            for wake in self._sleepers:
+                wake.set()
+            self._slots.notify_all()
+
+    def stats(self) -> dict:
+        """State for the daemon's stats message."""
+        with self._stats_lock, self._slots:
+            stats = {
+                "requests": self.requests,
+                "in_flight": self._in_flight,
+                "waiting": self._waiting,
+                "retries": self.retried,
+                "gave_up": self.gave_up,
+                "rejected": self.rejected,
+                "failures": dict(self.failures),
+                "throttled_seconds": round(self.throttled, 3),
+                "circuit": self.breaker.state if self.breaker else CLOSED,
+                "circuit_trips": self.breaker.trips if self.breaker else 0,
+            }
+        stats["chars_available"] = round(self.bucket.tokens) if self.bucket else None
+        return stats
+
+    def _check_breaker(self) -> None:
+        if self.breaker is None:
+            return
+        try:
+            self.breaker.check()
+        except CircuitOpenError:
+            with self._stats_lock:
+                self.rejected += 1
+            raise
+
+    def _check_waiting(self, cancel: CancelToken | None) -> None:
+        """Raise if a waiting request should stop waiting."""
+        if self._closed.is_set():
+            raise LimiterClosedError("shutting down")
+        if cancel:
+            cancel.check()
+
+    def _sleep(self, seconds: float, cancel: CancelToken | None) -> None:
+        """Sleep, waking early (and raising) on close or cancel."""
+        wake = threading.Event()
+        with self._slots:
+            self._sleepers.add(wake)
+        forget = cancel.on_cancel(wake.set) if cancel else _nothing
+        try:
+            if not self._closed.is_set():
+                wake.wait(seconds)
+        finally:
+            forget()
+            with self._slots:
+                self._sleepers.discard(wake)
+        self._check_waiting(cancel)
+
+    def _wake_slot_waiters(self) -> None:
+        with self._slots:
+            self._slots.notify_all()
+
+    def _wait_for_tokens(self, chars: int, cancel: CancelToken | None) -> None:
+        """Take characters from the bucket, waiting until they are earned."""
+        if self.bucket is None:
+            return
+        delay = self.bucket.take(chars)
+        if delay:
+            with self._stats_lock:
+                self.throttled += delay
+            self._sleep(delay, cancel)
+
+    def _acquire_slot(self, cancel: CancelToken | None) -> None:
+        """Wait until fewer than ``max_concurrent`` requests are streaming."""
+        started = time.monotonic()
+        forget = cancel.on_cancel(self._wake_slot_waiters) if cancel else _nothing
+        try:
+            with self._slots:
+                self._waiting += 1
+                try:
+                    while self.max_concurrent and self._in_flight >= self.max_concurrent:
+                        self._check_waiting(cancel)
+                        self._slots.wait()
+                    self._check_waiting(cancel)
+                    self._in_flight += 1
+                finally:
+                    self._waiting -= 1
+        finally:
+            forget()
+        waited = time.monotonic() - started
+        if waited > 0.001:
+            with self._stats_lock:
+                self.throttled += waited
+
+    def _release_slot(self) -> None:
+        with self._slots:
+            self._in_flight -= 1
+            self._slots.notify()
+
+    def _succeeded(self) -> None:
+        if self.breaker:
+            self.breaker.record_success()
+
+    def _failed(self, error: Exception, attempt: int) -> float | None:
+        """Record a failed attempt.
+
+        Returns:
+            Seconds to wait before retrying, or None to give up.
+        """
+        status = error_status(error)
+        retryable = is_retryable(error)
+        with self._stats_lock:
+            self.failures[str(status) if status is not None else "connection"] += 1
+        if self.breaker:
+            # The rate limit and our own bad requests say nothing about
+            # whether the endpoint is up
+            if retryable and status != RATE_LIMITED:
+                self.breaker.record_failure()
+            else:
+                self.breaker.release()
+        if not retryable or attempt >= self.retries:
+            with self._stats_lock:
+                self.gave_up += 1
+            return None
+        delay = backoff_delay(attempt, self.backoff_base, self.backoff_max, self._rng)
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        with self._stats_lock:
+            self.retried += 1
+        return delay
+
+
+def _nothing() -> None:
+    pass
+
+
+def _bench(requests: int, workers: int, server_ms: float, error_rate: float, max_concurrent: int) -> None:
+    """Send a burst of requests with and without the limiter."""
+    from api_standin import StandInServer
+    from elevenlabs_tts.synthesis_client import ConnectionPool, SynthesisClient
+
+    class Voice:
+        voice_id = "bench"
+        model_id = "eleven_multilingual_v2"
+        output_format = "mp3_44100_128"
+        stability = similarity_boost = 0.5
+        speed = 1.0
+
+    text = "Here is one sentence of a longer answer being read out."
+    print(
+        f"{requests} requests from {workers} threads; the stand-in answers 429 beyond {max_concurrent} at once "
+        f"and 503 to {error_rate:.0%} of requests ({server_ms:.0f} ms server time):"
+    )
+    for name, limited in (("no limiter", False), ("rate limiter", True)):
+        with StandInServer(
+            first_byte_delay=server_ms / 1000,
+            error_rate=error_rate,
+            error_statuses=(503,),
+            max_concurrent=max_concurrent,
+            seed=1,
+        ) as server:
+            pool = ConnectionPool(server.url, size=workers, context=server.client_context())
+            client = SynthesisClient("bench", Voice(), pool)
+            limiter = RateLimiter(max_concurrent=max_concurrent, breaker_failures=0, rng=random.Random(1))
+
+            def one(_: int) -> bool:
+                source = limiter.stream(text, client.stream) if limited else client.stream(text)
+                try:
+                    for _ in source:
+                        pass
+                    return True
+                except Exception:
+                    return False
+
+            started = time.monotonic()
+            with ThreadPoolExecutor(workers) as executor:
+                delivered = sum(executor.map(one, range(requests)))
+            elapsed = time.monotonic() - started
+            pool.close()
+            print(
+                f"  {name:14s} {delivered:3d}/{requests} delivered in {elapsed:5.2f} s, "
+                f"{server.errors:3d} errors from the API, peak {server.peak_in_flight} at once"
+                + (f", {limiter.retried} retries" if limited else "")
+            )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Synthesis rate limiter")
+    parser.add_argument("--bench", action="store_true", help="Burst requests at a local stand-in")
+    parser.add_argument("--requests", type=int, default=40, help="Requests in the burst")
+    parser.add_argument("--workers", type=int, default=6, help="Threads sending them")
+    parser.add_argument("--server-ms", type=float, default=50.0, help="Simulated server time to first byte")
+    parser.add_argument("--error-rate", type=float, default=0.1, help="Fraction answered with 503")
+    parser.add_argument("--max-concurrent", type=int, default=2, help="Concurrent requests the stand-in allows")
+    args = parser.parse_args()
+    if not args.bench:
+        parser.print_help()
+        return 0
+    _bench(args.requests, args.workers, args.server_ms, args.error_rate, args.max_concurrent)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
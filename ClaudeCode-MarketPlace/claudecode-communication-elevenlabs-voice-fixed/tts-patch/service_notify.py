@@ -0,0 +1,56 @@
+"""Readiness notifications to whoever started the daemon.
+
+The sending side of the sd_notify(3) protocol: if ``NOTIFY_SOCKET`` is set
+in the daemon's environment, state lines such as ``READY=1`` are sent as
+one datagram to that Unix socket. The Voice Manager passes a socket to
+learn the moment the daemon accepts IPC connections, instead of sleeping
+and then checking the PID file. A systemd unit with ``Type=notify`` works
+the same way.
+
+Credit: COR Solutions - True Streaming Patch
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import socket
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceNotifier:
+    """Sends state lines to the socket named by ``NOTIFY_SOCKET``."""
+
+    def __init__(self, address: str | None):
+        """Initialize the notifier.
+
+        Args:
+            address: Socket path, "@name" for the abstract namespace, or
+                None to send nothing.
+        """
+        if address and address.startswith("@"):
+            address = "\0" + address[1:]
+        self._address = address or None
+
+    @classmethod
+    def from_environment(cls) -> ServiceNotifier:
+        """Take ``NOTIFY_SOCKET`` from the environment.
+
+        It is removed, so processes the daemon starts (mpv) don't inherit it.
+        """
+        return cls(os.environ.pop("NOTIFY_SOCKET", None))
+
+    def send(self, *assignments: str) -> None:
+        """Send state lines, e.g. ``send("READY=1", "STATUS=Serving")``.
+
+        Failures are logged and otherwise ignored: the daemon runs the same
+        whether or not anyone is listening.
+        """
+        if self._address is None:
+            return
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+                sock.sendto("\n".join(assignments).encode(), self._address)
+        except OSError as e:
+            logger.debug("Readiness notification not sent: %s", e)
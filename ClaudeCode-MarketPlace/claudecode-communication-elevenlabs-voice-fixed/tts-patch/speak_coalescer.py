@@ -0,0 +1,180 @@
+"""Coalescing of bursty speak requests.
+
+Hooks and scripts sometimes send the same text twice, or a run of tiny
+fragments, within a few hundred milliseconds, and each one used to become
+its own synthesis request and its own trip through the player. Speak
+requests now pass through a ``SpeakCoalescer`` first:
+
+* requests of the same priority arriving within ``coalesce_window`` of the
+  first one are merged, in order, into a single synthesis request (the
+  window is not extended by later arrivals, so it bounds the delay added),
+  separated by spaces: each request is whole text, and text that continues
+  mid-word is sent with ``speak_begin``/``speak_chunk`` instead;
+  a request arriving while nothing is playing or waiting goes straight on,
+  so speech that would start at once is never held back
+* a request whose filtered text and priority exactly repeat one seen within
+  ``dedupe_window`` is dropped
+
+A request of another priority, or one that would take the merged text past
+the length limit, sends the waiting batch on first, so order within a
+priority class is kept. ``CoalesceStats`` counts the requests and
+characters saved.
+
+Credit: COR Solutions - True Streaming Patch
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class SpeakRequest(Generic[T]):
+    """One speak request waiting to be sent on."""
+
+    text: str
+    priority: str
+    # Whatever the caller needs back to report on it (id, reply, timings)
+    context: T
+
+
+@dataclass
+class CoalesceStats:
+    """What coalescing saved since startup."""
+
+    # Speak requests seen
+    requests: int = 0
+    # Requests folded into an earlier one's synthesis request
+    merged: int = 0
+    # Exact repeats dropped, and their characters
+    duplicates: int = 0
+    duplicate_chars: int = 0
+
+    @property
+    def requests_saved(self) -> int:
+        """Synthesis requests that were not made."""
+        return self.merged + self.duplicates
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "merged": self.merged,
+            "duplicates": self.duplicates,
+            "requests_saved": self.requests_saved,
+            "chars_saved": self.duplicate_chars,
+        }
+
+
+class SpeakCoalescer(Generic[T]):
+    """Merges adjacent same-priority speak requests and drops repeats.
+
+    Runs on the event loop; ``on_batch`` is called from it with each batch
+    of one or more requests, in arrival order.
+    """
+
+    def __init__(
+        self,
+        on_batch: Callable[[list[SpeakRequest[T]]], None],
+        window: float = 0.1,
+        dedupe_window: float = 2.0,
+        max_chars: int = 5000,
+        is_idle: Callable[[], bool] | None = None,
+    ):
+        """Initialize the coalescer.
+
+        Args:
+            on_batch: Called with each batch to synthesize as one request.
+            window: Seconds a request waits for more of the same priority
+                (0 = send each request on at once, only dropping repeats).
+            dedupe_window: Seconds an exact repeat is dropped for (0 = never).
+            max_chars: Most characters in a merged request.
+            is_idle: Whether a request sent on now would start playing at
+                once; such a request is not held.
+        """
+        self._on_batch = on_batch
+        self.window = window
+        self.dedupe_window = dedupe_window
+        self.max_chars = max_chars
+        self._is_idle = is_idle
+        self.stats = CoalesceStats()
+        self._pending: list[SpeakRequest[T]] = []
+        self._pending_chars = 0
+        self._timer: asyncio.TimerHandle | None = None
+        # (priority, text) -> when last seen, oldest first
+        self._recent: OrderedDict[tuple[str, str], float] = OrderedDict()
+
+    def add(self, request: SpeakRequest[T]) -> bool:
+        """Take a request: hold it for merging, or send it on.
+
+        Returns:
+            False if it repeats a recent request and was dropped.
+        """
+        self.stats.requests += 1
+        if self._is_duplicate(request):
+            self.stats.duplicates += 1
+            self.stats.duplicate_chars += len(request.text)
+            return False
+
+        if self._pending and (
+            request.priority != self._pending[0].priority
+            or self._pending_chars + 1 + len(request.text) > self.max_chars
+        ):
+            self.flush()
+        if self._pending:
+            self.stats.merged += 1
+            self._pending_chars += 1
+        self._pending.append(request)
+        self._pending_chars += len(request.text)
+
+        if self.window <= 0 or (len(self._pending) == 1 and self._is_idle and self._is_idle()):
+            self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self.flush)
+        return True
+
+    def flush(self) -> None:
+        """Send the waiting batch on now, if there is one."""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._pending_chars = self._pending, [], 0
+        if batch:
+            self._on_batch(batch)
+
+    def clear(self) -> list[SpeakRequest[T]]:
+        """Discard the waiting batch without sending it on.
+
+        Returns:
+            The requests discarded, for the caller to report.
+        """
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._pending_chars = self._pending, [], 0
+        return batch
+
+    def close(self) -> None:
+        """Stop the timer; a waiting batch is discarded."""
+        self.clear()
+
+    def _is_duplicate(self, request: SpeakRequest[T]) -> bool:
+        """Whether the request repeats one seen recently; remembers it if not."""
+        if self.dedupe_window <= 0:
+            return False
+        now = time.monotonic()
+        while self._recent:
+            key, seen = next(iter(self._recent.items()))
+            if now - seen <= self.dedupe_window:
+                break
+            del self._recent[key]
+        key = (request.priority, request.text)
+        if key in self._recent:
+            return True
+        self._recent[key] = now
+        return False
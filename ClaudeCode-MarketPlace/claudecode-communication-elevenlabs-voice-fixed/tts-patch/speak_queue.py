@@ -0,0 +1,179 @@
+"""Priority queue for utterances waiting to be spoken.
+
+A plain FIFO makes a one-word confirmation wait behind a 5000-character
+auto-read answer, and lets bursts of hook messages pile up without limit.
+Utterances are queued in three priority classes, served highest first and
+in arrival order within a class:
+
+* ``cue``: voice-manager confirmations and pre-rendered cues
+* ``user``: speech a user or client asked for explicitly
+* ``auto``: auto-read of Claude's responses
+
+Auto-read is the only class that goes stale: a newer response can replace
+the ones still waiting, and one that waited too long is dropped when it
+reaches the front. The queue has a fixed depth; when it is full, the oldest
+item of the lowest class that is not above the new one is dropped, and if
+everything waiting outranks the new item, the new item is dropped instead.
+``clear`` drops everything waiting at once.
+
+Credit: COR Solutions - True Streaming Patch
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Callable, Generic, TypeVar
+
+logger = logging.getLogger(__name__)
+
+CUE = "cue"
+USER = "user"
+AUTO = "auto"
+# Highest priority first
+PRIORITIES = (CUE, USER, AUTO)
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Entry(Generic[T]):
+    item: T
+    priority: str
+    queued_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class WaitStats:
+    """Queue wait times of one priority class."""
+
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def add(self, seconds: float) -> None:
+        """Record one wait."""
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+
+class SpeakQueue(Generic[T]):
+    """Bounded priority queue with stale auto-read handling."""
+
+    def __init__(
+        self,
+        max_depth: int = 20,
+        auto_max_age: float = 60.0,
+        supersede_auto: bool = True,
+        on_drop: Callable[[T, str], None] | None = None,
+    ):
+        """Initialize the queue.
+
+        Args:
+            max_depth: Most items waiting at once.
+            auto_max_age: Seconds an auto-read item may wait before it is
+                dropped instead of spoken (0 = no limit).
+            supersede_auto: Drop waiting auto-read items when a new one
+                arrives.
+            on_drop: Called with each dropped item (including a new item
+                that was not queued) and the reason.
+        """
+        self._max_depth = max(1, max_depth)
+        self._auto_max_age = auto_max_age
+        self._supersede_auto = supersede_auto
+        self._on_drop = on_drop
+        self._queues: dict[str, deque[_Entry[T]]] = {p: deque() for p in PRIORITIES}
+        self._size = 0
+        self._nonempty = asyncio.Event()
+        self.waits = {p: WaitStats() for p in PRIORITIES}
+        # How long the item last returned by get had waited
+        self.last_wait = 0.0
+        self.dropped: Counter[str] = Counter()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def put(self, item: T, priority: str) -> bool:
+        """Queue an item.
+
+        Args:
+            item: Item to queue.
+            priority: One of ``PRIORITIES``.
+
+        Returns:
+            True if queued, False if the item was dropped because the
+            queue is full of higher-priority items.
+
+        Raises:
+            ValueError: If the priority is unknown.
+        """
+        if priority not in self._queues:
+            raise ValueError(f"unknown priority {priority!r}")
+
+        if priority == AUTO and self._supersede_auto:
+            while self._queues[AUTO]:
+                self._drop(self._queues[AUTO].popleft(), "superseded")
+
+        if self._size >= self._max_depth:
+            rank = PRIORITIES.index(priority)
+            victims = next((self._queues[p] for p in reversed(PRIORITIES[rank:]) if self._queues[p]), None)
+            if victims is None:
+                self._drop(_Entry(item, priority), "overflow", queued=False)
+                return False
+            self._drop(victims.popleft(), "overflow")
+
+        self._queues[priority].append(_Entry(item, priority))
+        self._size += 1
+        self._nonempty.set()
+        return True
+
+    def clear(self, reason: str = "cleared") -> int:
+        """Drop everything waiting, highest priority first.
+
+        Returns:
+            How many items were dropped.
+        """
+        count = 0
+        for priority in PRIORITIES:
+            waiting = self._queues[priority]
+            while waiting:
+                self._drop(waiting.popleft(), reason)
+                count += 1
+        return count
+
+    async def get(self) -> T:
+        """Wait for the highest-priority item.
+
+        Returns:
+            The next item to speak.
+        """
+        while True:
+            await self._nonempty.wait()
+            entry = next(self._queues[p] for p in PRIORITIES if self._queues[p]).popleft()
+            self._size -= 1
+            if not self._size:
+                self._nonempty.clear()
+
+            waited = time.monotonic() - entry.queued_at
+            if entry.priority == AUTO and self._auto_max_age and waited > self._auto_max_age:
+                self._drop(entry, "stale", queued=False)
+                continue
+            self.waits[entry.priority].add(waited)
+            self.last_wait = waited
+            logger.debug("Dequeued %s utterance after %.0f µs", entry.priority, waited * 1e6)
+            return entry.item
+
+    def _drop(self, entry: _Entry[T], reason: str, queued: bool = True) -> None:
+        """Discard an entry, counting and reporting it."""
+        if queued:
+            self._size -= 1
+            if not self._size:
+                self._nonempty.clear()
+        self.dropped[reason] += 1
+        logger.info("Dropped %s utterance (%s)", entry.priority, reason)
+        if self._on_drop is not None:
+            self._on_drop(entry.item, reason)
@@ -0,0 +1,528 @@
+"""Markdown-to-speech filter that stays linear on malformed input.
+
+The daemon strips markdown with a chain of seven passes (code fences,
+inline code, bold, italic, links, headers, blank lines), compiled once.
+Six are ``re.sub`` calls. The link pattern (``_LINK``) went quadratic
+on unclosed ``[text](`` runs: every ``[`` it couldn't close rescanned
+the rest of the text, stalling the daemon for seconds on long answers.
+The link pass is now a loop that makes the same matches, left to right,
+but looks up the closing ``]`` and ``)`` once for a whole run of
+openers, so it is linear on any input and its output is the pattern's.
+
+``IncrementalFilter`` releases streamed text at sentence boundaries that
+no markdown construct spans, pairing delimiters the way the chain does.
+
+Benchmark: python3 speech_filter.py --bench
+
+Credit: COR Solutions - True Streaming Patch
+"""
+
+from __future__ import annotations
+
+import bisect
+import re
+import sys
+import timeit
+from pathlib import Path
+
+CODE_BLOCK = "[code block]"
+
+# The chain's re.sub passes, compiled once: (pattern, replacement); links
+# are stripped between the emphasis and layout passes (see _strip_links)
+_CODE_PASSES = [
+    (re.compile(r"```[\s\S]*?```"), CODE_BLOCK),
+    (re.compile(r"`([^`]+)`"), r"\1"),
+]
+_EMPHASIS_PASSES = [
+    (re.compile(r"\*\*([^*]+)\*\*"), r"\1"),
+    (re.compile(r"\*([^*]+)\*"), r"\1"),
+]
+_LAYOUT_PASSES = [
+    (re.compile(r"^#+\s*", re.MULTILINE), ""),
+    (re.compile(r"\n\s*\n"), "\n\n"),
+]
+# What _strip_links matches, for checking it (quadratic on unclosed links)
+_LINK = re.compile(r"\[([^\]]+)\]\([^)]+\)")
+
+_STAR_RUNS = re.compile(r"\*+")
+_BACKTICKS = re.compile(r"`")
+_LINK_OPEN = re.compile(r"\[")
+# A "#" that would start a header, possibly behind delimiters or a link opener
+_FIRST_HEADER = re.compile(r"[`*\[]*#")
+# Sentence end or paragraph break (the boundaries speech_pipeline splits at)
+_SENTENCE_END = re.compile(r"[.!?…]+[\"'”’)\]]*(\s+)|(\n\s*\n\s*)")
+# Characters that can end a sentence or open/close a construct
+_SIGNIFICANT = re.compile(r"[.!?…\n`*\[\]()]")
+
+
+class _Finder:
+    """Next occurrence of a character outside fenced blocks, memoized.
+
+    Queries come in increasing position order, so each character of the
+    text is searched at most once over a whole scan.
+    """
+
+    def __init__(self, text: str, char: str, fences: dict[int, int], fence_starts: list[int]):
+        self._text = text
+        self._char = char
+        self._fences = fences
+        self._fence_starts = fence_starts
+        self._from = -1
+        self._result = -1
+
+    def find(self, pos: int) -> int:
+        """Index of the next occurrence at or after ``pos``, or -1."""
+        if 0 <= self._from <= pos and (self._result == -1 or pos <= self._result):
+            return self._result
+
+        self._from = pos
+        index = self._text.find(self._char, pos)
+        while index != -1 and self._fence_starts:
+            end = _fence_end(self._fences, self._fence_starts, index)
+            if end < 0:
+                break
+            index = self._text.find(self._char, end)
+        self._result = index
+        return index
+
+
+def _fence_end(fences: dict[int, int], fence_starts: list[int], index: int) -> int:
+    """End of the fenced block containing ``index``, or -1."""
+    slot = bisect.bisect_right(fence_starts, index) - 1
+    if slot >= 0 and index < fences[fence_starts[slot]]:
+        return fences[fence_starts[slot]]
+    return -1
+
+
+def _find_fences(text: str) -> dict[int, int]:
+    """Fenced blocks (start -> end), paired left to right."""
+    fences = {}
+    pos = 0
+    while (start := text.find("```", pos)) != -1:
+        close = text.find("```", start + 3)
+        if close == -1:
+            # Nothing later can close either
+            break
+        fences[start] = pos = close + 3
+    return fences
+
+
+def _outside(positions: list[int], fences: dict[int, int], fence_starts: list[int]) -> list[int]:
+    """Drop positions that fall inside fenced blocks."""
+    for start in reversed(fence_starts):
+        lo = bisect.bisect_left(positions, start)
+        hi = bisect.bisect_left(positions, fences[start], lo)
+        del positions[lo:hi]
+    return positions
+
+
+def _inline_code(backticks: list[int]) -> set[int]:
+    """Backticks that delimit inline code (`[^`]+`), paired left to right."""
+    code = set()
+    opener = -1
+    for pos in backticks:
+        if opener >= 0 and pos > opener + 1:
+            code.add(opener)
+            code.add(pos)
+            opener = -1
+        else:
+            opener = pos
+    return code
+
+
+def _star_runs(text: str, fences: dict[int, int], fence_starts: list[int], code: set[int]) -> list:
+    """Runs of adjacent asterisks outside fenced blocks, as position sequences.
+
+    Asterisks separated only by inline-code backticks count as adjacent,
+    since the backticks are gone before emphasis is paired.
+    """
+    runs: list = []
+    last_end = -1
+    fence = 0
+    for match in _STAR_RUNS.finditer(text):
+        start, end = match.span()
+        if fences:
+            while fence < len(fence_starts) and fences[fence_starts[fence]] <= start:
+                fence += 1
+            if fence < len(fence_starts) and fence_starts[fence] <= start:
+                continue
+        if runs and code and text[start - 1] == "`" and all(i in code for i in range(last_end, start)):
+            runs[-1] = [*runs[-1], *range(start, end)]
+        else:
+            runs.append(range(start, end))
+        last_end = end
+    return runs
+
+
+def _emphasis(runs: list, pairs: list | None = None) -> set[int]:
+    """Asterisks removed as bold delimiters, then as italic delimiters.
+
+    Runs are separated by real text, so ``**[^*]+**`` can only open on the
+    last two asterisks of a run and close on the first two of the next; the
+    italic pass then pairs the last remaining asterisk of one run with the
+    first remaining asterisk of the next.
+
+    Args:
+        runs: Star runs from ``_star_runs``.
+        pairs: If given, (opening, closing) delimiter positions are
+            appended to it.
+    """
+    delimiters = set()
+    leftover = []
+
+    # Bold, leftmost first
+    lo = 0
+    for i, run in enumerate(runs):
+        hi = len(run)
+        opens = hi - lo >= 2 and i + 1 < len(runs) and len(runs[i + 1]) >= 2
+        if opens:
+            delimiters.update(run[-2:])
+            delimiters.update(runs[i + 1][:2])
+            if pairs is not None:
+                pairs.append((run[-2], runs[i + 1][1]))
+            hi -= 2
+        if hi > lo:
+            leftover.append(run[lo:hi])
+        lo = 2 if opens else 0
+
+    # Italic, among the asterisks bold left behind
+    opener = -1
+    for run in leftover:
+        k = 0
+        if opener >= 0:
+            delimiters.add(opener)
+            delimiters.add(run[0])
+            if pairs is not None:
+                pairs.append((opener, run[0]))
+            k = 1
+        opener = run[-1] if len(run) > k else -1
+    return delimiters
+
+
+def markdown_to_speech(text: str, skip_code_blocks: bool = True) -> str:
+    """Strip markdown so the text reads naturally when spoken.
+
+    Fenced code becomes "[code block]" and inline code loses its backticks
+    (when ``skip_code_blocks``), bold/italic markers and link targets are
+    dropped, header markers are removed, runs of blank lines collapse to
+    one, and the result is stripped.
+
+    Args:
+        text: Raw text from Claude.
+        skip_code_blocks: Replace fenced code and unwrap inline code.
+
+    Returns:
+        Speech-ready text.
+    """
+    if skip_code_blocks:
+        for pattern, replacement in _CODE_PASSES:
+            text = pattern.sub(replacement, text)
+    for pattern, replacement in _EMPHASIS_PASSES:
+        text = pattern.sub(replacement, text)
+    text = _strip_links(text)
+    for pattern, replacement in _LAYOUT_PASSES:
+        text = pattern.sub(replacement, text)
+    return text.strip()
+
+
+def _strip_links(text: str) -> str:
+    """``_LINK.sub(r"\\1", text)``: keep the text of ``[text](target)`` links.
+
+    The pattern is tried at every "[": link text runs to the next "]",
+    which must be followed by "(", and the target to the next ")"; both
+    must be non-empty. Openers that share a "]" or ")" look it up once,
+    so unclosed runs cost linear time instead of a rescan each.
+    """
+    if "](" not in text:
+        return text
+    out: list[str] = []
+    copied = 0
+    close = paren = -1
+    pos = text.find("[")
+    while pos != -1:
+        if close < pos:
+            close = text.find("]", pos + 1)
+            if close == -1:
+                # No later "[" can be closed either
+                break
+        if close > pos + 1 and text.startswith("(", close + 1):
+            if paren < close + 2:
+                paren = text.find(")", close + 2)
+                if paren == -1:
+                    # No later link can find its ")" either
+                    break
+            if paren > close + 2:
+                out.append(text[copied:pos])
+                out.append(text[pos + 1 : close])
+                copied = paren + 1
+                pos = text.find("[", copied)
+                continue
+        pos = text.find("[", pos + 1)
+    if not copied:
+        return text
+    out.append(text[copied:])
+    return "".join(out)
+
+
+class IncrementalFilter:
+    """``markdown_to_speech`` over text that arrives in pieces.
+
+    Text is released up to the last sentence boundary that no markdown
+    construct spans: closed constructs (fenced blocks, inline code,
+    emphasis, links) must lie wholly on one side of the cut, and one still
+    open (an unclosed fence, a backtick or asterisk waiting for its
+    partner, a link whose ``](target)`` hasn't arrived) holds back the
+    text from where it starts. So each released piece reads the same as it
+    would in the filtered whole.
+
+    Apart from fences, an open construct only holds text back within its
+    paragraph: once a blank line follows it, or for a star run followed by
+    whitespace (a list bullet), it is taken as literal text.
+    """
+
+    def __init__(self, skip_code_blocks: bool = True):
+        """Initialize the filter.
+
+        Args:
+            skip_code_blocks: Passed on to ``markdown_to_speech``.
+        """
+        self._skip_code_blocks = skip_code_blocks
+        self._pending = ""
+        # Start of an unclosed fence in the pending text, or -1
+        self._open_fence = -1
+        # Length of the pending text when it last had no safe cut, or -1
+        self._stuck_at = -1
+
+    def feed(self, piece: str) -> str:
+        """Add a piece of raw text.
+
+        Args:
+            piece: Next piece of the response.
+
+        Returns:
+            Speech for the sentences that became final, or "".
+        """
+        if not piece:
+            return ""
+        start = len(self._pending)
+        self._pending += piece
+        # Nothing is released inside a fence until something closes it
+        if self._open_fence >= 0 and "```" not in self._pending[max(self._open_fence + 3, start - 2) :]:
+            return ""
+        # Plain words can't make a cut possible; look again once something
+        # that can (near the new text) arrives
+        if self._stuck_at >= 0 and not _SIGNIFICANT.search(self._pending, max(0, self._stuck_at - 16)):
+            self._stuck_at = len(self._pending)
+            return ""
+
+        cut = self._final_cut(self._pending)
+        if cut <= 0:
+            self._stuck_at = len(self._pending)
+            return ""
+        self._stuck_at = -1
+        done, self._pending = self._pending[:cut], self._pending[cut:]
+        if self._open_fence >= 0:
+            self._open_fence -= cut
+        return markdown_to_speech(done, self._skip_code_blocks)
+
+    def finish(self) -> str:
+        """Release everything still held back.
+
+        Returns:
+            Speech for the rest of the response, or "".
+        """
+        done, self._pending = self._pending, ""
+        self._open_fence = self._stuck_at = -1
+        return markdown_to_speech(done, self._skip_code_blocks)
+
+    def _final_cut(self, text: str) -> int:
+        """Last sentence boundary in ``text`` that is safe to cut at, or 0."""
+        limit = len(text)
+        # A cut may not fall strictly inside one of these (start, end) spans
+        spans: list[tuple[int, int]] = []
+        paragraph = text.rfind("\n\n")
+
+        def hold(pos: int) -> None:
+            nonlocal limit
+            if pos > paragraph:
+                limit = min(limit, pos)
+
+        fences: dict[int, int] = {}
+        fence_starts: list[int] = []
+        code: set[int] = set()
+        self._open_fence = -1
+        if self._skip_code_blocks:
+            fences = _find_fences(text)
+            fence_starts = sorted(fences)
+            spans.extend(fences.items())
+            opener = text.find("```", fences[fence_starts[-1]] if fences else 0)
+            if opener >= 0:
+                self._open_fence = limit = opener
+
+            backticks = _outside([m.start() for m in _BACKTICKS.finditer(text)], fences, fence_starts)
+            code = _inline_code(backticks)
+            paired = sorted(code)
+            spans.extend((a, b + 1) for a, b in zip(paired[::2], paired[1::2]))
+            if backticks and backticks[-1] not in code:
+                hold(backticks[-1])
+
+        runs = _star_runs(text, fences, fence_starts, code)
+        pairs: list[tuple[int, int]] = []
+        deleted = _emphasis(runs, pairs)
+        spans.extend((a, b + 1) for a, b in pairs)
+        for run in reversed(runs):
+            unpaired = [p for p in run if p not in deleted]
+            if unpaired:
+                after = unpaired[-1] + 1
+                if after == len(text) or not text[after].isspace():
+                    hold(unpaired[-1])
+                break
+
+        close_bracket = _Finder(text, "]", fences, fence_starts)
+        close_paren = _Finder(text, ")", fences, fence_starts)
+        link_end = 0
+        for match in _LINK_OPEN.finditer(text, 0, limit):
+            pos = match.start()
+            if pos < link_end or (fences and _fence_end(fences, fence_starts, pos) >= 0):
+                continue
+            close = close_bracket.find(pos + 1)
+            if close == -1 or close + 1 == len(text):
+                hold(pos)
+                continue
+            if close == pos + 1 or text[close + 1] != "(":
+                continue
+            slot = bisect.bisect_right(fence_starts, pos)
+            if slot < len(fence_starts) and fence_starts[slot] < close:
+                continue
+            paren = close_paren.find(close + 2)
+            if paren == -1:
+                hold(pos)
+            elif paren > close + 2:
+                spans.append((pos, paren + 1))
+                link_end = paren + 1
+
+        # Merge the spans so each candidate is checked with one bisect
+        starts: list[int] = []
+        ends: list[int] = []
+        for start, end in sorted(spans):
+            if ends and start < ends[-1]:
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+
+        cuts = [m.end(m.lastindex) for m in _SENTENCE_END.finditer(text, 0, limit)]
+        for cut in reversed(cuts):
+            # The gap may still grow, and a "#" mid-line must not become a header
+            if cut >= len(text) or cut > limit:
+                continue
+            if text[cut - 1] != "\n" and _FIRST_HEADER.match(text, cut):
+                continue
+            slot = bisect.bisect_right(starts, cut) - 1
+            if slot >= 0 and starts[slot] < cut < ends[slot]:
+                continue
+            return cut
+        return 0
+
+
+# ============================================================
+# BENCHMARK
+# ============================================================
+
+CORPUS_DIR = Path(__file__).parent / "filter-corpus"
+
+
+def _check_links(responses: dict[str, str], fuzz: int = 20_000) -> bool:
+    """Compare ``_strip_links`` with the link pattern's ``re.sub``.
+
+    On every corpus response, then on short random strings of link
+    syntax, where unclosed and nested brackets are the norm.
+    """
+    import random
+
+    def same(text: str) -> bool:
+        return _strip_links(text) == _LINK.sub(r"\1", text)
+
+    mismatches = [name for name, text in responses.items() if not same(text)]
+    for name in mismatches:
+        print(f"  MISMATCH {name}")
+    rng = random.Random(0)
+    fuzzed = ("".join(rng.choices("[]()a \n", k=rng.randint(0, 24))) for _ in range(fuzz))
+    failed = sum(not same(text) for text in fuzzed)
+    ok = not mismatches and not failed
+    print(
+        f"Link pass vs re.sub: {len(responses)} corpus responses, {fuzz} malformed inputs, "
+        f"{'identical' if ok else f'{len(mismatches) + failed} DIFFERENT'}"
+    )
+    return ok
+
+
+def _regex_chain(text: str) -> str:
+    """The chain with links stripped by ``re.sub``, as it used to run."""
+    for pattern, replacement in _CODE_PASSES + _EMPHASIS_PASSES + [(_LINK, r"\1")] + _LAYOUT_PASSES:
+        text = pattern.sub(replacement, text)
+    return text.strip()
+
+
+def _benchmark(size: int = 100_000) -> bool:
+    """Check the link pass against re.sub, then time the filter against the
+    chain as it used to run on long and pathological input.
+
+    Returns:
+        True if the link pass matched everywhere.
+    """
+    responses = {p.name: p.read_text() for p in sorted(CORPUS_DIR.glob("*.md"))}
+    if not responses:
+        print(f"No corpus found in {CORPUS_DIR}")
+        return False
+    ok = _check_links(responses)
+
+    corpus = "\n\n".join(responses.values())
+    cases = [
+        ("corpus response (avg)", None),
+        (f"{size // 1000} KB of responses", (corpus * (size // len(corpus) + 1))[:size]),
+        ("unclosed fence", "```python\n" + ("x = `a` * **b**\n" * size)[:size]),
+        ("unclosed inline code", ("`a " * size)[:size]),
+        ("deep nested emphasis", "***" * (size // 6) + "x" + "***" * (size // 6)),
+        ("alternating emphasis", ("**a *b **c** d* e** " * size)[:size]),
+        ("unclosed link targets", ("[a](" * size)[:size]),
+        ("unclosed link text (20 KB)", ("[a " * size)[:20_000]),
+        ("blank line runs", ("\n \t\n" * size)[:size]),
+    ]
+
+    print()
+    print("Markdown Filter Benchmark (per call)")
+    print(f"{'input':<28}  {'re.sub links':>12}  {'filter':>10}  {'speedup':>8}")
+    for label, text in cases:
+        if text is None:
+            texts = list(responses.values())
+            loops, per = 200, len(texts)
+        else:
+            texts = [text]
+            # re.sub is quadratic on unclosed links; one run is plenty
+            loops, per = (1 if "link" in label else 10), 1
+
+        def timed(function) -> float:
+            def run():
+                for t in texts:
+                    function(t)
+
+            return min(timeit.repeat(run, number=loops, repeat=3)) / (loops * per)
+
+        regex_s, filter_s = timed(_regex_chain), timed(markdown_to_speech)
+        print(f"{label:<28}  {_fmt(regex_s):>12}  {_fmt(filter_s):>10}  {regex_s / filter_s:>7.1f}x")
+    return ok
+
+
+def _fmt(seconds: float) -> str:
+    if seconds >= 1:
+        return f"{seconds:.2f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds * 1e6:.0f} us"
+
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv[1:]:
+        sys.exit(0 if _benchmark() else 1)
+    print(markdown_to_speech(sys.stdin.read()))
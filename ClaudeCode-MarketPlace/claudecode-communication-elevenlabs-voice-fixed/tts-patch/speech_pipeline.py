@@ -0,0 +1,243 @@
+"""Sentence-pipelined synthesis.
+
+A single ``stream(text)`` call for a long answer makes the first audio wait
+on the API working through the whole request. Instead the text is split
+into segments: a short first segment that starts playing quickly, then
+sentence-packed segments that are synthesized ahead of playback with a
+bounded number of requests in flight (as tasks on the daemon's event
+loop). Audio is yielded strictly in the original order so the player
+sees one continuous stream. Segments of a response that is still being
+written can be fed in as they become final (``SegmentFeed``).
+
+Credit: COR Solutions - True Streaming Patch
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+from collections.abc import AsyncIterable
+from contextlib import aclosing
+from typing import AsyncIterator, Callable, Iterable
+
+# Sentence end (with any closing quotes/brackets) or a paragraph break
+_SENTENCE_BOUNDARY = re.compile(r"[.!?…]+[\"'”’)\]]*(\s+)|(\n\s*\n\s*)")
+# Clause boundaries used to split sentences that are too long
+_CLAUSE_BOUNDARY = re.compile(r"[,;:—–](\s+)")
+
+_END = object()
+
+
+def split_sentences(text: str) -> list[str]:
+    """Split text into sentences and paragraphs.
+
+    Args:
+        text: Filtered text.
+
+    Returns:
+        Non-empty, stripped sentences in order.
+    """
+    sentences = []
+    start = 0
+    for match in _SENTENCE_BOUNDARY.finditer(text):
+        gap_start, gap_end = match.span(match.lastindex)
+        sentence = text[start:gap_start].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = gap_end
+    tail = text[start:].strip()
+    if tail:
+        sentences.append(tail)
+    return sentences
+
+
+def _split_long(sentence: str, max_chars: int) -> list[str]:
+    """Split a sentence longer than ``max_chars`` at clauses, then spaces."""
+    parts = []
+    while len(sentence) > max_chars:
+        cut = -1
+        for match in _CLAUSE_BOUNDARY.finditer(sentence, 0, max_chars + 1):
+            cut = match.start(1)
+        if cut <= 0:
+            cut = sentence.rfind(" ", 0, max_chars + 1)
+        if cut <= 0:
+            cut = max_chars
+        parts.append(sentence[:cut].strip())
+        sentence = sentence[cut:].strip()
+    if sentence:
+        parts.append(sentence)
+    return parts
+
+
+def split_segments(text: str, first_max_chars: int = 120, max_chars: int = 600) -> list[str]:
+    """Split text into synthesis segments.
+
+    The first segment is a single short sentence or clause so playback can
+    start as soon as possible. Later sentences are packed together up to
+    ``max_chars`` to keep the number of API requests down.
+
+    Args:
+        text: Filtered text.
+        first_max_chars: Maximum length of the first segment.
+        max_chars: Maximum length of later segments.
+
+    Returns:
+        Segments in playback order.
+    """
+    sentences = split_sentences(text)
+    if not sentences:
+        return []
+
+    first, *rest = _split_long(sentences[0], first_max_chars)
+    pending = rest + sentences[1:]
+
+    segments = [first]
+    current = ""
+    for sentence in pending:
+        for part in _split_long(sentence, max_chars):
+            if current and len(current) + 1 + len(part) > max_chars:
+                segments.append(current)
+                current = part
+            else:
+                current = f"{current} {part}" if current else part
+    if current:
+        segments.append(current)
+    return segments
+
+
+class SegmentFeed:
+    """Segments that are still arriving while earlier ones play.
+
+    Iterating waits until the next segment is put or the feed is closed,
+    so a feed can be passed to ``SegmentPipeline.stream`` before the whole
+    text is known.
+    """
+
+    def __init__(self, idle_timeout: float = 30.0):
+        """Initialize the feed.
+
+        Args:
+            idle_timeout: Seconds to wait for the next segment before
+                giving up on the rest.
+        """
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._idle_timeout = idle_timeout
+
+    def put(self, segment: str) -> None:
+        """Append a segment."""
+        self._queue.put_nowait(segment)
+
+    def close(self) -> None:
+        """Mark the end of the segments."""
+        self._queue.put_nowait(_END)
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        """Yield segments as they are put, until closed.
+
+        Raises:
+            TimeoutError: If no segment arrives within the idle timeout.
+        """
+        while True:
+            try:
+                segment = await asyncio.wait_for(self._queue.get(), self._idle_timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"no text received for {self._idle_timeout:.0f}s") from None
+            if segment is _END:
+                return
+            yield segment
+
+
+class SegmentPipeline:
+    """Synthesizes segments concurrently and yields audio in order."""
+
+    def __init__(self, synthesize: Callable[[str], AsyncIterator[bytes]], max_concurrency: int = 3):
+        """Initialize the pipeline.
+
+        Args:
+            synthesize: Streams encoded audio for one segment of text.
+            max_concurrency: Maximum segments synthesized or buffered ahead
+                of playback at once (including the one playing).
+        """
+        self._synthesize = synthesize
+        self._max_concurrency = max(1, max_concurrency)
+
+    async def stream(
+        self,
+        segments: Iterable[str] | AsyncIterable[str],
+        synthesize: Callable[[str], AsyncIterator[bytes]] | None = None,
+    ) -> AsyncIterator[bytes]:
+        """Yield audio for all segments in order.
+
+        The first segment's chunks are yielded as they arrive; later
+        segments are prefetched in background tasks while earlier ones
+        play. Closing the stream early cancels every synthesis in flight.
+
+        Args:
+            segments: Text segments in playback order. May be a
+                ``SegmentFeed`` that is still being filled.
+            synthesize: Used instead of the pipeline's own for this stream
+                (e.g. bound to one utterance's cancel token).
+
+        Yields:
+            Encoded audio chunks.
+
+        Raises:
+            Exception: Whatever a segment's synthesis (or the segment
+                source) raised, once playback reaches that point.
+        """
+        synthesize = synthesize or self._synthesize
+        slots = asyncio.Semaphore(self._max_concurrency)
+        # One audio queue per segment in playback order, then _END
+        order: asyncio.Queue = asyncio.Queue()
+        fetches: set[asyncio.Task] = set()
+
+        async def fetch(text: str, out: asyncio.Queue) -> None:
+            try:
+                async with aclosing(synthesize(text)) as stream:
+                    async for chunk in stream:
+                        out.put_nowait(chunk)
+            except Exception as e:
+                out.put_nowait(e)
+            finally:
+                out.put_nowait(_END)
+
+        async def schedule() -> None:
+            try:
+                async for text in _aiter(segments):
+                    # A slot is held until playback has consumed the segment
+                    await slots.acquire()
+                    out: asyncio.Queue = asyncio.Queue()
+                    order.put_nowait(out)
+                    task = asyncio.create_task(fetch(text, out))
+                    fetches.add(task)
+                    task.add_done_callback(fetches.discard)
+            except Exception as e:
+                order.put_nowait(e)
+            order.put_nowait(_END)
+
+        scheduler = asyncio.create_task(schedule())
+        try:
+            while (out := await order.get()) is not _END:
+                if isinstance(out, Exception):
+                    raise out
+                try:
+                    while (item := await out.get()) is not _END:
+                        if isinstance(item, Exception):
+                            raise item
+                        yield item
+                finally:
+                    slots.release()
+        finally:
+            scheduler.cancel()
+            for task in list(fetches):
+                task.cancel()
+
+
+async def _aiter(items: Iterable[str] | AsyncIterable[str]) -> AsyncIterator[str]:
+    """Iterate a plain or async iterable asynchronously."""
+    if isinstance(items, AsyncIterable):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
@@ -0,0 +1,104 @@
+"""Startup timings for ``daemon start --startup-profile``.
+
+The daemon brings its IPC socket up first and loads the API client,
+hotkey listener, persistent player and cues afterwards, some of them
+concurrently. The profile records when each phase started and how long it
+took, relative to the start of ``main()``, and adds what importing the
+modules involved costs, measured with ``python -X importtime`` in a child
+interpreter (an import that already happened in this process costs
+nothing to repeat, so it can't be timed here).
+
+Credit: COR Solutions - True Streaming Patch
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+# "import time: self [us] | cumulative | imported package"
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+class StartupProfile:
+    """Start offset and duration of each startup phase."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self._phases: list[tuple[str, float, float]] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as one phase (usable from any thread)."""
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self._phases.append((name, begin - self.started, end - begin))
+
+    def report(self, modules: list[str]) -> str:
+        """Format the phases and the import cost of ``modules``.
+
+        Args:
+            modules: Modules whose import cost to measure.
+
+        Returns:
+            Multi-line report.
+        """
+        with self._lock:
+            phases = sorted(self._phases, key=lambda p: p[1])
+        lines = ["Startup profile (ms since start):", f"  {'phase':28s} {'start':>8s} {'took':>8s}"]
+        for name, offset, duration in phases:
+            lines.append(f"  {name:28s} {offset * 1000:8.1f} {duration * 1000:8.1f}")
+
+        costs = import_costs(modules)
+        if costs:
+            lines.append("Import cost (python -X importtime, cumulative ms):")
+            for module, cumulative in costs:
+                lines.append(f"  {module:44s} {cumulative / 1000:8.1f}")
+        return "\n".join(lines)
+
+
+def import_costs(modules: list[str], limit: int = 15) -> list[tuple[str, int]]:
+    """Measure what importing modules costs in a fresh interpreter.
+
+    Args:
+        modules: Modules to import, in order.
+        limit: Most entries to return.
+
+    Returns:
+        (module, cumulative microseconds) for the requested modules and the
+        most expensive packages they pulled in, most expensive first.
+    """
+    source = "\n".join(f"import {module}" for module in modules)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in sys.path if p))
+    try:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", source],
+            capture_output=True,
+            text=True,
+            env=env,
+            timeout=60,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return []
+
+    costs: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match is None:
+            continue
+        cumulative, depth, module = int(match.group(2)), len(match.group(3)), match.group(4)
+        # Top-level imports, plus the requested modules wherever they were first pulled in
+        if depth <= 1 or module in modules:
+            costs[module] = max(costs.get(module, 0), cumulative)
+    return sorted(costs.items(), key=lambda item: item[1], reverse=True)[:limit]
@@ -0,0 +1,168 @@
+"""Fixed-size audio ring buffer that is played while it fills.
+
+The buffered fallback used to collect every chunk of an utterance, join
+them into one bytes object (a second full copy) and only then start
+playing, so time to first audio went back to the whole synthesis time and
+memory peaked at twice the audio size. ``AudioRing`` is a preallocated
+``bytearray`` that the synthesis side writes into as chunks arrive and
+the player side reads ``memoryview`` slices out of, without copying
+them. Reading starts once ``prebuffer`` bytes are in (or the stream
+ended), which absorbs jitter in chunk arrival. A writer that gets ahead
+of playback waits for space, so memory stays at ``capacity`` however long
+the utterance is.
+
+Both sides run on the event loop.
+
+Benchmark (ring vs collect-and-join):
+    python3 stream_buffer.py --bench
+
+Credit: COR Solutions - True Streaming Patch
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+# 512 KiB holds about 30 s of 128 kbps MP3
+DEFAULT_CAPACITY = 512 * 1024
+# Bytes buffered before playback starts (about 2 s of 128 kbps MP3)
+DEFAULT_PREBUFFER = 32 * 1024
+
+
+class AudioRing:
+    """Single-writer, single-reader byte ring on the event loop."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, prebuffer: int = DEFAULT_PREBUFFER):
+        """Initialize the ring.
+
+        Args:
+            capacity: Bytes preallocated; a writer waits when it is full.
+            prebuffer: Bytes to hold before the first read returns
+                (capped at ``capacity``).
+        """
+        self._data = bytearray(capacity)
+        self._view = memoryview(self._data)
+        self._capacity = capacity
+        self._prebuffer = min(prebuffer, capacity)
+        # Absolute byte counts written and read; positions are modulo capacity
+        self._written = 0
+        self._read = 0
+        # Bytes of the view last returned by read, still in use by the reader
+        self._held = 0
+        self._closed = False
+        self._started = False
+        self._changed = asyncio.Condition()
+
+    @property
+    def buffered(self) -> int:
+        """Bytes written and not yet consumed (including the reader's view)."""
+        return self._written - self._read
+
+    async def write(self, data: bytes) -> None:
+        """Append data, waiting for the reader whenever the ring is full."""
+        source = memoryview(data)
+        while source:
+            async with self._changed:
+                await self._changed.wait_for(lambda: self.buffered < self._capacity)
+                start = self._written % self._capacity
+                size = min(len(source), self._capacity - self.buffered, self._capacity - start)
+                self._view[start:start + size] = source[:size]
+                self._written += size
+                self._changed.notify_all()
+            source = source[size:]
+
+    async def close(self) -> None:
+        """Mark the end of the stream; reads return what is left, then nothing."""
+        async with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+
+    async def read(self, max_bytes: int) -> memoryview:
+        """Wait for data and return a view of up to ``max_bytes`` of it.
+
+        The first read waits for the prebuffer. The view is only valid until
+        the next ``read``: its bytes are handed back to the writer then.
+
+        Returns:
+            A slice of the ring, or an empty view at the end of the stream.
+        """
+        async with self._changed:
+            # The previous view's bytes are free for the writer now
+            self._read += self._held
+            self._held = 0
+            self._changed.notify_all()
+            if not self._started:
+                await self._changed.wait_for(lambda: self._closed or self.buffered >= self._prebuffer)
+                self._started = True
+            await self._changed.wait_for(lambda: self._closed or self.buffered > 0)
+            start = self._read % self._capacity
+            size = min(max_bytes, self.buffered, self._capacity - start)
+            self._held = size
+            return self._view[start:start + size]
+
+
+async def _bench(size: int, chunk_size: int, capacity: int) -> None:
+    """Compare collect-and-join with the ring for one utterance."""
+    chunks = size // chunk_size
+
+    async def source():
+        # A new object per chunk, as from the network
+        for _ in range(chunks):
+            yield b"\xff" * chunk_size
+            await asyncio.sleep(0)
+
+    async def sink(data) -> None:
+        await asyncio.sleep(0)
+
+    # Joined: everything arrives before the first byte is played
+    tracemalloc.start()
+    start = time.perf_counter()
+    audio = b"".join([c async for c in source()])
+    first_joined = time.perf_counter() - start
+    await sink(audio)
+    _, peak_joined = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del audio
+
+    # Ring: played while filling
+    tracemalloc.start()
+    ring = AudioRing(capacity)
+    first_ring: float | None = None
+    start = time.perf_counter()
+
+    async def fill() -> None:
+        async for c in source():
+            await ring.write(c)
+        await ring.close()
+
+    filling = asyncio.create_task(fill())
+    while view := await ring.read(chunk_size):
+        if first_ring is None:
+            first_ring = time.perf_counter() - start
+        await sink(view)
+    await filling
+    _, peak_ring = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{size / 1e6:.1f} MB utterance in {chunk_size}-byte chunks:")
+    print(f"  collect and join   first byte after {first_joined * 1000:7.2f} ms, peak {peak_joined / 1e6:6.2f} MB")
+    print(f"  ring ({capacity // 1024} KiB)     first byte after {first_ring * 1000:7.2f} ms, peak {peak_ring / 1e6:6.2f} MB")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Audio ring buffer")
+    parser.add_argument("--bench", action="store_true", help="Compare with collect-and-join")
+    args = parser.parse_args()
+    if not args.bench:
+        parser.print_help()
+        return 0
+    for size in (1_000_000, 8_000_000):
+        asyncio.run(_bench(size, 4096, DEFAULT_CAPACITY))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,148 @@
+"""Settings for the COR Solutions streaming patch.
+
+The official ``Config`` only knows about the ``[elevenlabs-tts]`` table, so
+the patch keeps its own options in a separate ``[streaming]`` table of the
+same ``config.toml`` (the STT config does the same with ``[safety]``).
+Missing keys fall back to the defaults below.
+
+Credit: COR Solutions - True Streaming Patch
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+
+try:
+    import tomllib
+except ImportError:  # Python 3.10
+    try:
+        import tomli as tomllib  # type: ignore[no-redef]
+    except ImportError:
+        tomllib = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StreamingConfig:
+    """Options for the streaming patch (``[streaming]`` table)."""
+
+    # Keep one mpv running in idle mode instead of spawning one per utterance
+    persistent_player: bool = True
+    # mpv executable to run
+    mpv_path: str = "mpv"
+    # Without mpv: a player reading audio from stdin, fed as audio arrives
+    # once fallback_prebuffer_kb is buffered (else the official player
+    # gets whole utterances)
+    fallback_player: str = "ffplay -nodisp -autoexit -loglevel quiet -"
+    fallback_prebuffer_kb: int = 32
+    # The same for raw formats, told the layout ({format}, {rate}, {channels})
+    fallback_raw_player: str = "ffplay -nodisp -autoexit -loglevel quiet -f {format} -ar {rate} -"
+
+    # Format requested from the API (see audio_format.py): "configured"
+    # (output_format), "latency" (latency_format, raw PCM played without
+    # probing or decoding), "bandwidth" (bandwidth_format), or a format name
+    audio_format: str = "configured"
+    latency_format: str = "pcm_24000"
+    bandwidth_format: str = "opus_48000_32"
+
+    # Where audio goes (see audio_sink.py): "auto" (mpv, then
+    # fallback_player, then the official player), one of those alone
+    # ("mpv", "pipe", "player"), or for measuring without audio "null",
+    # "file" (one file per utterance in sink_dir) or "paced" (discarded
+    # at playback speed, with sink_buffer_seconds of buffer)
+    sink: str = "auto"
+    sink_dir: str = ""
+    sink_buffer_seconds: float = 1.0
+    # Playback bytes per second for underrun estimates (0 = from the
+    # output format)
+    sink_byte_rate: float = 0.0
+
+    # Split long text into segments synthesized ahead of playback
+    pipeline: bool = True
+    # Segments synthesized or buffered ahead at once (including the one playing)
+    pipeline_concurrency: int = 3
+    # Keep the first segment short so the first audio arrives quickly
+    first_segment_max_chars: int = 120
+    segment_max_chars: int = 600
+    # Give up on a speak_chunk utterance after this long without new text
+    stream_idle_timeout: float = 30.0
+
+    # Most utterances waiting at once; when full, the oldest of the lowest
+    # priority class not above the new one is dropped (else the new one)
+    queue_max_depth: int = 20
+    # Drop auto-read that waited longer than this before playing (0 = never)
+    auto_read_max_age: float = 60.0
+    # A new auto-read response replaces auto-read still waiting
+    supersede_auto_read: bool = True
+    # Cues and user speech interrupt auto-read that is playing
+    preempt_auto_read: bool = True
+    # Seconds a speak request waits to be merged with more of the same
+    # priority into one synthesis request (0 = send each on at once)
+    coalesce_window: float = 0.1
+    # Drop a speak request repeating one seen this many seconds ago (0 = never)
+    dedupe_window: float = 2.0
+
+    # Synthesize over the patch's own kept-alive HTTPS connections, opened
+    # ahead of time, instead of the official client's
+    http_pool: bool = True
+    # Idle connections kept, and seconds one may idle before it is replaced
+    http_pool_size: int = 4
+    http_idle_timeout: float = 60.0
+    # API base URL, and a CA file to trust for it (for a local stand-in,
+    # see bench/api_standin.py)
+    api_url: str = "https://api.elevenlabs.io"
+    api_ca_file: str = ""
+
+    # Characters sent to the API per minute, in bursts of up to a minute's
+    # worth (0 = no limit), and most synthesis streams open at once (0 = no
+    # limit); set them to your plan's limits
+    rate_limit_chars_per_minute: int = 0
+    max_concurrent_requests: int = 3
+    # Retries of a request refused with 429 or 5xx, or that could not
+    # connect, before any audio arrived; the delay is jittered and doubles
+    # from retry_backoff up to retry_backoff_max seconds
+    synthesis_retries: int = 3
+    retry_backoff: float = 0.25
+    retry_backoff_max: float = 4.0
+    # Failures in a row (5xx or no connection) after which requests fail at
+    # once for circuit_breaker_reset seconds (0 = never)
+    circuit_breaker_failures: int = 5
+    circuit_breaker_reset: float = 30.0
+
+    # Keep synthesized audio on disk and replay repeated text from there
+    cache: bool = True
+    cache_max_mb: int = 100
+
+    # Extra or overridden cue phrases ([streaming.cues] table: name = "text")
+    cues: dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, config_dir: Path) -> StreamingConfig:
+        """Load the ``[streaming]`` table from ``config_dir/config.toml``.
+
+        Args:
+            config_dir: Plugin config directory.
+
+        Returns:
+            Loaded settings, or defaults if the file or table is missing.
+        """
+        config_path = config_dir / "config.toml"
+        if tomllib is None or not config_path.exists():
+            return cls()
+
+        try:
+            with config_path.open("rb") as f:
+                data = tomllib.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Could not read streaming settings: %s", e)
+            return cls()
+
+        section = data.get("streaming", {})
+        known = {f.name for f in fields(cls)}
+        unknown = set(section) - known
+        if unknown:
+            logger.warning("Ignoring unknown streaming settings: %s", ", ".join(sorted(unknown)))
+        return cls(**{k: v for k, v in section.items() if k in known})
@@ -0,0 +1,495 @@
+"""Keep-alive HTTPS client for the ElevenLabs streaming endpoint.
+
+Every synthesis request is a new HTTPS request, and when the connection
+behind it has gone idle it pays DNS, TCP and TLS setup again before the
+server even sees the text: that time lands directly on time to first
+audio. ``SynthesisClient`` streams ``POST /v1/text-to-speech/<voice>/stream``
+over a ``ConnectionPool`` of kept-alive connections that the daemon opens
+ahead of time (at startup, when the listening cue plays, and again once a
+connection has idled out), so a request normally starts on a connection
+that is already open.
+
+Each request's time to first byte is split into connect time (zero on a
+reused connection) and server time (request sent to first audio byte),
+and reported to an ``on_timing`` callback.
+
+Connections go through the proxy the environment names for the API
+(HTTPS_PROXY, or HTTP_PROXY for an http:// API URL, unless NO_PROXY
+matches the host), as the official client's do: a CONNECT tunnel is
+opened through it and TLS runs end to end inside. Only http:// proxies
+can be tunnelled through; for others ``ConnectionPool`` raises
+``ValueError`` and the daemon synthesizes through the official client.
+
+A request streamed with a ``CancelToken`` (see cancel_token.py) shuts its
+connection down the moment the token is cancelled, so a thread waiting on
+the server returns at once instead of at the next chunk.
+
+Benchmark against a local HTTPS stand-in with simulated handshake and
+server latency (see bench/api_standin.py, which must be on ``PYTHONPATH``):
+    PYTHONPATH=bench python3 -m elevenlabs_tts.synthesis_client --bench
+
+Credit: COR Solutions - True Streaming Patch
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import http.client
+import json
+import logging
+import select
+import socket
+import ssl
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterator
+from urllib.parse import quote, unquote, urlencode, urlsplit
+from urllib.request import getproxies, proxy_bypass
+
+from elevenlabs_tts.cancel_token import CancelToken
+
+logger = logging.getLogger(__name__)
+
+API_URL = "https://api.elevenlabs.io"
+STREAM_PATH = "/v1/text-to-speech/{voice_id}/stream"
+USER_PATH = "/v1/user"
+
+# Most bytes handed on per read; smaller reads are passed on as they arrive
+READ_SIZE = 16 * 1024
+# Seconds to wait for a connection, and for the server between reads
+CONNECT_TIMEOUT = 10.0
+READ_TIMEOUT = 30.0
+
+
+class SynthesisError(Exception):
+    """Raised when the API answers a synthesis request with an error."""
+
+    def __init__(self, status: int, detail: str, retry_after: float | None = None):
+        super().__init__(f"HTTP {status}: {detail}")
+        self.status = status
+        # Seconds the server asked us to wait (Retry-After), if it did
+        self.retry_after = retry_after
+
+
+@dataclass
+class RequestTiming:
+    """Where one request's time to first byte went (seconds)."""
+
+    # DNS, TCP and TLS setup; 0 when an open connection was reused
+    connect: float
+    # Request sent to first audio byte
+    server: float
+    reused: bool
+
+    @property
+    def ttfb(self) -> float:
+        return self.connect + self.server
+
+
+class ConnectionPool:
+    """Kept-alive HTTP(S) connections to one host, shared by worker threads."""
+
+    def __init__(
+        self,
+        url: str = API_URL,
+        size: int = 4,
+        idle_timeout: float = 60.0,
+        context: ssl.SSLContext | None = None,
+    ):
+        """Initialize the pool. Nothing is connected until used or warmed.
+
+        Args:
+            url: Base URL of the API.
+            size: Most idle connections kept.
+            idle_timeout: Seconds a connection may sit idle before it is
+                replaced rather than reused (servers drop idle ones).
+            context: TLS context (default: system trust store).
+
+        Raises:
+            ValueError: If the environment names a proxy for the API that
+                isn't an http:// proxy.
+        """
+        parts = urlsplit(url)
+        self.https = parts.scheme == "https"
+        self.host = parts.hostname or ""
+        self.port = parts.port
+        # (host, port, CONNECT headers) of the proxy to tunnel through, if any
+        self.proxy = proxy_for(url)
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self._context = context or (ssl.create_default_context() if self.https else None)
+        # Idle connections with the time each was last used, oldest first
+        self._idle: list[tuple[http.client.HTTPConnection, float]] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def acquire(self) -> tuple[http.client.HTTPConnection, float, bool]:
+        """Take an idle connection, or open a new one (blocking).
+
+        Returns:
+            (connection, seconds spent connecting, whether it was reused).
+
+        Raises:
+            OSError: If a new connection could not be opened.
+        """
+        with self._lock:
+            self._prune()
+            if self._idle:
+                connection, _ = self._idle.pop()
+                return connection, 0.0, True
+        connection, seconds = self._connect()
+        return connection, seconds, False
+
+    def release(self, connection: http.client.HTTPConnection, reusable: bool) -> None:
+        """Return a connection after use.
+
+        Args:
+            connection: Connection from ``acquire``.
+            reusable: False if a response was not read to the end or the
+                server asked to close; the connection is closed then.
+        """
+        with self._lock:
+            if reusable and not self._closed and len(self._idle) < self.size:
+                self._idle.append((connection, time.monotonic()))
+                return
+        connection.close()
+
+    def warm(self) -> float | None:
+        """Open a connection now unless a usable one is already idle.
+
+        Returns:
+            Seconds spent connecting, or None if nothing needed opening.
+
+        Raises:
+            OSError: If the connection could not be opened.
+        """
+        with self._lock:
+            self._prune()
+            if self._idle or self._closed:
+                return None
+        connection, seconds = self._connect()
+        self.release(connection, reusable=True)
+        return seconds
+
+    def close(self) -> None:
+        """Close idle connections; ones in use are closed when released."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            connection.close()
+
+    def _connect(self) -> tuple[http.client.HTTPConnection, float]:
+        """Open and handshake a new connection, timing it."""
+        host, port = (self.proxy[0], self.proxy[1]) if self.proxy else (self.host, self.port)
+        if self.https:
+            connection: http.client.HTTPConnection = http.client.HTTPSConnection(
+                host, port, timeout=CONNECT_TIMEOUT, context=self._context
+            )
+        else:
+            connection = http.client.HTTPConnection(host, port, timeout=CONNECT_TIMEOUT)
+        if self.proxy:
+            connection.set_tunnel(self.host, self.port, self.proxy[2])
+        started = time.monotonic()
+        connection.connect()
+        seconds = time.monotonic() - started
+        connection.sock.settimeout(READ_TIMEOUT)
+        return connection, seconds
+
+    def _prune(self) -> None:
+        """Close idle connections that timed out or the server has closed.
+
+        Call with the lock held.
+        """
+        now = time.monotonic()
+        keep = []
+        for connection, last_used in self._idle:
+            if now - last_used < self.idle_timeout and not _peer_closed(connection):
+                keep.append((connection, last_used))
+            else:
+                connection.close()
+        self._idle = keep
+
+
+def proxy_for(url: str) -> tuple[str, int, dict[str, str]] | None:
+    """The proxy the environment says to reach ``url`` through, if any.
+
+    Returns:
+        (proxy host, proxy port, headers for the CONNECT request), or None
+        if there is no proxy for the URL's scheme or NO_PROXY matches its
+        host.
+
+    Raises:
+        ValueError: If the proxy isn't an http:// proxy.
+    """
+    parts = urlsplit(url)
+    proxy = getproxies().get(parts.scheme)
+    if not proxy or proxy_bypass(parts.hostname or ""):
+        return None
+    if "://" not in proxy:
+        proxy = "http://" + proxy
+    proxy_parts = urlsplit(proxy)
+    if proxy_parts.scheme != "http" or not proxy_parts.hostname:
+        # Not the whole URL: it may carry credentials
+        raise ValueError(f"can't tunnel through {proxy_parts.scheme}:// proxy {proxy_parts.hostname}")
+    headers = {}
+    if proxy_parts.username:
+        credentials = f"{unquote(proxy_parts.username)}:{unquote(proxy_parts.password or '')}"
+        headers["Proxy-Authorization"] = "Basic " + base64.b64encode(credentials.encode()).decode()
+    return proxy_parts.hostname, proxy_parts.port or 80, headers
+
+
+def _peer_closed(connection: http.client.HTTPConnection) -> bool:
+    """Whether an idle connection was closed by the server.
+
+    No response data should arrive on an idle HTTP/1.1 connection, but a
+    TLS 1.3 server sends session tickets after the handshake, which make
+    the socket readable too. A non-blocking read consumes those and finds
+    nothing; end of stream (or stray data) means the connection is unusable.
+    """
+    sock = connection.sock
+    if sock is None:
+        return True
+    readable, _, _ = select.select([sock], [], [], 0)
+    if not readable:
+        return False
+    sock.setblocking(False)
+    try:
+        sock.recv(1)
+        return True
+    except (BlockingIOError, ssl.SSLWantReadError):
+        return False
+    except OSError:
+        return True
+    finally:
+        sock.settimeout(READ_TIMEOUT)
+
+
+def _abort(connection: http.client.HTTPConnection) -> None:
+    """Shut a connection's socket down from another thread.
+
+    A thread blocked reading it sees end of stream at once. The plain
+    socket method is used on TLS sockets too: ``SSLSocket.shutdown`` also
+    unwraps, under the feet of the reading thread.
+    """
+    sock = connection.sock
+    if sock is None:
+        return
+    try:
+        socket.socket.shutdown(sock, socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+def _retry_after(response: http.client.HTTPResponse) -> float | None:
+    """Seconds from a Retry-After header, if it has them (not an HTTP date)."""
+    try:
+        return max(0.0, float(response.getheader("Retry-After", "")))
+    except ValueError:
+        return None
+
+
+def _nothing() -> None:
+    pass
+
+
+class SynthesisClient:
+    """Streams speech from the ElevenLabs API over a ConnectionPool."""
+
+    def __init__(
+        self,
+        api_key: str,
+        config,
+        pool: ConnectionPool,
+        on_timing: Callable[[RequestTiming], None] | None = None,
+    ):
+        """Initialize the client.
+
+        Args:
+            api_key: ElevenLabs API key.
+            config: TTS config providing the voice settings.
+            pool: Connections to send requests on.
+            on_timing: Called (on the requesting thread) with each request's
+                timing once its first audio byte arrives.
+        """
+        self._api_key = api_key
+        self._config = config
+        self._pool = pool
+        self._on_timing = on_timing
+
+    def stream(self, text: str, cancel: CancelToken | None = None) -> Iterator[bytes]:
+        """Synthesize text, yielding audio as it arrives (blocking).
+
+        Closing the iterator early closes its connection instead of
+        returning it to the pool.
+
+        Args:
+            text: Text to synthesize.
+            cancel: Cancelling it (from any thread) shuts the connection
+                down at once.
+
+        Raises:
+            SynthesisError: If the API rejects the request.
+            OSError: If the API cannot be reached.
+            Cancelled: If ``cancel`` was cancelled.
+        """
+        config = self._config
+        path = STREAM_PATH.format(voice_id=quote(config.voice_id, safe=""))
+        path += "?" + urlencode({"output_format": config.output_format})
+        body = json.dumps(
+            {
+                "text": text,
+                "model_id": config.model_id,
+                "voice_settings": {
+                    "stability": config.stability,
+                    "similarity_boost": config.similarity_boost,
+                    "speed": config.speed,
+                },
+            }
+        ).encode()
+        headers = {"xi-api-key": self._api_key, "Content-Type": "application/json"}
+
+        for attempt in range(2):
+            if cancel:
+                cancel.check()
+            connection, connect_seconds, reused = self._pool.acquire()
+            forget = cancel.on_cancel(lambda connection=connection: _abort(connection)) if cancel else _nothing
+            sent = time.monotonic()
+            try:
+                connection.request("POST", path, body, headers)
+                response = connection.getresponse()
+                break
+            except (http.client.HTTPException, OSError):
+                forget()
+                connection.close()
+                if cancel:
+                    cancel.check()
+                # The server may have dropped a kept-alive connection just
+                # as it was reused; the request never reached it, so retry
+                if reused and attempt == 0:
+                    continue
+                raise
+
+        complete = False
+        try:
+            if response.status != 200:
+                detail = response.read(2048).decode(errors="replace")
+                raise SynthesisError(response.status, detail, _retry_after(response))
+
+            first = True
+            while chunk := response.read1(READ_SIZE):
+                if first:
+                    first = False
+                    timing = RequestTiming(connect_seconds, time.monotonic() - sent, reused)
+                    logger.debug(
+                        "Synthesis TTFB %.0f ms (connect %.0f ms%s, server %.0f ms)",
+                        timing.ttfb * 1000,
+                        timing.connect * 1000,
+                        ", reused" if reused else "",
+                        timing.server * 1000,
+                    )
+                    if self._on_timing:
+                        self._on_timing(timing)
+                yield chunk
+            # A shut-down socket reads like the end of the audio
+            if cancel:
+                cancel.check()
+            complete = True
+        except (http.client.HTTPException, OSError):
+            if cancel:
+                cancel.check()
+            raise
+        finally:
+            forget()
+            self._pool.release(connection, reusable=complete and not response.will_close)
+
+    def check_connection(self) -> bool:
+        """Whether the API accepts the key (blocking).
+
+        Used instead of the official client's check when ``api_url``
+        points somewhere else, e.g. at a local stand-in.
+        """
+        try:
+            connection, _, _ = self._pool.acquire()
+        except OSError as e:
+            logger.error("Could not connect to %s: %s", self._pool.host, e)
+            return False
+        reusable = False
+        try:
+            connection.request("GET", USER_PATH, headers={"xi-api-key": self._api_key})
+            response = connection.getresponse()
+            response.read()
+            reusable = not response.will_close
+            return response.status == 200
+        except (http.client.HTTPException, OSError) as e:
+            logger.error("API connection check failed: %s", e)
+            return False
+        finally:
+            self._pool.release(connection, reusable)
+
+    def close(self) -> None:
+        """Close the pool's idle connections."""
+        self._pool.close()
+
+
+def _bench(requests: int, handshake_delay: float, first_byte_delay: float) -> None:
+    """Compare a new connection per request with a pre-connected pool."""
+    from api_standin import StandInServer
+
+    class Voice:
+        voice_id = "bench"
+        model_id = "eleven_multilingual_v2"
+        output_format = "mp3_44100_128"
+        stability = similarity_boost = 0.5
+        speed = 1.0
+
+    with StandInServer(handshake_delay, first_byte_delay) as server:
+        print(
+            f"{requests} requests, {handshake_delay * 1000:.0f} ms handshake, "
+            f"{first_byte_delay * 1000:.0f} ms server time:"
+        )
+        for name, warm in (("new connection per request", False), ("pre-connected pool", True)):
+            timings: list[RequestTiming] = []
+            pool = ConnectionPool(server.url, context=server.client_context())
+            client = SynthesisClient("bench", Voice(), pool, timings.append)
+            for _ in range(requests):
+                if warm:
+                    pool.warm()
+                for _ in client.stream("Hello there, this is a benchmark sentence."):
+                    pass
+                if not warm:
+                    pool.close()
+                    pool = ConnectionPool(server.url, context=server.client_context())
+                    client = SynthesisClient("bench", Voice(), pool, timings.append)
+            pool.close()
+
+            count = len(timings)
+            connect = sum(t.connect for t in timings) / count * 1000
+            server_ms = sum(t.server for t in timings) / count * 1000
+            print(
+                f"  {name:28s} TTFB {connect + server_ms:7.1f} ms  "
+                f"(connect {connect:6.1f} ms, server {server_ms:6.1f} ms, "
+                f"{sum(t.reused for t in timings)}/{count} reused)"
+            )
+        print(f"  TLS handshakes on the stand-in: {server.handshakes}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="ElevenLabs keep-alive synthesis client")
+    parser.add_argument("--bench", action="store_true", help="Benchmark against a local HTTPS stand-in")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per benchmark run")
+    parser.add_argument("--handshake-ms", type=float, default=150.0, help="Simulated connection setup time")
+    parser.add_argument("--server-ms", type=float, default=250.0, help="Simulated server time to first byte")
+    args = parser.parse_args()
+
+    if not args.bench:
+        parser.print_help()
+        return 0
+    _bench(args.requests, args.handshake_ms / 1000, args.server_ms / 1000)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())